@@ -1,18 +1,24 @@
 from flask_admin import Admin, BaseView, expose
 from flask_admin.contrib.sqla import ModelView, tools as sqla_tools
 from flask_admin.form import Select2Field
-from wtforms import SelectMultipleField, TextAreaField, StringField, DateTimeField, BooleanField, SelectField
+from wtforms import TextAreaField, StringField, DateTimeField, BooleanField, SelectField
 from wtforms.validators import DataRequired, Optional
-from database import Category, Event, Venue, SessionLocal, AdminSession, engine, db_path
+from database import (
+    Category, Event, Venue, SessionLocal, AdminSession, engine, db_path, get_next_event_id,
+    recompute_category_usage, refresh_category_labels, set_event_categories,
+)
 from cacheout import Cache
-from sqlalchemy import text, func, tuple_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import exists, text, func, tuple_, inspect as sa_inspect
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta, date
 from flask import (
     render_template, request, flash, redirect, url_for, session, current_app,
     send_file, abort, after_this_request,
 )
 from urls import safe_http_url
+from fts import apply_pending_index, event_search_clause, indexing_status, search_venue_ids
+from venue_catalog import venue_name
+from events import admin_count_cache, admin_page_boundaries
 import json
 import os
 import sqlite3
@@ -30,6 +36,58 @@ def _local_now_naive():
 mru_cache = Cache(maxsize=100, ttl=3600)  # 1 hour TTL
 
 
+def cached_count(cache_key, count_query):
+    """count_query.scalar(), reused for admin_count_cache's TTL."""
+    count = admin_count_cache.get(cache_key)
+    if count is None:
+        count = count_query.scalar()
+        admin_count_cache.set(cache_key, count)
+    return count
+
+
+def event_key_order(descending=True):
+    return [column.desc() if descending else column.asc()
+            for column in (Event.start, Event.start_date, Event.id)]
+
+
+def _boundary_exists(session, boundary):
+    """Whether the row a cached boundary was taken from is still at that key (primary key probe)."""
+    start, start_date, event_id = boundary
+    return session.query(exists().where(
+        Event.start_date == start_date, Event.id == event_id, Event.start == start,
+    )).scalar()
+
+
+def keyset_event_page(query, keys_query, cache_key, page, page_size, descending=True):
+    """Events on 0-based `page`, seeking past the previous page's last key instead of OFFSET.
+
+    `query` and `keys_query` (selecting start, start_date, id) must carry the same
+    filters. Boundaries are cached under cache_key; jumping straight to a deep page
+    finds its boundary with one OFFSET over the covering index, not the rows.
+    """
+    order = event_key_order(descending)
+    query = query.order_by(*order)
+    if page:
+        boundary = admin_page_boundaries.get(cache_key + (page - 1,))
+        if boundary is not None and not _boundary_exists(query.session, boundary):
+            # Moved or deleted by a write this worker didn't see; find the page again
+            boundary = None
+        if boundary is None:
+            boundary = keys_query.order_by(*order).offset(page * page_size - 1).limit(1).first()
+            if boundary is None:
+                return []
+            boundary = tuple(boundary)
+            admin_page_boundaries.set(cache_key + (page - 1,), boundary)
+        row_key = tuple_(Event.start, Event.start_date, Event.id)
+        query = query.filter(row_key < boundary if descending else row_key > boundary)
+
+    rows = query.limit(page_size).all()
+    if len(rows) == page_size:
+        last = rows[-1]
+        admin_page_boundaries.set(cache_key + (page,), (last.start, last.start_date, last.id))
+    return rows
+
+
 class AuthMixin:
     def is_accessible(self):
         return session.get('logged_in')
@@ -60,9 +118,9 @@ class DashboardView(AuthMixin, BaseView):
                 func.strftime('%Y-%m', Event.start)
             ).order_by('month').all()
             
-            # Get upcoming events (next 30 days) with venue loaded
+            # Get upcoming events (next 30 days); venue names come from the catalog
             thirty_days_from_now = now + timedelta(days=30)
-            upcoming_events = session.query(Event).options(joinedload(Event.venue)).filter(
+            upcoming_events = session.query(Event).filter(
                 Event.start >= now,
                 Event.start <= thirty_days_from_now
             ).order_by(Event.start).limit(10).all()
@@ -75,16 +133,16 @@ class DashboardView(AuthMixin, BaseView):
                 func.count(Event.id).desc()
             ).limit(5).all()
             
-            # Get most used categories
+            # Get most used categories (usage_count is kept exact by the event_category triggers)
             popular_categories = session.query(
                 Category.name,
-                Category.usage_count
+                Category.usage_count.label('event_count')
             ).filter(Category.is_active == True).order_by(
                 Category.usage_count.desc()
             ).limit(10).all()
             
-            # Get recent events (last 10) with venue loaded
-            recent_events = session.query(Event).options(joinedload(Event.venue)).order_by(
+            # Get recent events (last 10)
+            recent_events = session.query(Event).order_by(
                 Event.start.desc()
             ).limit(10).all()
             
@@ -142,6 +200,16 @@ class DatabaseStatsView(AuthMixin, BaseView):
         finally:
             session.close()
 
+    @expose('/recount-categories', methods=['POST'])
+    def recount_categories(self):
+        """Recompute category usage counts from scratch"""
+        try:
+            recount_category_usage()
+            flash('Recounted category usage', 'success')
+        except Exception as e:
+            flash(f'Error recounting categories: {e}', 'error')
+        return redirect(url_for('dbstats.index'))
+
     @expose('/download')
     def download(self):
         """Download a consistent SQLite backup of the events database."""
@@ -183,6 +251,23 @@ class DatabaseStatsView(AuthMixin, BaseView):
             mimetype='application/x-sqlite3',
         )
 
+class SearchIndexView(AuthMixin, BaseView):
+    """Search index state: indexing mode, queued changes and lag"""
+
+    @expose('/')
+    def index(self):
+        return self.render('admin/search_index.html', status=indexing_status())
+
+    @expose('/apply', methods=['POST'])
+    def apply(self):
+        """Apply every queued index change now instead of waiting for the indexer"""
+        try:
+            applied = apply_pending_index()
+            flash(f'Applied {applied} queued index operations', 'success')
+        except Exception as e:
+            flash(f'Error applying index queue: {e}', 'error')
+        return redirect(url_for('searchindex.index'))
+
 class CategoryModelView(ModelView):
     """Admin interface for managing categories"""
     
@@ -194,21 +279,37 @@ class CategoryModelView(ModelView):
         'usage_count': lambda v, c, m, p: f"{m.usage_count:,}" if m.usage_count else "0"
     }
     
+    # usage_count is maintained by the event_category triggers, never edited here
     form_columns = ('name', 'is_active')
-    form_extra_fields = {
-        'usage_count': SelectMultipleField('Usage Count', coerce=int)
-    }
     
     def on_model_change(self, form, model, is_created):
-        """Update usage count when category is modified"""
+        """Update usage count when category is modified; a rename relabels its events"""
         if is_created:
             model.usage_count = 0
+        elif sa_inspect(model).attrs.name.history.has_changes():
+            self.session.flush()
+            event_keys = self.session.execute(text(
+                "SELECT start_date, event_id FROM event_category WHERE category_id = :id"
+            ), {"id": model.id}).fetchall()
+            refresh_category_labels(self.session.connection(), event_keys)
+
+    def on_model_delete(self, model):
+        """Unlink the category's events and drop it from their labels"""
+        event_keys = self.session.execute(text(
+            "DELETE FROM event_category WHERE category_id = :id RETURNING start_date, event_id"
+        ), {"id": model.id}).fetchall()
+        refresh_category_labels(self.session.connection(), event_keys)
     
     def after_model_change(self, form, model, is_created):
-        """Clear caches after category changes"""
-        from events import clear_day_events_cache, clear_calendar_events_cache
-        clear_day_events_cache()
-        clear_calendar_events_cache()
+        """Clear caches after category changes (venue pages don't show categories)"""
+        from events import clear_event_caches, clear_form_categories
+        from facets import clear_category_index
+        clear_category_index()
+        clear_form_categories()
+        clear_event_caches(venue_ids=())
+
+    def after_model_delete(self, model):
+        self.after_model_change(None, model, False)
 
 class EventModelView(ModelView):
     """Admin interface for managing events"""
@@ -220,30 +321,74 @@ class EventModelView(ModelView):
         'start': lambda v, c, m, p: m.start.strftime('%Y-%m-%d %H:%M') if m.start else '',
         'end': lambda v, c, m, p: m.end.strftime('%Y-%m-%d %H:%M') if m.end else '',
         'categories': lambda v, c, m, p: m.categories[:50] + '...' if m.categories and len(m.categories) > 50 else m.categories or '',
-        'venue': lambda v, c, m, p: m.venue.name if m.venue else '',
+        'venue': lambda v, c, m, p: venue_name(m.venue_id) or '',
         'recurring_until': lambda v, c, m, p: m.recurring_until.strftime('%Y-%m-%d') if m.recurring_until else '',
     }
     
-    form_columns = ('title', 'description', 'start', 'end', 'venue', 'categories', 
+    form_columns = ('title', 'description', 'start', 'end', 'venue', 'category_list', 
                    'rrule', 'recurring_until', 'is_virtual', 'is_hybrid', 'url', 'color', 'bg')
     
     form_args = {
         'venue': {
             'get_label': 'name',
         },
+        'category_list': {
+            'label': 'Categories',
+            'get_label': 'name',
+        },
     }
     
     form_extra_fields = {
         'description': TextAreaField('Description'),
-        'categories': StringField('Categories (comma-separated)'),
         'url': StringField('URL'),
         'color': StringField('Color (hex)'),
         'bg': StringField('Background Color (hex)')
     }
 
-    def get_query(self):
-        """Eager-load venue to avoid N+1 on list formatting."""
-        return super().get_query().options(joinedload(Event.venue))
+    def get_list(self, page, sort_column, sort_desc, search, filters,
+                 execute=True, page_size=None):
+        """Sorted by start: keyset pages and cached totals instead of OFFSET and count(*)."""
+        if sort_column is None and self.column_default_sort == ('start', True):
+            descending = True
+        elif sort_column == 'start':
+            descending = sort_desc
+        else:
+            return super().get_list(page, sort_column, sort_desc, search, filters,
+                                    execute=execute, page_size=page_size)
+        if page_size is None:
+            page_size = self.page_size
+
+        query = self.get_query()
+        count_query = self.get_count_query()
+        keys_query = self.session.query(Event.start, Event.start_date, Event.id)
+        if self._search_supported and search:
+            query, count_query, _, _ = self._apply_search(query, count_query, {}, {}, search)
+            keys_query, _, _, _ = self._apply_search(keys_query, None, {}, {}, search)
+        if filters and self._filters:
+            query, count_query, _, _ = self._apply_filters(query, count_query, {}, {}, filters)
+            keys_query, _, _, _ = self._apply_filters(keys_query, None, {}, {}, filters)
+
+        list_key = (self.endpoint, search or '', repr(filters or ()))
+        count = cached_count(list_key, count_query)
+
+        if not execute or not page_size:  # Exports: one ordered query, no paging
+            query = query.order_by(*event_key_order(descending))
+            if page_size:
+                query = query.limit(page_size)
+            return count, (query if not execute else query.all())
+
+        cache_key = list_key + (descending, page_size)
+        return count, keyset_event_page(query, keys_query, cache_key, page or 0, page_size, descending)
+
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        """Substring search through the event_trigram index instead of LIKE scans."""
+        condition = event_search_clause(search)
+        if condition is None:
+            return query, count_query, joins, count_joins
+        query = query.filter(condition)
+        if count_query is not None:
+            count_query = count_query.filter(condition)
+        return query, count_query, joins, count_joins
 
     def get_one(self, id):
         """Convert composite PK strings back to date/int for SQLAlchemy."""
@@ -257,26 +402,32 @@ class EventModelView(ModelView):
         return super().get_one(id)
     
     def on_model_change(self, form, model, is_created):
-        """Update category usage counts when event is saved"""
+        """Assign the composite key and the category label when event is saved"""
         model.url = safe_http_url(model.url)
-        if model.categories:
-            session = SessionLocal()
-            try:
-                # Parse categories and update usage counts
-                category_names = [cat.strip() for cat in model.categories.split(',') if cat.strip()]
-                for category_name in category_names:
-                    category = session.query(Category).filter(Category.name == category_name).first()
-                    if category:
-                        category.usage_count += 1
-                session.commit()
-            finally:
-                session.close()
+        # venue_id still holds the loaded value until flush; remember it so both venues' pages drop
+        previous_venue_id = sa_inspect(model).attrs.venue_id.loaded_value
+        model._previous_venue_id = previous_venue_id if isinstance(previous_venue_id, int) else None
+        # start_date is only derived in Event.__init__; the form sets start afterwards
+        new_date = model.start.date()
+        if is_created or model.start_date != new_date:
+            model.start_date = new_date
+            model.id = get_next_event_id(self.session, new_date)
+        # The form fills category_list (event_category rows, which keep usage_count); the label follows it
+        set_event_categories(model, model.category_list)
     
     def after_model_change(self, form, model, is_created):
         """Clear caches after event changes"""
-        from events import clear_day_events_cache, clear_calendar_events_cache
-        clear_day_events_cache()
-        clear_calendar_events_cache()
+        from events import clear_event_caches
+        clear_event_caches((getattr(model, '_previous_venue_id', None), model.venue_id))
+
+    def on_model_delete(self, model):
+        """Remember the venue before the row is gone"""
+        model._previous_venue_id = model.venue_id
+
+    def after_model_delete(self, model):
+        """Deleted events shift every cached page boundary and total"""
+        from events import clear_event_caches
+        clear_event_caches((getattr(model, '_previous_venue_id', None),))
 
 class VenueModelView(ModelView):
     """Admin interface for managing venues"""
@@ -315,6 +466,16 @@ class VenueModelView(ModelView):
         else:
             self._venue_event_counts = {}
         return count, data
+
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        """Match through venue_fts (prefix match on every word) instead of LIKE per column."""
+        venue_ids = search_venue_ids(search)
+        if venue_ids is None:
+            return query, count_query, joins, count_joins
+        query = query.filter(Venue.id.in_(venue_ids))
+        if count_query is not None:
+            count_query = count_query.filter(Venue.id.in_(venue_ids))
+        return query, count_query, joins, count_joins
     
     def on_model_change(self, form, model, is_created):
         """Sanitize URL fields on venue save"""
@@ -323,9 +484,15 @@ class VenueModelView(ModelView):
     
     def after_model_change(self, form, model, is_created):
         """Clear caches after venue changes"""
-        from events import clear_day_events_cache, clear_calendar_events_cache
-        clear_day_events_cache()
-        clear_calendar_events_cache()
+        from events import clear_event_caches, clear_venues_cache
+        clear_event_caches((model.id,))
+        clear_venues_cache()
+
+    def after_model_delete(self, model):
+        """Deleted venues must drop out of cached lists and search results too"""
+        from events import clear_event_caches, clear_venues_cache
+        clear_event_caches((sa_inspect(model).identity[0],))
+        clear_venues_cache()
 
 class BulkOperationsView(AuthMixin, BaseView):
     """Bulk operations for events"""
@@ -353,7 +520,8 @@ class BulkOperationsView(AuthMixin, BaseView):
             try:
                 events = session.query(Event).filter(
                     tuple_(Event.start_date, Event.id).in_(pk_pairs)
-                ).all()
+                ).options(selectinload(Event.category_list)).all()
+                venue_ids = {event.venue_id for event in events}
                 
                 if operation == 'delete':
                     for event in events:
@@ -362,16 +530,14 @@ class BulkOperationsView(AuthMixin, BaseView):
                     flash(f'Deleted {len(events)} events', 'success')
                  
                 elif operation == 'update_category':
-                    category = request.form.get('category')
+                    category_name = request.form.get('category')
+                    category = session.query(Category).filter(
+                        Category.name == category_name
+                    ).first() if category_name else None
                     if category:
                         for event in events:
-                            if event.categories:
-                                categories = [cat.strip() for cat in event.categories.split(',')]
-                                if category not in categories:
-                                    categories.append(category)
-                                    event.categories = ', '.join(categories)
-                            else:
-                                event.categories = category
+                            if category not in event.category_list:
+                                set_event_categories(event, event.category_list + [category])
                         session.commit()
                         flash(f'Updated categories for {len(events)} events', 'success')
                 
@@ -380,6 +546,9 @@ class BulkOperationsView(AuthMixin, BaseView):
                         event.is_virtual = True
                     session.commit()
                     flash(f'Marked {len(events)} events as virtual', 'success')
+
+                from events import clear_event_caches
+                clear_event_caches(venue_ids)
                 
             except Exception as e:
                 session.rollback()
@@ -389,16 +558,31 @@ class BulkOperationsView(AuthMixin, BaseView):
             
             return redirect(url_for('bulkoperations.index'))
         
-        # Get events for selection with venue relationship loaded
+        # Get events for selection
         session = SessionLocal()
         try:
-            events = session.query(Event).options(joinedload(Event.venue)).order_by(Event.start.desc()).limit(100).all()
+            events = session.query(Event).order_by(Event.start.desc()).limit(100).all()
             categories = session.query(Category).filter(Category.is_active == True).all()
         finally:
             session.close()
         
         return self.render('admin/bulk_operations.html', events=events, categories=categories)
 
+def event_management_stats(session):
+    """(total, upcoming, virtual, recurring) from one aggregate pass, cached in admin_count_cache."""
+    stats = admin_count_cache.get(('stats',))
+    if stats is None:
+        row = session.execute(text("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(start >= :now), 0),
+                   COALESCE(SUM(is_virtual = 1), 0),
+                   COALESCE(SUM(is_recurring = 1), 0)
+            FROM event
+        """), {"now": _local_now_naive().isoformat(sep=' ')}).fetchone()
+        stats = tuple(row)
+        admin_count_cache.set(('stats',), stats)
+    return stats
+
 class EventManagementView(AuthMixin, BaseView):
     """Custom event management view with advanced features"""
     
@@ -406,16 +590,19 @@ class EventManagementView(AuthMixin, BaseView):
     def index(self):
         session = SessionLocal()
         try:
-            # Get events with manual pagination and venue relationship loaded
-            page = request.args.get('page', 1, type=int)
+            # Keyset pages (newest start first) and cached totals: deep pages cost the same as page 1
+            page = max(request.args.get('page', 1, type=int), 1)
             per_page = 20
-            offset = (page - 1) * per_page
-            
-            # Get total count
-            total_events = session.query(Event).count()
-            
-            # Get paginated events
-            events = session.query(Event).options(joinedload(Event.venue)).order_by(Event.start.desc()).offset(offset).limit(per_page).all()
+
+            total_events, upcoming_events, virtual_events, recurring_events = event_management_stats(session)
+
+            events = keyset_event_page(
+                session.query(Event),
+                session.query(Event.start, Event.start_date, Event.id),
+                ('eventmanagement', '', '()', True, per_page),
+                page - 1,
+                per_page,
+            )
             
             # Calculate pagination info
             total_pages = (total_events + per_page - 1) // per_page
@@ -449,11 +636,6 @@ class EventManagementView(AuthMixin, BaseView):
             
             pagination = Pagination(events, page, per_page, total_events, total_pages, has_prev, has_next)
             
-            # Get quick stats
-            upcoming_events = session.query(Event).filter(Event.start >= _local_now_naive()).count()
-            virtual_events = session.query(Event).filter(Event.is_virtual == True).count()
-            recurring_events = session.query(Event).filter(Event.is_recurring == True).count()
-            
             return self.render('admin/event_management.html',
                              events=pagination,
                              total_events=total_events,
@@ -463,11 +645,14 @@ class EventManagementView(AuthMixin, BaseView):
         finally:
             session.close()
     
-    @expose('/duplicate/<int:event_id>')
-    def duplicate_event(self, event_id):
+    @expose('/duplicate/<start_date>/<int:event_id>')
+    def duplicate_event(self, start_date, event_id):
         session = SessionLocal()
         try:
-            original_event = session.query(Event).filter(Event.id == event_id).first()
+            try:
+                original_event = session.get(Event, (date.fromisoformat(start_date), event_id))
+            except ValueError:
+                original_event = None
             if not original_event:
                 flash('Event not found', 'error')
                 return redirect(url_for('eventmanagement.index'))
@@ -479,7 +664,6 @@ class EventManagementView(AuthMixin, BaseView):
                 start=original_event.start + timedelta(days=7),  # Move to next week
                 end=original_event.end + timedelta(days=7),
                 venue_id=original_event.venue_id,
-                categories=original_event.categories,
                 color=original_event.color,
                 bg=original_event.bg,
                 is_virtual=original_event.is_virtual,
@@ -489,9 +673,14 @@ class EventManagementView(AuthMixin, BaseView):
                 recurring_until=original_event.recurring_until,
                 is_recurring=original_event.is_recurring
             )
+            set_event_categories(new_event, original_event.category_list)
+            new_event.id = get_next_event_id(session, new_event.start_date)
             
             session.add(new_event)
             session.commit()
+
+            from events import clear_event_caches
+            clear_event_caches((new_event.venue_id,))
             
             flash(f'Event "{original_event.title}" duplicated successfully', 'success')
             return redirect(url_for('eventmanagement.index'))
@@ -531,6 +720,7 @@ def init_admin(app):
     admin.add_view(DatabaseStatsView(name='Database Stats', endpoint='dbstats'))
     admin.add_view(BulkOperationsView(name='Bulk Operations', endpoint='bulkoperations'))
     admin.add_view(EventManagementView(name='Event Management', endpoint='eventmanagement'))
+    admin.add_view(SearchIndexView(name='Search Index', endpoint='searchindex'))
     
     # Add model views with compact settings
     class CompactCategoryModelView(CompactModelView, CategoryModelView):
@@ -556,28 +746,19 @@ def init_admin(app):
 
 def get_categories_by_usage():
     """Get categories ordered by usage count (most used first)"""
+    from events import get_form_categories
     session = SessionLocal()
     try:
-        categories = session.query(Category).filter(
-            Category.is_active == True
-        ).order_by(Category.usage_count.desc(), Category.name).all()
-        return categories
+        return list(get_form_categories(session))
     finally:
         session.close()
 
-def update_category_usage(category_ids):
-    """Update usage count for categories"""
-    if not category_ids:
-        return
-    
-    session = SessionLocal()
-    try:
-        categories = session.query(Category).filter(Category.id.in_(category_ids)).all()
-        for category in categories:
-            category.usage_count += 1
-        session.commit()
-    finally:
-        session.close()
+def recount_category_usage():
+    """Recompute every usage count from event_category (the triggers keep them exact otherwise)"""
+    with engine.begin() as conn:
+        recompute_category_usage(conn)
+    from events import clear_form_categories
+    clear_form_categories()
 
 def get_mru_categories(session_id, limit=5):
     """Get most recently used categories for a session"""
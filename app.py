@@ -1,24 +1,37 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_from_directory, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_from_directory, session, abort
 from flask_compress import Compress
 from flask_cors import CORS
-from flask_assets import Environment, Bundle
 from flask_wtf.csrf import CSRFProtect
 from datetime import datetime
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; the single dev server process runs the threads
+    fcntl = None
 import logging
 import yaml
 import os
 import sys
+import threading
+import time
 import traceback
 import pytz
 from markupsafe import escape
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import engine, db_path, SessionLocal, AdminSession, Event, migrate_database
-from admin import init_admin
+from database import (
+    engine, db_path, SessionLocal, AdminSession, Event, init_database, migrate_database, prime_page_cache,
+)
+from assets import init_assets
+import raw_reads
 from auth import init_auth, register_auth_routes
-from events import EVENT_LINK_ARROW, register_events
-from cache import register_cache_routes
+from bootstrap import inline_bootstrap, month_grid, register_bootstrap_routes
+from day_counts import register_day_count_routes, start_day_count_filler
+from events import EVENT_LINK_ARROW, register_events, warm_read_caches
+from feeds import register_feed_routes
+from fragments import register_fragment_routes
+from fts import ensure_fts_setup, register_search_routes, start_fts_indexer, start_fts_maintenance
+from typeahead import register_typeahead_routes
 
 
 def configure_logging():
@@ -56,66 +69,39 @@ def load_config():
         sys.exit(1)
 
 
-# Load configuration
-config = load_config()
-init_auth(config)
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = config.get('secret_key', 'dev-secret-key-change-in-production')
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
-app.config['SESSION_COOKIE_SECURE'] = True
-app.config['WTF_CSRF_TIME_LIMIT'] = None
-
-# Set timezone to local timezone instead of UTC
-LOCAL_TIMEZONE = pytz.timezone(config['timezone']['local'])
-app.config['LOCAL_TIMEZONE'] = LOCAL_TIMEZONE
+# Worker roles: "all" serves everything; "public" only boots the read API and
+# public pages (no Flask-Admin, cache management routes or startup migrations).
+ROLE_ALL = 'all'
+ROLE_PUBLIC = 'public'
+APP_ROLES = (ROLE_ALL, ROLE_PUBLIC)
 
-app.logger.setLevel(logging.ERROR)
 
-csrf = CSRFProtect(app)
+def get_app_role(config):
+    """Worker role from FLASK_EVENTS_ROLE, then config.yaml `role` (default: all)."""
+    role = (os.environ.get('FLASK_EVENTS_ROLE') or config.get('role') or ROLE_ALL).strip().lower()
+    if role not in APP_ROLES:
+        logger.error("Unknown app role %r; falling back to %r", role, ROLE_ALL)
+        return ROLE_ALL
+    return role
 
-@app.context_processor
-def inject_template_globals():
-    return {'event_link_arrow': EVENT_LINK_ARROW}
 
 # WordPress host site — hardcoded CORS for now
 CORS_ORIGINS = [
     'https://thedetroitilove.com',
     'https://www.thedetroitilove.com',
 ]
-CORS(app,
-     origins=CORS_ORIGINS,
-     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization', 'X-CSRFToken', 'X-CSRF-Token'])
-
-def get_local_now():
-    """Get current datetime in local timezone"""
-    utc_now = datetime.now(pytz.UTC)
-    return utc_now.astimezone(LOCAL_TIMEZONE)
-
-# Enable response compression
-Compress(app)
-
-# Initialize Flask-Assets
-assets = Environment(app)
-
-# Configure asset bundles
-css_bundle = Bundle(
-    'css/base.css',
-    'css/calendar.css',
-    'css/forms.css',
-    'css/widgets.css',
-    'css/venue.css',
-    filters='cssmin',
-    output='gen/packed.css'
-)
-assets.register('css_all', css_bundle)
 
 TDIL_HOME = 'https://thedetroitilove.com/'
 
+# Held (flock) by the one worker running the FTS and day count threads for this database
+BACKGROUND_LOCK_PATH = f'{db_path}.background.lock'
+
+# How often a worker without the lock tries again (takes over when the owner exits)
+BACKGROUND_CLAIM_SECONDS = 60
+
+# Where this app is reached when config.yaml has no site_url (the WordPress plugin's FLASK_EVENTS_URL default)
+DEFAULT_SITE_URL = 'http://localhost:5000'
+
 
 def public_site_redirect():
     """Send anonymous visitors to the public WordPress site."""
@@ -123,84 +109,6 @@ def public_site_redirect():
         return redirect(TDIL_HOME)
     return None
 
-@app.route('/favicon.ico')
-def favicon():
-    return send_from_directory(
-        os.path.join(app.root_path, 'static'),
-        'favicon.ico',
-        mimetype='image/vnd.microsoft.icon',
-    )
-
-# Home route (widget test page)
-@app.route('/')
-def home():
-    bounced = public_site_redirect()
-    if bounced:
-        return bounced
-    now = get_local_now()
-    today_str = now.strftime('%Y-%m-%d')
-    return render_template('widget_test.html', date=today_str)
-
-
-# Monthly view
-@app.route('/month/<int:year>/<int:month>')
-def month_view(year, month):
-    bounced = public_site_redirect()
-    if bounced:
-        return bounced
-    return render_template('month.html', year=year, month=month)
-
-# Daily view
-@app.route('/day/<date>')
-def day_view(date):
-    bounced = public_site_redirect()
-    if bounced:
-        return bounced
-    try:
-        date_obj = datetime.strptime(date, '%Y-%m-%d')
-        db_session = SessionLocal()
-        try:
-            day_events = db_session.query(Event).filter(
-                Event.start_date == date_obj.date()
-            ).order_by(Event.start).all()
-
-            return render_template('widget_test.html',
-                                 year=date_obj.year,
-                                 month=date_obj.month,
-                                 day=date_obj.day,
-                                 date=date,
-                                 events=day_events)
-        finally:
-            db_session.close()
-    except ValueError:
-        return redirect(url_for('home'))
-
-@app.route('/widget-test')
-def widget_test():
-    bounced = public_site_redirect()
-    if bounced:
-        return bounced
-    return render_template('widget_test.html')
-
-# Run migration automatically after models are defined
-try:
-    migrate_database()
-except Exception as e:
-    logger.error("Migration failed: %s", e, exc_info=True)
-
-# Auth routes (login/logout) before admin
-register_auth_routes(app)
-
-# Initialize Flask-Admin
-init_admin(app)
-
-# Register routes from other modules
-register_events(app)
-register_cache_routes(app)
-
-@app.teardown_appcontext
-def shutdown_admin_session(exception=None):
-    AdminSession.remove()
 
 def set_cache_headers(response, max_age=3600):
     """Set cache headers for better performance"""
@@ -208,6 +116,7 @@ def set_cache_headers(response, max_age=3600):
     response.headers['Vary'] = 'Accept-Encoding'
     return response
 
+
 def monitor_connection_pool():
     """Monitor connection pool usage"""
     pool = engine.pool
@@ -218,46 +127,296 @@ def monitor_connection_pool():
         'checked_in': pool.checkedin(),
     }
 
-@app.errorhandler(500)
-def internal_error(error):
-    """Log full traceback; show details only to logged-in admins."""
-    original = getattr(error, 'original_exception', None) or error
-    tb = getattr(original, '__traceback__', None)
-    exc_info = (type(original), original, tb)
-    app.logger.error('Internal server error', exc_info=exc_info)
-
-    if session.get('logged_in'):
-        tb_text = ''.join(traceback.format_exception(*exc_info))
-        html = (
-            '<!DOCTYPE html><html><head><title>500 Internal Server Error</title></head>'
-            '<body style="font-family: monospace; margin: 2rem;">'
-            '<h1>500 Internal Server Error</h1>'
-            f'<p><strong>{escape(type(original).__name__)}:</strong> {escape(str(original))}</p>'
-            f'<pre style="white-space: pre-wrap; background: #f5f5f5; padding: 1rem; '
-            f'border: 1px solid #ccc;">{escape(tb_text)}</pre>'
-            '</body></html>'
+
+def register_admin_components(app):
+    """Flask-Admin and cache management; imported here so public workers never load them."""
+    from admin import init_admin
+    from cache import register_cache_routes
+
+    init_admin(app)
+    register_cache_routes(app)
+
+
+def register_core_routes(app):
+    """Public pages, error handlers and pool stats."""
+
+    def get_local_now():
+        """Get current datetime in local timezone"""
+        utc_now = datetime.now(pytz.UTC)
+        return utc_now.astimezone(app.config['LOCAL_TIMEZONE'])
+
+    @app.context_processor
+    def inject_template_globals():
+        return {'event_link_arrow': EVENT_LINK_ARROW}
+
+    @app.route('/favicon.ico')
+    def favicon():
+        return send_from_directory(
+            os.path.join(app.root_path, 'static'),
+            'favicon.ico',
+            mimetype='image/vnd.microsoft.icon',
         )
-        return html, 500
 
-    return jsonify({'error': 'Internal server error'}), 500
+    # Home route (widget test page)
+    @app.route('/')
+    def home():
+        bounced = public_site_redirect()
+        if bounced:
+            return bounced
+        now = get_local_now()
+        today_str = now.strftime('%Y-%m-%d')
+        return render_template('widget_test.html', date=today_str, bootstrap_json=inline_bootstrap(now.date()))
+
+    # Monthly view
+    @app.route('/month/<int:year>/<int:month>')
+    def month_view(year, month):
+        bounced = public_site_redirect()
+        if bounced:
+            return bounced
+        try:
+            grid = month_grid(year, month)
+        except ValueError:
+            abort(404)
+        return render_template('month.html', year=year, month=month, bootstrap_json=inline_bootstrap(grid=grid))
+
+    # Daily view
+    @app.route('/day/<date>')
+    def day_view(date):
+        bounced = public_site_redirect()
+        if bounced:
+            return bounced
+        try:
+            date_obj = datetime.strptime(date, '%Y-%m-%d')
+            db_session = SessionLocal()
+            try:
+                day_events = db_session.query(Event).filter(
+                    Event.start_date == date_obj.date()
+                ).order_by(Event.start).all()
+
+                return render_template('widget_test.html',
+                                     year=date_obj.year,
+                                     month=date_obj.month,
+                                     day=date_obj.day,
+                                     date=date,
+                                     events=day_events,
+                                     bootstrap_json=inline_bootstrap(date_obj.date()))
+            finally:
+                db_session.close()
+        except ValueError:
+            return redirect(url_for('home'))
+
+    @app.route('/widget-test')
+    def widget_test():
+        bounced = public_site_redirect()
+        if bounced:
+            return bounced
+        return render_template('widget_test.html', bootstrap_json=inline_bootstrap(get_local_now().date()))
+
+    @app.teardown_appcontext
+    def shutdown_admin_session(exception=None):
+        AdminSession.remove()
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        """Log full traceback; show details only to logged-in admins."""
+        original = getattr(error, 'original_exception', None) or error
+        tb = getattr(original, '__traceback__', None)
+        exc_info = (type(original), original, tb)
+        app.logger.error('Internal server error', exc_info=exc_info)
+
+        if session.get('logged_in'):
+            tb_text = ''.join(traceback.format_exception(*exc_info))
+            html = (
+                '<!DOCTYPE html><html><head><title>500 Internal Server Error</title></head>'
+                '<body style="font-family: monospace; margin: 2rem;">'
+                '<h1>500 Internal Server Error</h1>'
+                f'<p><strong>{escape(type(original).__name__)}:</strong> {escape(str(original))}</p>'
+                f'<pre style="white-space: pre-wrap; background: #f5f5f5; padding: 1rem; '
+                f'border: 1px solid #ccc;">{escape(tb_text)}</pre>'
+                '</body></html>'
+            )
+            return html, 500
+
+        return jsonify({'error': 'Internal server error'}), 500
+
+    @app.errorhandler(404)
+    def not_found_error(error):
+        """Handle 404 errors"""
+        return jsonify({'error': 'Not found'}), 404
+
+    @app.route('/pool-stats')
+    def pool_stats():
+        """Endpoint to check connection pool statistics"""
+        pool = engine.pool
+        stats = {
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'checked_in': pool.checkedin(),
+            'total_connections': pool.size() + pool.overflow()
+        }
+        return jsonify(stats)
+
+
+def preload_read_data(app, prime_cache=False):
+    """Load read-mostly data in the parent so forked workers share it copy-on-write."""
+    # Compile the app's own templates (Flask-Admin's load on first admin request)
+    for name in app.jinja_loader.list_templates():
+        app.jinja_env.get_template(name)
 
-@app.errorhandler(404)
-def not_found_error(error):
-    """Handle 404 errors"""
-    return jsonify({'error': 'Not found'}), 404
+    try:
+        if prime_cache:
+            prime_page_cache()
+        warm_read_caches()
+    except Exception as e:
+        logger.error("Preloading read caches failed: %s", e, exc_info=True)
+
+
+def start_background_work(config):
+    """Start the FTS merge, FTS indexer and day count filler threads (one process per database)."""
+    fts_config = config.get('fts') or {}
+
+    # FTS segment merging: one writer is enough
+    merge_interval = fts_config.get('merge_interval_seconds', 600)
+    if merge_interval:
+        start_fts_maintenance(merge_interval)
+
+    # Queued indexing: event writes only append to fts_pending; this thread applies it
+    if fts_config.get('async_indexing', False):
+        start_fts_indexer(
+            fts_config.get('index_interval_seconds', 1),
+            fts_config.get('max_lag_seconds', 30),
+        )
 
-@app.route('/pool-stats')
-def pool_stats():
-    """Endpoint to check connection pool statistics"""
-    pool = engine.pool
-    stats = {
-        'pool_size': pool.size(),
-        'checked_out': pool.checkedout(),
-        'overflow': pool.overflow(),
-        'checked_in': pool.checkedin(),
-        'total_connections': pool.size() + pool.overflow()
-    }
-    return jsonify(stats)
+    # event_day_count is only written here; /events/counts requests compute missing days in memory
+    fill_interval = (config.get('day_counts') or {}).get('fill_interval_seconds', 60)
+    if fill_interval:
+        start_day_count_filler(fill_interval)
+
+
+def register_background_work(app, config):
+    """Run start_background_work lazily in exactly one "all" worker.
+
+    Nothing starts in the factory, so no thread is alive when `gunicorn
+    --preload` forks. On a request, a worker tries a non-blocking flock on
+    BACKGROUND_LOCK_PATH; the winner keeps the file open and starts the
+    threads, the others retry every BACKGROUND_CLAIM_SECONDS so another
+    worker takes over when the owner exits (the kernel drops its lock).
+    """
+    state = {'lock_file': None, 'checked_at': None}
+    claim_lock = threading.Lock()
+
+    def due(now):
+        return state['lock_file'] is None and (
+            state['checked_at'] is None or now - state['checked_at'] >= BACKGROUND_CLAIM_SECONDS
+        )
+
+    @app.before_request
+    def claim_background_work():
+        now = time.monotonic()
+        if not due(now):
+            return
+        with claim_lock:
+            if not due(now):
+                return
+            state['checked_at'] = now
+            lock_file = open(BACKGROUND_LOCK_PATH, 'a')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    lock_file.close()
+                    return
+            state['lock_file'] = lock_file
+        try:
+            start_background_work(config)
+        except Exception as e:
+            logger.error("Starting background work failed: %s", e, exc_info=True)
+
+
+def create_app(role=None):
+    """Build the Flask app.
+
+    Safe with `gunicorn --preload`: read caches are filled here, then the
+    engine pool is emptied so no SQLite handle is open when workers fork
+    (database.py also drops inherited pool connections in each child). No
+    background thread is started here; see register_background_work.
+    """
+    config = load_config()
+    init_auth(config)
+    role = role or get_app_role(config)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = config.get('secret_key', 'dev-secret-key-change-in-production')
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    app.config['SESSION_COOKIE_SECURE'] = True
+    app.config['WTF_CSRF_TIME_LIMIT'] = None
+    app.config['APP_ROLE'] = role
+    app.config['RAW_READS'] = bool((config.get('database') or {}).get('raw_reads', False))
+    # Canonical origin for absolute links in shared caches (feeds, day fragments)
+    app.config['SITE_URL'] = (config.get('site_url') or DEFAULT_SITE_URL).rstrip('/')
+
+    # Set timezone to local timezone instead of UTC
+    app.config['LOCAL_TIMEZONE'] = pytz.timezone(config['timezone']['local'])
+
+    app.logger.setLevel(logging.ERROR)
+
+    CSRFProtect(app)
+
+    CORS(app,
+         origins=CORS_ORIGINS,
+         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+         allow_headers=['Content-Type', 'Authorization', 'X-CSRFToken', 'X-CSRF-Token'])
+
+    # Enable response compression
+    Compress(app)
+
+    init_assets(app)
+
+    init_database()
+
+    # Public workers skip migrations; the "all" role runs them once at boot
+    if role != ROLE_PUBLIC:
+        try:
+            migrate_database()
+        except Exception as e:
+            logger.error("Migration failed: %s", e, exc_info=True)
+        ensure_fts_setup(bool((config.get('fts') or {}).get('async_indexing', False)))
+
+        # Writer threads start after fork, in the one "all" worker that takes the lock file
+        register_background_work(app, config)
+
+    register_core_routes(app)
+
+    # Auth routes (login/logout) before admin
+    register_auth_routes(app)
+
+    if role != ROLE_PUBLIC:
+        register_admin_components(app)
+
+    # Register routes from other modules
+    register_events(app)
+    register_day_count_routes(app)
+    register_bootstrap_routes(app)
+    register_feed_routes(app)
+    register_fragment_routes(app)
+    register_search_routes(app)
+    register_typeahead_routes(app)
+
+    preload = config.get('preload') or {}
+    if preload.get('enabled', True):
+        preload_read_data(app, prime_cache=preload.get('prime_page_cache', False))
+
+    # Close the connections used during startup before any fork
+    engine.dispose()
+    raw_reads.close_connection()
+    return app
+
+
+app = create_app()
 
 # WSGI application
 application = app
@@ -0,0 +1,108 @@
+"""Fingerprinted static assets built by build_assets.py.
+
+The manifest is read once at startup; requests never stat or rebuild
+bundles. Without a manifest (fresh checkout, local dev) the templates get
+plain /static URLs for the source files instead.
+"""
+
+import json
+import logging
+import mimetypes
+import os
+
+from flask import abort, request, send_from_directory, url_for
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Logical asset name -> source files under static/ (bundles are concatenated)
+BUNDLES = {
+    'css/packed.css': [
+        'css/base.css',
+        'css/calendar.css',
+        'css/forms.css',
+        'css/widgets.css',
+        'css/venue.css',
+    ],
+    'js/widget.js': ['js/widget.js'],
+    'js/form.js': ['js/form.js'],
+}
+
+IMMUTABLE_MAX_AGE = 31536000
+
+# Preferred order when the client accepts several encodings
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Return the {name: {"file", "encodings"}} map, or None if assets are not built."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)['assets']
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError) as e:
+        logger.error("Invalid asset manifest %s: %s", path, e)
+        return None
+
+
+def accepted_encodings(header):
+    """Encodings named in Accept-Encoding, ignoring q=0 entries."""
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+def init_assets(app):
+    """Register the asset_url()/asset_urls() template globals and the /assets route."""
+    manifest = load_manifest()
+    app.config['ASSET_MANIFEST'] = manifest
+    if manifest is None:
+        logger.error("No asset manifest at %s; serving unbundled sources (run build_assets.py)", MANIFEST_PATH)
+
+    # Hashed filename -> encodings available on disk, fixed for the process lifetime
+    files = {}
+    if manifest:
+        for entry in manifest.values():
+            files[entry['file']] = tuple(entry.get('encodings', ()))
+
+    def asset_urls(name):
+        """URLs to include for a logical asset: one fingerprinted file, or its sources."""
+        if manifest and name in manifest:
+            return [url_for('dist_asset', filename=manifest[name]['file'])]
+        return [url_for('static', filename=source) for source in BUNDLES.get(name, [name])]
+
+    def asset_url(name):
+        return asset_urls(name)[0]
+
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.jinja_env.globals['asset_urls'] = asset_urls
+
+    @app.route('/assets/<path:filename>')
+    def dist_asset(filename):
+        """Serve a fingerprinted asset, precompressed when the client allows it."""
+        if filename not in files:
+            abort(404)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding = next((enc for enc, _ in ENCODING_SUFFIXES if enc in files[filename] and enc in accepted), None)
+        suffix = dict(ENCODING_SUFFIXES).get(encoding, '')
+
+        response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+        if encoding:
+            # Flask-Compress leaves responses with a Content-Encoding alone
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    return manifest
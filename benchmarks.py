@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Benchmarks for startup and request hot paths.
+
+Examples:
+    python benchmarks.py importtime
+    python benchmarks.py importtime --roles public all --top 15
+    python benchmarks.py reads --days 14 --repeat 50
+    python benchmarks.py search --queries 200
+    python benchmarks.py upcoming --limits 10 50 --horizon 90
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$')
+
+
+def run_importtime(role: str, module: str = 'app') -> List[Tuple[int, int, int, str]]:
+    """Import `module` in a fresh interpreter under -X importtime.
+
+    Returns (self_us, cumulative_us, depth, name) tuples in report order.
+    """
+    env = dict(os.environ, FLASK_EVENTS_ROLE=role)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASEDIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} failed for role {role!r}:\n{result.stderr[-2000:]}')
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name))
+    return rows
+
+
+def summarize_importtime(rows: List[Tuple[int, int, int, str]]) -> Dict[str, object]:
+    """Total import time plus self time grouped by top-level package."""
+    total_us = sum(self_us for self_us, _, _, _ in rows)
+    by_package: Dict[str, int] = defaultdict(int)
+    for self_us, _, _, name in rows:
+        by_package[name.split('.', 1)[0]] += self_us
+    direct = [(cumulative_us, name) for _, cumulative_us, depth, name in rows if depth == 1]
+    return {
+        'total_us': total_us,
+        'modules': len(rows),
+        'by_package': sorted(by_package.items(), key=lambda item: item[1], reverse=True),
+        'direct': sorted(direct, reverse=True),
+    }
+
+
+def bench_importtime(roles: List[str], top: int, repeat: int) -> None:
+    print('=== IMPORT TIME (-X importtime, import app) ===')
+    runs: Dict[str, list] = defaultdict(list)
+    # Interleave roles so disk cache and CPU frequency noise hits both evenly
+    for _ in range(repeat):
+        for role in roles:
+            runs[role].append(summarize_importtime(run_importtime(role)))
+    # Keep the fastest run: the first one also pays for .pyc compilation
+    summaries = {role: min(runs[role], key=lambda summary: summary['total_us']) for role in roles}
+
+    for role, summary in summaries.items():
+        print(f"\nRole '{role}': {summary['total_us'] / 1000:.1f} ms, {summary['modules']} modules")
+        print('  Top packages by self time:')
+        for package, self_us in summary['by_package'][:top]:
+            print(f'    {package:<28} {self_us / 1000:8.1f} ms')
+        print('  Direct imports of app (cumulative):')
+        for cumulative_us, name in summary['direct'][:top]:
+            print(f'    {name:<28} {cumulative_us / 1000:8.1f} ms')
+
+    if len(summaries) > 1:
+        baseline_role = roles[-1]
+        baseline = summaries[baseline_role]['total_us']
+        for role in roles[:-1]:
+            delta = baseline - summaries[role]['total_us']
+            print(f"\nRole '{role}' imports {delta / 1000:.1f} ms faster than '{baseline_role}'")
+
+
+def read_cases(days: int, months: int = 3):
+    """(label, builder) pairs: single days from yesterday on, plus month-grid ranges.
+
+    Grids are bootstrap.month_grid's (six Monday-first weeks), as the month view requests them.
+    """
+    import events
+    from bootstrap import month_grid
+
+    today = events._local_today()
+    cases = []
+    for offset in range(-1, days):
+        day = today + timedelta(days=offset)
+        cases.append((f'day {day}', lambda day=day: events.build_day_events(day)))
+    for months_ahead in range(months):
+        first = (today.replace(day=1) + timedelta(days=32 * months_ahead)).replace(day=1)
+        start, end = (datetime.combine(bound, datetime.min.time()) for bound in month_grid(first.year, first.month))
+        cases.append((f'range {start.date()}..{end.date()}',
+                      lambda start=start, end=end: events.build_range_events(start, end)))
+    return cases
+
+
+def _run_read_path(raw: bool, cases, repeat: int) -> Tuple[Dict[str, list], float]:
+    """Payloads per case, plus CPU seconds per cache-missing request."""
+    import events
+
+    events.USE_RAW_READS = raw
+    # Live series stay cached between requests in production; warm them once per mode
+    events.clear_event_caches()
+    events.warm_read_caches()
+
+    payloads = {label: build() for label, build in cases}
+    started = time.process_time()
+    for _ in range(repeat):
+        for _, build in cases:
+            build()
+    elapsed = time.process_time() - started
+    return payloads, elapsed / (repeat * len(cases))
+
+
+def bench_reads(days: int, repeat: int) -> int:
+    print('=== PUBLIC READS: ORM vs raw sqlite3 (cache misses) ===')
+    import events
+    import raw_reads
+
+    cases = read_cases(days)
+    orm_payloads, orm_cpu = _run_read_path(False, cases, repeat)
+    raw_payloads, raw_cpu = _run_read_path(True, cases, repeat)
+    raw_reads.close_connection()
+
+    mismatches = [label for label, _ in cases if orm_payloads[label] != raw_payloads[label]]
+    events_served = sum(len(payload) for payload in orm_payloads.values())
+    print(f'{len(cases)} requests ({events_served} events), {repeat} rounds each')
+    print(f'  ORM: {orm_cpu * 1e6:9.1f} us CPU/request')
+    print(f'  raw: {raw_cpu * 1e6:9.1f} us CPU/request')
+    if raw_cpu:
+        print(f'  speedup: {orm_cpu / raw_cpu:.2f}x')
+
+    from database import Venue
+    from venue_catalog import load_venue_catalog
+    with events.get_db_session() as session:
+        orm_venues = [events.venue_to_dict(v) for v in session.query(Venue).order_by(Venue.venue_type, Venue.name)]
+    if orm_venues != json.loads(load_venue_catalog().payload()):
+        mismatches.append('venues')
+
+    if mismatches:
+        print(f'MISMATCH between ORM and raw payloads: {", ".join(mismatches)}')
+        return 1
+    print('Payloads identical for every request.')
+    return 0
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_search(queries: int, seed: int) -> int:
+    print('=== /search LATENCY (FTS5 bm25 + snippets, first page) ===')
+    from sqlalchemy import text
+    from database import engine
+    from fts import build_match_query, fuzzy_search_events, search_event_page
+    import events
+
+    with engine.connect() as conn:
+        titles = [row[0] for row in conn.execute(text(
+            "SELECT title FROM event ORDER BY start_date DESC LIMIT 5000"
+        ))]
+    words = sorted({word.lower() for title in titles for word in re.findall(r'\w{3,}', title or '')})
+    if not words:
+        print('No event titles to sample search terms from.')
+        return 1
+
+    rng = random.Random(seed)
+    today = events._local_today()
+    cases = {
+        'all history': {},
+        'upcoming': {'date_from': today},
+    }
+    for label, filters in cases.items():
+        timings = []
+        hits = 0
+        for _ in range(queries):
+            # One whole word, or a word plus a typed-so-far prefix of another
+            raw = rng.choice(words)
+            if rng.random() < 0.5:
+                other = rng.choice(words)
+                raw = f'{raw} {other[:rng.randint(2, len(other))]}'
+            started = time.perf_counter()
+            results, _ = search_event_page(build_match_query(raw), **filters)
+            timings.append(time.perf_counter() - started)
+            hits += bool(results)
+        _print_search_latency(label, timings, hits, queries)
+
+    # One letter dropped from a word: what the trigram fallback has to recover
+    timings = []
+    hits = 0
+    for _ in range(queries):
+        word = rng.choice(words)
+        cut = rng.randrange(len(word))
+        raw = word[:cut] + word[cut + 1:]
+        started = time.perf_counter()
+        results = fuzzy_search_events(raw)
+        timings.append(time.perf_counter() - started)
+        hits += bool(results)
+    _print_search_latency('fuzzy typo', timings, hits, queries)
+    return 0
+
+
+def _print_search_latency(label, timings, hits, queries):
+    print(f'{label:<12} p50 {_percentile(timings, 50) * 1000:6.2f} ms   '
+          f'p95 {_percentile(timings, 95) * 1000:6.2f} ms   '
+          f'max {max(timings) * 1000:6.2f} ms   ({hits}/{queries} with results)')
+
+
+def _eager_upcoming(session, now, limit, horizon_days):
+    """The old approach: every one-off and every series instance in the horizon, sorted, sliced."""
+    import events
+    from database import Event
+
+    horizon_end = now + timedelta(days=horizon_days)
+    one_offs = session.query(Event).filter(
+        Event.is_recurring == False,
+        Event.end >= now,
+        Event.start <= horizon_end,
+    ).all()
+    expanded = []
+    for series in events.get_live_recurring_series(session, now.date() - timedelta(days=1)):
+        expanded.extend(
+            instance for instance in events.expand_recurring_events(series, now - (series.end - series.start), horizon_end)
+            if instance.end >= now and (series.recurring_until is None or instance.start.date() <= series.recurring_until)
+        )
+    occurrences = list(one_offs) + expanded
+    occurrences.sort(key=lambda x: (x.start, x.start_date, x.id))
+    return occurrences[:limit]
+
+
+def bench_upcoming(limits: List[int], horizon_days: int, repeat: int) -> int:
+    print('=== NEXT N OCCURRENCES: lazy heap merge vs full horizon expansion ===')
+    import events
+
+    now = events._local_now_naive()
+    mismatches = []
+    with events.get_db_session() as session:
+        events.get_live_recurring_series(session, now.date() - timedelta(days=1))
+        for limit in limits:
+            until = now + timedelta(days=horizon_days)
+            lazy = events.upcoming_occurrences(session, now, limit, until=until)
+            eager = _eager_upcoming(session, now, limit, horizon_days)
+            if [(e.start, e.id) for e in lazy] != [(e.start, e.id) for e in eager]:
+                mismatches.append(str(limit))
+
+            timings = {}
+            for label, run in (
+                ('lazy', lambda: events.upcoming_occurrences(session, now, limit, until=until)),
+                ('eager', lambda: _eager_upcoming(session, now, limit, horizon_days)),
+            ):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    run()
+                timings[label] = (time.perf_counter() - started) / repeat
+            print(f'limit {limit:<4} lazy {timings["lazy"] * 1000:7.2f} ms   eager {timings["eager"] * 1000:7.2f} ms')
+
+    if mismatches:
+        print(f'MISMATCH between lazy and eager results for limits: {", ".join(mismatches)}')
+        return 1
+    print('Same occurrences for every limit.')
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Flask Events benchmarks.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    importtime = subparsers.add_parser('importtime', help='Import-time breakdown per worker role')
+    importtime.add_argument('--roles', nargs='+', default=['public', 'all'], help='Roles to compare')
+    importtime.add_argument('--top', type=int, default=12, help='Rows to show per table')
+    importtime.add_argument('--repeat', type=int, default=5, help='Runs per role (fastest is kept)')
+
+    reads = subparsers.add_parser('reads', help='Check raw_reads matches the ORM and compare CPU per request')
+    reads.add_argument('--days', type=int, default=14, help='Days from today to request')
+    reads.add_argument('--repeat', type=int, default=20, help='Rounds over all requests')
+
+    search = subparsers.add_parser('search', help='p50/p95 latency of ranked /search pages')
+    search.add_argument('--queries', type=int, default=200, help='Random queries per case')
+    search.add_argument('--seed', type=int, default=1, help='Random seed for query sampling')
+
+    upcoming = subparsers.add_parser('upcoming', help='Next-N occurrence latency: lazy merge vs full expansion')
+    upcoming.add_argument('--limits', type=int, nargs='+', default=[10, 50], help='N values to compare')
+    upcoming.add_argument('--horizon', type=int, default=90, help='Days the eager path expands')
+    upcoming.add_argument('--repeat', type=int, default=20, help='Runs per measurement')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == 'importtime':
+        bench_importtime(args.roles, args.top, args.repeat)
+    elif args.command == 'reads':
+        return bench_reads(args.days, args.repeat)
+    elif args.command == 'search':
+        return bench_search(args.queries, args.seed)
+    elif args.command == 'upcoming':
+        return bench_upcoming(args.limits, args.horizon, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""First-paint payload for the widget, month page and WordPress plugin (/events/bootstrap).
+
+One response carries what a page otherwise fetches in three round-trips: the
+day list (/events?date=, or its rendered /events/fragment HTML), the slim
+events for the visible month grid
+(/events?start&end) and, optionally, the venue list (/venues). The parts come
+from the same caches those endpoints use, and the encoded body is cached with
+the exact objects it was built from: an entry is only served while the day
+listing, the range listing and the venue catalog snapshot are still the
+current cached ones, so clearing any of them (event or venue writes, TTL,
+catalog version bumps from other workers) retires the bootstrap with it and
+the three parts are always versioned together under one ETag.
+
+Server-rendered pages inline the same bytes (see inline_bootstrap), which are
+HTML-safe: '<', '>' and '&' are escaped inside JSON strings.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime, timedelta, time as dt_time
+
+from cacheout import Cache
+from flask import jsonify, request, session as flask_session
+from markupsafe import Markup
+
+from events import (
+    CACHE_TTL_SECONDS, _local_today, build_range_events, get_cached_calendar_events, get_cached_day_events,
+    get_day_events, set_cached_calendar_events,
+)
+from fragments import get_day_fragment
+from venue_catalog import get_venue_catalog
+
+# Initialize cache for encoded bootstrap payloads (anonymous visitors only)
+# Key format: (date_str or '', grid start ISO date or '', venues flag, neighborhood, fragment flag)
+# Value: (body bytes, etag, (day listing, range listing, venue catalog) the body was built from)
+bootstrap_cache = Cache(maxsize=60, ttl=CACHE_TTL_SECONDS)
+
+# dayGridMonth with firstDay: 1 always shows six Monday-first weeks
+GRID_DAYS = 42
+
+_HTML_UNSAFE = ((b'<', b'\\u003c'), (b'>', b'\\u003e'), (b'&', b'\\u0026'))
+
+
+def month_grid(year, month):
+    """(first, end) dates of the dayGridMonth grid for year/month; end is exclusive, as FullCalendar sends it."""
+    first_of_month = date(year, month, 1)
+    first = first_of_month - timedelta(days=first_of_month.weekday())
+    return first, first + timedelta(days=GRID_DAYS)
+
+
+def _range_listing(grid, use_cache):
+    # Same key and bounds as /events?start=<first>&end=<end>, so both share one cached listing
+    start_str, end_str = grid[0].isoformat(), grid[1].isoformat()
+    listing = get_cached_calendar_events(start_str, end_str) if use_cache else None
+    if listing is None:
+        listing = build_range_events(datetime.combine(grid[0], dt_time.min), datetime.combine(grid[1], dt_time.min))
+        if use_cache:
+            set_cached_calendar_events(start_str, end_str, listing)
+    return listing
+
+
+def _current_parts(key, use_cache):
+    day_str, grid_start = key[0], key[1]
+    day_listing = get_cached_day_events(day_str) if day_str and use_cache else None
+    range_listing = None
+    if grid_start and use_cache:
+        grid_end = (date.fromisoformat(grid_start) + timedelta(days=GRID_DAYS)).isoformat()
+        range_listing = get_cached_calendar_events(grid_start, grid_end)
+    return day_listing, range_listing
+
+
+def _encode(payload):
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    for unsafe, escaped in _HTML_UNSAFE:
+        body = body.replace(unsafe, escaped)
+    return body
+
+
+def get_bootstrap(day=None, grid=None, venues=False, neighborhood='', fragment=False):
+    """(body bytes, etag) for the day list of `day`, the month grid `grid` ((first, end) dates) and venues.
+
+    Parts left as None/False are omitted; fragment=True sends the day list as rendered HTML.
+    Logged-in admins always get a fresh build.
+    """
+    use_cache = not flask_session.get('logged_in')
+    key = (
+        day.isoformat() if day else '', grid[0].isoformat() if grid else '', bool(venues), neighborhood, bool(fragment),
+    )
+    catalog = get_venue_catalog()
+    cached = bootstrap_cache.get(key) if use_cache else None
+    if cached is not None:
+        body, etag, parts = cached
+        day_listing, range_listing = _current_parts(key, use_cache)
+        if (parts[0] is day_listing or day is None) and (parts[1] is range_listing or grid is None) \
+                and parts[2] is catalog:
+            return body, etag
+
+    payload = {}
+    day_listing = range_listing = None
+    if day is not None:
+        day_listing = get_day_events(day, use_cache)
+        payload['date'] = day.isoformat()
+        if fragment:
+            payload['html'] = get_day_fragment(day, use_cache)[0].decode('utf-8')
+        else:
+            payload['events'] = day_listing
+    if grid is not None:
+        range_listing = _range_listing(grid, use_cache)
+        payload['month'] = {'start': grid[0].isoformat(), 'end': grid[1].isoformat(), 'events': range_listing}
+    if venues:
+        payload['venues'] = [record._asdict() for record in catalog.filtered(neighborhood)]
+
+    body = _encode(payload)
+    etag = hashlib.sha1(body).hexdigest()
+    if use_cache:
+        bootstrap_cache.set(key, (body, etag, (day_listing, range_listing, catalog)))
+    return body, etag
+
+
+def inline_bootstrap(day=None, grid=None):
+    """Bootstrap JSON for a <script type="application/json"> block in a server-rendered page."""
+    body, _ = get_bootstrap(day, grid)
+    return Markup(body.decode('utf-8'))
+
+
+def clear_bootstrap_cache():
+    """Drop every encoded payload (entries also retire on their own when a part is replaced)"""
+    bootstrap_cache.clear()
+
+
+def register_bootstrap_routes(app):
+    """One-request first paint for the day list, month grid and venue list"""
+
+    @app.route('/events/bootstrap')
+    def events_bootstrap():
+        """Query params: date (YYYY-MM-DD, default today), month (YYYY-MM grid to include, default the
+        date's month; 0 to omit), venues=1 to add the venue list (neighborhood filters it),
+        fragment=1 to send the day list as /events/fragment HTML."""
+        try:
+            day = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') \
+                else _local_today()
+            month = request.args.get('month', '').strip()
+            if month == '0':
+                grid = None
+            elif month:
+                year, month_number = (int(part) for part in month.split('-'))
+                grid = month_grid(year, month_number)
+            else:
+                grid = month_grid(day.year, day.month)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'date must be YYYY-MM-DD and month YYYY-MM or 0'}), 400
+        venues = request.args.get('venues') == '1'
+        neighborhood = request.args.get('neighborhood', '').strip() if venues else ''
+
+        body, etag = get_bootstrap(day, grid, venues, neighborhood, request.args.get('fragment') == '1')
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        if flask_session.get('logged_in'):
+            response.headers['Cache-Control'] = 'private, no-store'
+        else:
+            response.headers['Cache-Control'] = 'public, max-age=300'
+        response.headers['Vary'] = 'Accept-Encoding, Cookie'
+        return response.make_conditional(request)
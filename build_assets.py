@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Build fingerprinted static assets into static/dist.
+
+Run at deploy time (and after editing anything in static/css or static/js):
+
+    python build_assets.py
+
+CSS bundles are minified with cssmin; every output is named by its content
+hash and written alongside .gz and .br copies plus manifest.json, which
+assets.py loads at startup.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+import cssmin
+
+try:
+    import brotli
+except ImportError:  # .br files are optional; gzip covers every client
+    brotli = None
+
+from assets import BUNDLES, DIST_DIR, MANIFEST_PATH, STATIC_DIR
+
+HASH_LENGTH = 12
+
+# Skip precompressing files this small; the headers outweigh the savings
+MIN_COMPRESS_BYTES = 256
+
+
+def read_bundle(sources):
+    parts = []
+    for source in sources:
+        with open(os.path.join(STATIC_DIR, source), 'r', encoding='utf-8') as f:
+            parts.append(f.read())
+    return '\n'.join(parts)
+
+
+def fingerprint(name, content):
+    """packed.css + content -> packed.<hash>.css"""
+    stem, ext = os.path.splitext(os.path.basename(name))
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f'{stem}.{digest}{ext}'
+
+
+def write_file(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def build_asset(name, sources):
+    """Write one asset and its compressed copies; return its manifest entry."""
+    text = read_bundle(sources)
+    if name.endswith('.css'):
+        text = cssmin.cssmin(text)
+    content = text.encode('utf-8')
+
+    filename = fingerprint(name, content)
+    write_file(os.path.join(DIST_DIR, filename), content)
+
+    encodings = []
+    if len(content) >= MIN_COMPRESS_BYTES:
+        if brotli is not None:
+            write_file(os.path.join(DIST_DIR, filename + '.br'), brotli.compress(content, quality=11))
+            encodings.append('br')
+        # mtime=0 keeps the .gz bytes identical across builds
+        write_file(os.path.join(DIST_DIR, filename + '.gz'), gzip.compress(content, compresslevel=9, mtime=0))
+        encodings.append('gzip')
+
+    return {'file': filename, 'sources': sources, 'bytes': len(content), 'encodings': encodings}
+
+
+def remove_stale(keep):
+    """Delete outputs from earlier builds that the new manifest no longer references."""
+    for entry in os.listdir(DIST_DIR):
+        if entry == os.path.basename(MANIFEST_PATH):
+            continue
+        base = entry
+        for suffix in ('.br', '.gz'):
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        if base not in keep:
+            os.remove(os.path.join(DIST_DIR, entry))
+
+
+def build_assets():
+    os.makedirs(DIST_DIR, exist_ok=True)
+    manifest = {name: build_asset(name, sources) for name, sources in BUNDLES.items()}
+    remove_stale({entry['file'] for entry in manifest.values()})
+
+    tmp_path = MANIFEST_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': 1, 'assets': manifest}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+    return manifest
+
+
+def main():
+    try:
+        manifest = build_assets()
+    except OSError as e:
+        print(f"Asset build failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for name, entry in sorted(manifest.items()):
+        encodings = ', '.join(entry['encodings']) or 'uncompressed'
+        print(f"{name:<18} -> dist/{entry['file']} ({entry['bytes']} bytes; {encodings})")
+    if brotli is None:
+        print("brotli not installed: skipped .br files", file=sys.stderr)
+    print(f"Wrote {MANIFEST_PATH}; restart the app to pick up new asset URLs.")
+
+
+if __name__ == '__main__':
+    main()
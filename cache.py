@@ -33,10 +33,24 @@ def register_cache_routes(app):
                 'keys': list(calendar_events_cache.keys())[:20]  # Show first 20 keys
             }
             
+            from fts import search_cache, current_search_generation
+
+            search_info = search_cache.stats.info()
+            search_stats = {
+                'maxsize': search_cache.maxsize,
+                'ttl': search_cache.ttl,
+                'size': len(search_cache),
+                'hits': search_info.hit_count,
+                'misses': search_info.miss_count,
+                'hit_rate': round(search_info.hit_rate, 3),
+                'generation': current_search_generation(),
+            }
+            
             return jsonify({
                 'day_events_cache': day_stats,
                 'calendar_events_cache': calendar_stats,
-                'total_cached_items': len(day_events_cache) + len(calendar_events_cache)
+                'search_cache': search_stats,
+                'total_cached_items': len(day_events_cache) + len(calendar_events_cache) + len(search_cache)
             })
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -71,11 +85,21 @@ def register_cache_routes(app):
     def clear_cache():
         """Clear all caches"""
         try:
-            from events import day_events_cache, calendar_events_cache
+            from bootstrap import clear_bootstrap_cache
+            from events import clear_event_caches, clear_form_categories, clear_venues_cache
+            from facets import clear_category_index
+            from feeds import clear_feed_cache
+            from fragments import clear_day_fragment_cache
+            from fts import clear_search_cache
             
-            # Clear both caches directly
-            day_events_cache.clear()
-            calendar_events_cache.clear()
+            clear_category_index()
+            clear_form_categories()
+            clear_event_caches()
+            clear_venues_cache()
+            clear_search_cache()
+            clear_bootstrap_cache()
+            clear_feed_cache()
+            clear_day_fragment_cache()
             
             return jsonify({
                 'success': True,
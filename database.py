@@ -1,7 +1,8 @@
 import logging
 import os
 import yaml
-from sqlalchemy import create_engine, text, PrimaryKeyConstraint, Column, String, Float, DateTime, Integer, Date, ForeignKey, Text, Index, Boolean, Table
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, text, Computed, PrimaryKeyConstraint, ForeignKeyConstraint, Column, String, Float, DateTime, Integer, Date, ForeignKey, Text, Index, Boolean, Table
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base, relationship
 
 logger = logging.getLogger(__name__)
@@ -11,7 +12,10 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 
 
 def _resolve_db_path():
-    """Resolve SQLite path from config.yaml (relative paths are basedir-relative)."""
+    """Resolve SQLite path from FLASK_EVENTS_DB, then config.yaml (relative paths are basedir-relative)."""
+    path = os.environ.get('FLASK_EVENTS_DB')
+    if path:
+        return path if os.path.isabs(path) else os.path.join(basedir, path)
     config_path = os.path.join(basedir, 'config.yaml')
     path = 'events.db'
     try:
@@ -27,6 +31,77 @@ def _resolve_db_path():
 
 db_path = _resolve_db_path()
 
+# Single integer key per event: days since 1970-01-01 in the high bits, the
+# per-date id in the low 20. Stable across VACUUM (unlike rowid); used as the
+# FTS rowid.
+EVENT_KEY_ID_BITS = 20
+EVENT_KEY_ID_MASK = (1 << EVENT_KEY_ID_BITS) - 1
+EVENT_KEY_SQL = f"CAST(julianday(start_date) - 2440587.5 AS INTEGER) * {1 << EVENT_KEY_ID_BITS} + id"
+EPOCH_DATE = date(1970, 1, 1)
+
+
+def encode_event_key(start_date, event_id):
+    """Python equivalent of the event.event_key generated column."""
+    return ((start_date - EPOCH_DATE).days << EVENT_KEY_ID_BITS) + event_id
+
+
+def decode_event_key(event_key):
+    """event_key -> (start_date, id)."""
+    return EPOCH_DATE + timedelta(days=event_key >> EVENT_KEY_ID_BITS), event_key & EVENT_KEY_ID_MASK
+
+# event_span: an R*Tree (32-bit integer coordinates) over [start, end] in
+# minutes since 1970 (local wall time, like the stored columns). It holds
+# only one-off events that run past midnight, so "what is still going on at
+# D" is one interval lookup whatever the event's length.
+EVENT_SPAN_SQL = (
+    "{row}.event_key, CAST(strftime('%s', {row}.start) AS INTEGER) / 60, "
+    "(CAST(strftime('%s', {row}.\"end\") AS INTEGER) + 59) / 60"
+)
+EVENT_SPANS_MIDNIGHT_SQL = "COALESCE({row}.is_recurring, 0) = 0 AND date({row}.\"end\") > date({row}.start)"
+EPOCH_DATETIME = datetime(1970, 1, 1)
+
+
+def event_minute(value):
+    """Naive local datetime -> whole minutes since 1970, as stored in event_span (rounded down)."""
+    return int((value - EPOCH_DATETIME).total_seconds()) // 60
+
+# event_day_count invalidation: the days from an event's start_date to its last
+# day (open-ended for series: their instances aren't clipped to recurring_until)
+EVENT_LAST_DAY_SQL = "CASE WHEN COALESCE({row}.is_recurring, 0) = 1 THEN '9999-12-31' ELSE date({row}.\"end\") END"
+EVENT_DAY_COUNT_BUMP_SQL = "UPDATE catalog_version SET version = version + 1 WHERE name = 'event_day_count'"
+
+
+def _event_day_count_drop(row):
+    return f"DELETE FROM event_day_count WHERE day BETWEEN {row}.start_date AND {EVENT_LAST_DAY_SQL.format(row=row)}"
+
+# Subscription feed versions (feeds.py): catalog_version rows 'feed' (every feed),
+# 'feed:venue:<id>' and 'feed:category:<id>', created by the first write that bumps them
+FEED_BUMP_ALL_SQL = "UPDATE catalog_version SET version = version + 1 WHERE name = 'feed' OR name LIKE 'feed:%'"
+
+
+def _feed_bump(names_sql):
+    """Upsert-bump the catalog_version rows named by names_sql (a SELECT ... AS name; NULLs skipped)."""
+    return (
+        f"INSERT INTO catalog_version (name, version) SELECT name, 1 FROM ({names_sql}) WHERE name IS NOT NULL "
+        "ON CONFLICT(name) DO UPDATE SET version = version + 1"
+    )
+
+
+def _feed_event_names(row):
+    return (
+        f"SELECT 'feed' AS name UNION SELECT 'feed:venue:' || {row}.venue_id "
+        f"UNION SELECT 'feed:category:' || category_id FROM event_category "
+        f"WHERE start_date = {row}.start_date AND event_id = {row}.id"
+    )
+
+
+def _feed_link_names(row):
+    return (
+        f"SELECT 'feed' AS name UNION SELECT 'feed:category:' || {row}.category_id "
+        f"UNION SELECT 'feed:venue:' || venue_id FROM event WHERE start_date = {row}.start_date AND id = {row}.event_id"
+    )
+
+
 # Add connection pooling for better performance
 engine = create_engine(
     f'sqlite:///{db_path}', 
@@ -38,6 +113,16 @@ engine = create_engine(
 ) 
 
 
+def _dispose_engine_after_fork():
+    """Forked workers must not reuse the parent's pooled SQLite handles."""
+    # close=False: drop the inherited connections without closing the parent's sockets/files
+    engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engine_after_fork)
+
+
 def configure_database():
     # Check if database exists and is empty
     db_exists = os.path.exists(db_path)
@@ -118,6 +203,14 @@ def migrate_database():
                     ALTER TABLE event ADD COLUMN categories TEXT DEFAULT ''
                 """))
                 conn.commit()
+
+            # table_info omits generated columns; table_xinfo lists them
+            all_column_names = [col[1] for col in conn.execute(text("PRAGMA table_xinfo(event)")).fetchall()]
+            if 'event_key' not in all_column_names:
+                conn.execute(text(
+                    f"ALTER TABLE event ADD COLUMN event_key INTEGER GENERATED ALWAYS AS ({EVENT_KEY_SQL}) VIRTUAL"
+                ))
+                conn.commit()
         
         # Insert default categories if they don't exist
         default_categories = [
@@ -170,11 +263,131 @@ def migrate_database():
                 conn.execute(text("ALTER TABLE venue ADD COLUMN venue_type VARCHAR(100)"))
                 conn.commit()
 
+        # Per-date id counter; seeded from existing events the first time it is empty
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS event_id_counter (
+                start_date DATE NOT NULL PRIMARY KEY,
+                next_id INTEGER NOT NULL
+            )
+        """))
+        counter_seeded = conn.execute(text("SELECT 1 FROM event_id_counter LIMIT 1")).fetchone()
+        if event_table_exists and not counter_seeded:
+            conn.execute(text("""
+                INSERT INTO event_id_counter (start_date, next_id)
+                SELECT start_date, MAX(id) + 1 FROM event WHERE id IS NOT NULL GROUP BY start_date
+            """))
+        conn.commit()
+
         # Indexes for hot-path lookups (create_all won't add these to existing DBs)
         if event_table_exists:
             conn.execute(text(
                 "CREATE INDEX IF NOT EXISTS idx_venue_id ON event(venue_id)"
             ))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_event_key ON event(event_key)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_event_start_key ON event(start, start_date, id)"
+            ))
+            conn.commit()
+
+            # Interval index over one-off events that run past midnight; see EVENT_SPAN_SQL
+            span_table_exists = conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='event_span'"
+            )).fetchone()
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS event_span USING rtree_i32(event_key, start_minute, end_minute)"
+            ))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS event_span_ai AFTER INSERT ON event
+                WHEN {EVENT_SPANS_MIDNIGHT_SQL.format(row='new')} BEGIN
+                    INSERT OR REPLACE INTO event_span VALUES ({EVENT_SPAN_SQL.format(row='new')});
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS event_span_au AFTER UPDATE OF start_date, id, start, "end", is_recurring ON event
+                BEGIN
+                    DELETE FROM event_span WHERE event_key = old.event_key;
+                    INSERT OR REPLACE INTO event_span
+                    SELECT {EVENT_SPAN_SQL.format(row='new')} WHERE {EVENT_SPANS_MIDNIGHT_SQL.format(row='new')};
+                END
+            """))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS event_span_ad AFTER DELETE ON event BEGIN
+                    DELETE FROM event_span WHERE event_key = old.event_key;
+                END
+            """))
+            if not span_table_exists:
+                conn.execute(text(f"""
+                    INSERT OR REPLACE INTO event_span
+                    SELECT {EVENT_SPAN_SQL.format(row='event')} FROM event
+                    WHERE {EVENT_SPANS_MIDNIGHT_SQL.format(row='event')}
+                """))
+            conn.commit()
+
+            # Normalized event <-> category links; see event_category below
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS event_category (
+                    start_date DATE NOT NULL,
+                    event_id INTEGER NOT NULL,
+                    category_id INTEGER NOT NULL REFERENCES category(id) ON DELETE CASCADE,
+                    PRIMARY KEY (start_date, event_id, category_id),
+                    FOREIGN KEY (start_date, event_id) REFERENCES event(start_date, id)
+                        ON DELETE CASCADE ON UPDATE CASCADE
+                ) WITHOUT ROWID
+            """))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_event_category_category "
+                "ON event_category(category_id, start_date, event_id)"
+            ))
+            # foreign_keys is per connection and not on everywhere; the triggers do the cascades
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS event_category_au AFTER UPDATE OF start_date, id ON event
+                WHEN old.start_date IS NOT new.start_date OR old.id IS NOT new.id BEGIN
+                    UPDATE event_category SET start_date = new.start_date, event_id = new.id
+                    WHERE start_date = old.start_date AND event_id = old.id;
+                END
+            """))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS event_category_ad AFTER DELETE ON event BEGIN
+                    DELETE FROM event_category WHERE start_date = old.start_date AND event_id = old.id;
+                END
+            """))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS category_links_ad AFTER DELETE ON category BEGIN
+                    DELETE FROM event_category WHERE category_id = old.id;
+                END
+            """))
+            # category.usage_count = number of linked events, kept in step by the link triggers
+            usage_triggers_exist = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'category_usage_ai'"
+            )).fetchone()
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS category_usage_ai AFTER INSERT ON event_category BEGIN
+                    UPDATE category SET usage_count = usage_count + 1 WHERE id = new.category_id;
+                END
+            """))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS category_usage_au AFTER UPDATE OF category_id ON event_category
+                WHEN old.category_id IS NOT new.category_id BEGIN
+                    UPDATE category SET usage_count = usage_count - 1 WHERE id = old.category_id;
+                    UPDATE category SET usage_count = usage_count + 1 WHERE id = new.category_id;
+                END
+            """))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS category_usage_ad AFTER DELETE ON event_category BEGIN
+                    UPDATE category SET usage_count = usage_count - 1 WHERE id = old.category_id;
+                END
+            """))
+            if not usage_triggers_exist:
+                recompute_category_usage(conn)
+            # Labels are derived from the links, so labels without any links mean legacy rows
+            needs_backfill = conn.execute(text(
+                "SELECT NOT EXISTS (SELECT 1 FROM event_category) "
+                "AND EXISTS (SELECT 1 FROM event WHERE COALESCE(categories, '') != '')"
+            )).scalar()
+            if needs_backfill:
+                _backfill_event_categories(conn)
             conn.commit()
 
         if venue_table_exists:
@@ -186,9 +399,201 @@ def migrate_database():
             ))
             conn.commit()
 
+            # Version counter read by venue_catalog; every venue write bumps it
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS catalog_version (
+                    name TEXT NOT NULL PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """))
+            conn.execute(text("INSERT OR IGNORE INTO catalog_version (name, version) VALUES ('venue', 1)"))
+            for trigger, operation in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')):
+                conn.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS venue_version_{trigger} AFTER {operation} ON venue BEGIN
+                        UPDATE catalog_version SET version = version + 1 WHERE name = 'venue';
+                    END
+                """))
+            conn.commit()
+
+        if event_table_exists and venue_table_exists:
+            # Per-day counts for /events/counts (day_counts.py), filled on demand. The
+            # triggers drop every day a write can touch and bump the version, so a
+            # fill computed before the write is never stored.
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS event_day_count (
+                    day DATE NOT NULL,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (day, kind, value)
+                ) WITHOUT ROWID
+            """))
+            conn.execute(text(
+                "INSERT OR IGNORE INTO catalog_version (name, version) VALUES ('event_day_count', 1)"
+            ))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS event_day_count_ai AFTER INSERT ON event BEGIN
+                    {_event_day_count_drop('new')};
+                    {EVENT_DAY_COUNT_BUMP_SQL};
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS event_day_count_au
+                AFTER UPDATE OF start_date, id, start, "end", venue_id, rrule, is_recurring, recurring_until ON event
+                BEGIN
+                    {_event_day_count_drop('old')};
+                    {_event_day_count_drop('new')};
+                    {EVENT_DAY_COUNT_BUMP_SQL};
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS event_day_count_ad AFTER DELETE ON event BEGIN
+                    {_event_day_count_drop('old')};
+                    {EVENT_DAY_COUNT_BUMP_SQL};
+                END
+            """))
+            # Category links drop their event's days (an unlink after the event is gone drops nothing)
+            for trigger, operation, row in (('ai', 'INSERT', 'new'), ('ad', 'DELETE', 'old')):
+                last_day = (
+                    f"(SELECT {EVENT_LAST_DAY_SQL.format(row='e')} FROM event e "
+                    f"WHERE e.start_date = {row}.start_date AND e.id = {row}.event_id)"
+                )
+                conn.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS event_day_count_link_{trigger} AFTER {operation} ON event_category BEGIN
+                        DELETE FROM event_day_count WHERE day BETWEEN {row}.start_date AND {last_day};
+                        {EVENT_DAY_COUNT_BUMP_SQL};
+                    END
+                """))
+            # Neighborhood splits of any day can change; venue edits are rare, so start over
+            for trigger, operation in (('au', 'UPDATE OF neighborhood'), ('ad', 'DELETE')):
+                conn.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS event_day_count_venue_{trigger} AFTER {operation} ON venue BEGIN
+                        DELETE FROM event_day_count;
+                        {EVENT_DAY_COUNT_BUMP_SQL};
+                    END
+                """))
+
+            # Feed versions: an event write bumps the combined feed and its venue's and
+            # categories' feeds (old and new on a move); a link bumps its category's
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS feed_version_ai AFTER INSERT ON event BEGIN
+                    {_feed_bump(_feed_event_names('new'))};
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS feed_version_au AFTER UPDATE ON event BEGIN
+                    {_feed_bump(_feed_event_names('old'))};
+                    {_feed_bump(_feed_event_names('new'))};
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS feed_version_ad AFTER DELETE ON event BEGIN
+                    {_feed_bump(_feed_event_names('old'))};
+                END
+            """))
+            for trigger, operation, row in (('ai', 'INSERT', 'new'), ('ad', 'DELETE', 'old')):
+                conn.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS feed_version_link_{trigger} AFTER {operation} ON event_category BEGIN
+                        {_feed_bump(_feed_link_names(row))};
+                    END
+                """))
+            # Category names appear in every feed; renames are rare, so bump them all
+            # (venue writes replace the venue catalog snapshot, which feeds.py checks)
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS feed_version_category_au AFTER UPDATE OF name ON category BEGIN
+                    {FEED_BUMP_ALL_SQL};
+                END
+            """))
+            conn.commit()
+
     from migrate_venue_neighborhoods import migrate_venue_neighborhoods
     migrate_venue_neighborhoods()
 
+# Display label for Event.categories: linked category names, sorted, joined with ', '
+CATEGORY_LABEL_SQL = """COALESCE((
+    SELECT group_concat(name, ', ') FROM (
+        SELECT c.name FROM event_category ec JOIN category c ON c.id = ec.category_id
+        WHERE ec.start_date = event.start_date AND ec.event_id = event.id ORDER BY c.name
+    )
+), '')"""
+
+
+INSERT_EVENT_CATEGORY_SQL = text("""
+    INSERT OR IGNORE INTO event_category (start_date, event_id, category_id)
+    VALUES (:start_date, :event_id, :category_id)
+""")
+
+
+def _backfill_event_categories(conn):
+    """Links for pre-event_category rows: "3,7" ids (event form) or "A, B" names (admin, importer)."""
+    ids_by_token = {}
+    for category_id, name in conn.execute(text("SELECT id, name FROM category")).fetchall():
+        ids_by_token[str(category_id)] = category_id
+        ids_by_token[name.lower()] = category_id
+
+    links = []
+    rows = conn.execute(text(
+        "SELECT start_date, id, categories FROM event WHERE COALESCE(categories, '') != ''"
+    )).fetchall()
+    for start_date, event_id, categories in rows:
+        for token in categories.split(','):
+            token = token.strip()
+            if not token:
+                continue
+            category_id = ids_by_token.get(token.lower())
+            if category_id is None and not token.isdigit():
+                # Imported names that were never added to the category table
+                category_id = conn.execute(text(
+                    "INSERT INTO category (name, usage_count, is_active) VALUES (:name, 0, 1) RETURNING id"
+                ), {"name": token[:100]}).scalar()
+                ids_by_token[token.lower()] = category_id
+            if category_id is not None:
+                links.append({"start_date": start_date, "event_id": event_id, "category_id": category_id})
+    if links:
+        conn.execute(INSERT_EVENT_CATEGORY_SQL, links)
+
+    # Rewrite the labels to the canonical form (unknown ids drop out)
+    conn.execute(text(f"""
+        UPDATE event SET categories = {CATEGORY_LABEL_SQL}
+        WHERE COALESCE(categories, '') != ''
+    """))
+
+
+def recompute_category_usage(conn):
+    """Recount every category.usage_count from event_category (covering index only)."""
+    conn.execute(text("""
+        UPDATE category SET usage_count = (
+            SELECT COUNT(*) FROM event_category WHERE category_id = category.id
+        )
+    """))
+
+
+def refresh_category_labels(conn, event_keys):
+    """Recompute Event.categories for (start_date, event_id) pairs, e.g. after a category rename."""
+    params = [{"start_date": start_date, "event_id": event_id} for start_date, event_id in event_keys]
+    if params:
+        conn.execute(text(f"""
+            UPDATE event SET categories = {CATEGORY_LABEL_SQL}
+            WHERE start_date = :start_date AND id = :event_id
+        """), params)
+
+
+def prime_page_cache(days_back=7, days_ahead=60):
+    """Read the hot date window so its pages sit in the OS cache shared by all workers."""
+    today = date.today()
+    with engine.connect() as conn:
+        conn.execute(text("""
+            SELECT COUNT(*), SUM(LENGTH(title)), SUM(LENGTH(description)) FROM event
+            WHERE start_date BETWEEN :start AND :end
+        """), {
+            "start": today - timedelta(days=days_back),
+            "end": today + timedelta(days=days_ahead),
+        }).fetchone()
+        conn.execute(text("""
+            SELECT COUNT(*), SUM(LENGTH(rrule)) FROM event WHERE is_recurring = 1
+        """)).fetchone()
+        conn.execute(text("SELECT COUNT(*), SUM(LENGTH(name)) FROM venue")).fetchone()
+
 def check_database_stats():
     with engine.connect() as conn:
         # Get page count and free pages
@@ -208,11 +613,11 @@ Base = declarative_base()
 SessionLocal = sessionmaker(bind=engine)
 AdminSession = scoped_session(SessionLocal)
 
-# Configure and initialize database
-configure_database()
-optimize_database()
 
-Base.metadata.create_all(engine)  # Create all tables first
+def init_database():
+    """Configure and initialize database (called by the app factory, not at import)."""
+    configure_database()
+    optimize_database()
 
 # Simple Category model for managing available categories
 class Category(Base):
@@ -230,6 +635,23 @@ class Category(Base):
         if self.is_active is None:
             self.is_active = True
 
+# Event <-> category links: the source of truth for category filters and counts.
+# WITHOUT ROWID keeps the rows in the primary key b-tree, so an event's
+# categories are one range read, and idx_event_category_category covers
+# "events in category X" and per-category counts without touching event.
+event_category = Table(
+    'event_category', Base.metadata,
+    Column('start_date', Date, primary_key=True),
+    Column('event_id', Integer, primary_key=True),
+    Column('category_id', Integer, ForeignKey('category.id', ondelete='CASCADE'), primary_key=True),
+    ForeignKeyConstraint(
+        ['start_date', 'event_id'], ['event.start_date', 'event.id'],
+        ondelete='CASCADE', onupdate='CASCADE',
+    ),
+    Index('idx_event_category_category', 'category_id', 'start_date', 'event_id'),
+    sqlite_with_rowid=False,
+)
+
 # Event model (updated)
 class Event(Base):
     __tablename__ = 'event'
@@ -256,10 +678,17 @@ class Event(Base):
     is_hybrid = Column(Boolean, default=False)
     url = Column(String(500))  # General URL for any event (website, Facebook page, virtual meeting, etc.)
     
-    # Add categories as a comma-separated list
+    # Display label ("A, B": sorted category names); written with category_list by set_event_categories
     categories = Column(Text, default='')
+
+    # Virtual (not stored) column computed from the composite key; see encode_event_key
+    event_key = Column(Integer, Computed(EVENT_KEY_SQL, persisted=False))
     
     venue = relationship("Venue", back_populates="events")
+    # Link rows go with the event via the event_category_ad/au triggers
+    category_list = relationship(
+        "Category", secondary=event_category, order_by=Category.name, passive_deletes=True,
+    )
     
     # Define composite primary key and indexes
     __table_args__ = (
@@ -268,6 +697,8 @@ class Event(Base):
         Index('idx_recurring', 'is_recurring', 'recurring_until'),  # Index for recurring queries
         Index('idx_virtual', 'is_virtual', 'is_hybrid'),  # Index for virtual/hybrid queries
         Index('idx_venue_id', 'venue_id'),
+        Index('idx_event_key', 'event_key', unique=True),
+        Index('idx_event_start_key', 'start', 'start_date', 'id'),  # Admin keyset pagination by start
     )
     
     def __init__(self, **kwargs):
@@ -276,18 +707,6 @@ class Event(Base):
         if self.start:
             self.start_date = self.start.date()
 
-# FTS5 virtual table for full-text search
-class EventFTS(Base):
-    __tablename__ = 'event_fts'
-    
-    id = Column(Integer, primary_key=True)
-    title = Column(String)
-    description = Column(Text)
-    
-    __table_args__ = (
-        {'sqlite_autoincrement': True},
-    )
-
 # Venue model
 class Venue(Base):
     __tablename__ = 'venue'
@@ -309,12 +728,30 @@ class Venue(Base):
         Index('idx_venue_type', 'venue_type'),
     )
 
-# Add this after the SessionLocal definition
+# Per-date id allocator: next_id is the next unused event id for start_date
+class EventIdCounter(Base):
+    __tablename__ = 'event_id_counter'
+
+    start_date = Column(Date, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+# Atomic: the upsert takes the write lock, so concurrent writers serialize here
+# and never hand out the same (start_date, id) twice
+RESERVE_EVENT_IDS_SQL = text("""
+    INSERT INTO event_id_counter (start_date, next_id) VALUES (:start_date, :count + 1)
+    ON CONFLICT(start_date) DO UPDATE SET next_id = next_id + :count
+    RETURNING next_id
+""")
+
+def reserve_event_ids(session, start_date, count=1):
+    """Reserve `count` consecutive ids for start_date; returns the first one."""
+    # No autoflush: a pending event without its id yet must not be inserted first
+    with session.no_autoflush:
+        next_id = session.execute(RESERVE_EVENT_IDS_SQL, {"start_date": start_date, "count": count}).scalar()
+    return next_id - count
+
 def get_next_event_id(session, start_date):
-    # Get the max ID for the specific date
-    query = text("SELECT MAX(id) FROM event WHERE start_date = :start_date")
-    result = session.execute(query, {"start_date": start_date}).scalar()
-    return (result or 0) + 1
+    return reserve_event_ids(session, start_date)
 
 def get_next_event_ids(session, events):
     # Group events by date
@@ -324,9 +761,19 @@ def get_next_event_ids(session, events):
             date_to_events[event.start_date] = []
         date_to_events[event.start_date].append(event)
     
-    # Assign IDs for each date
+    # Reserve one block of IDs per date
     for start_date, date_events in date_to_events.items():
-        next_id = get_next_event_id(session, start_date)
+        next_id = reserve_event_ids(session, start_date, len(date_events))
         for event in date_events:
             event.id = next_id
             next_id += 1
+
+def category_label(names):
+    """Event.categories label for category names (sorted, as CATEGORY_LABEL_SQL builds it)."""
+    return ', '.join(sorted(set(names)))
+
+def set_event_categories(event, categories):
+    """Link event to exactly these Category rows and refresh its label."""
+    categories = sorted(set(categories), key=lambda category: category.name)
+    event.category_list = categories
+    event.categories = category_label(category.name for category in categories)
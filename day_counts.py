@@ -0,0 +1,293 @@
+"""Per-day event counts for calendar density views (/events/counts).
+
+event_day_count stores, per local day, how many events that day's list shows
+(one-offs, recurring occurrences, and multi-day events still running past
+ONGOING_CUTOFF_HOUR), plus the same total split by category id and by venue
+neighborhood, each event tallied with facets.tally as the /events facet
+counts are. Requests only read: stored days come back in one primary key
+range read, and days that aren't stored are computed in memory in one pass
+per missing run (one range query, one series query, each rule expanded
+once). Rows are only written by the day count filler, a background thread
+in one "all" (writer) worker that keeps DAY_COUNT_FILL_PAST_DAYS before today
+through MAX_COUNT_DAYS after it stored, so public workers never take the
+write lock.
+
+The triggers installed by migrate_database delete the stored days an event,
+category link or venue write can touch and bump catalog_version
+'event_day_count'; a fill only stores its rows if the version is unchanged,
+so counts computed from data that changed meanwhile are never kept. The
+filler recomputes the deleted days on its next round.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, time as dt_time
+
+from dateutil.rrule import rrulestr
+from flask import jsonify, request
+from sqlalchemy import text
+
+from database import engine, event_minute
+from events import ONGOING_CUTOFF_HOUR, SPANNING_KEYS_SQL, _local_today, normalize_rrule
+from facets import TOTAL, get_category_index, tally
+
+logger = logging.getLogger(__name__)
+
+DAY_COUNT_VERSION_NAME = 'event_day_count'
+DAY_COUNT_SPLITS = ('category', 'neighborhood')
+
+# Longest range one request may ask for (a year view plus padding weeks)
+MAX_COUNT_DAYS = 400
+
+# The filler keeps this many days before today stored (a month grid's leading weeks and last month)
+DAY_COUNT_FILL_PAST_DAYS = 42
+
+ONE_DAY = timedelta(days=1)
+
+# category_ids: comma-separated ids from event_category (PK range read per event)
+_COUNT_COLUMNS = """
+    e.start, e."end", v.neighborhood,
+    (SELECT group_concat(ec.category_id) FROM event_category ec
+     WHERE ec.start_date = e.start_date AND ec.event_id = e.id) AS category_ids
+"""
+
+# One-offs starting in the span, then ones that began earlier and still run on its first day
+ONE_OFF_COUNT_SQL = f"""
+    SELECT {_COUNT_COLUMNS} FROM event e LEFT JOIN venue v ON v.id = e.venue_id
+    WHERE e.start_date BETWEEN :first AND :last AND COALESCE(e.is_recurring, 0) = 0
+    UNION ALL
+    SELECT {_COUNT_COLUMNS} FROM event e LEFT JOIN venue v ON v.id = e.venue_id
+    WHERE e.event_key IN ({SPANNING_KEYS_SQL}) AND COALESCE(e.is_recurring, 0) = 0
+      AND e.start_date < :first
+"""
+
+# Same series filter as events.get_recurring_series for the span's days
+SERIES_COUNT_SQL = f"""
+    SELECT {_COUNT_COLUMNS}, e.rrule, e.recurring_until, e.id, e.title
+    FROM event e LEFT JOIN venue v ON v.id = e.venue_id
+    WHERE e.is_recurring = 1 AND e.start_date <= :last
+      AND (e.recurring_until IS NULL OR e.recurring_until >= :live_from)
+"""
+
+STORED_COUNTS_SQL = """
+    SELECT day, kind, value, count FROM event_day_count
+    WHERE day BETWEEN :first AND :last AND (kind = 'total' OR kind = :split)
+"""
+
+VERSION_SQL = "SELECT version FROM catalog_version WHERE name = :name"
+
+# Guarded per row: the first insert takes the write lock, so the whole fill sees one version
+STORE_COUNT_SQL = """
+    INSERT OR REPLACE INTO event_day_count (day, kind, value, count)
+    SELECT :day, :kind, :value, :count
+    WHERE (SELECT version FROM catalog_version WHERE name = :name) = :version
+"""
+
+
+def _parse_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if isinstance(value, str) else value
+
+
+def _event_days(start, end, first, last):
+    """Days in first..last whose list shows an event running start..end: its start day, then
+    every later day it is still running past ONGOING_CUTOFF_HOUR (as build_day_events does)."""
+    day = start.date()
+    if first <= day <= last:
+        yield day
+    day = max(day + ONE_DAY, first)
+    while day <= last and end > datetime.combine(day, dt_time(hour=ONGOING_CUTOFF_HOUR)):
+        yield day
+        day += ONE_DAY
+
+
+def compute_day_counts(conn, first, last):
+    """{day: Counter{(kind, value): count}} for every day in first..last, straight from the tables."""
+    counts = {first + timedelta(days=i): Counter() for i in range((last - first).days + 1)}
+    first_midnight = datetime.combine(first, dt_time.min)
+    params = {
+        "first": first.isoformat(),
+        "last": last.isoformat(),
+        "started_before": event_minute(first_midnight),
+        "running_at": event_minute(datetime.combine(first, dt_time(hour=ONGOING_CUTOFF_HOUR))),
+    }
+    for start, end, neighborhood, category_ids in conn.execute(text(ONE_OFF_COUNT_SQL), params):
+        category_ids = [int(category_id) for category_id in category_ids.split(',')] if category_ids else ()
+        for day in _event_days(_parse_datetime(start), _parse_datetime(end), first, last):
+            tally(counts[day], neighborhood, None, category_ids)
+
+    series_params = {"last": last.isoformat(), "live_from": (first - ONE_DAY).isoformat()}
+    expand_end = datetime.combine(last, dt_time.max)
+    for start, end, neighborhood, category_ids, raw_rule, recurring_until, event_id, title in conn.execute(
+        text(SERIES_COUNT_SQL), series_params,
+    ):
+        start, end = _parse_datetime(start), _parse_datetime(end)
+        recurring_until = _parse_date(recurring_until)
+        category_ids = [int(category_id) for category_id in category_ids.split(',')] if category_ids else ()
+        duration = end - start
+        if not raw_rule or not raw_rule.strip():
+            instances = [start]  # Flagged recurring without a rule: listed as the row itself
+        else:
+            try:
+                rule = rrulestr(normalize_rrule(raw_rule), dtstart=start)
+                # From early enough to catch instances that began before the span and still run in it
+                instances = rule.between(min(first_midnight - ONE_DAY, first_midnight - duration), expand_end)
+            except (ValueError, TypeError) as exc:
+                logger.error('Invalid RRULE for event id=%s title=%r rrule=%r: %s', event_id, title, raw_rule, exc)
+                continue
+        for instance_start in instances:
+            for day in _event_days(instance_start, instance_start + duration, first, last):
+                # The day list only looks at series still live the day before
+                if recurring_until is None or day - ONE_DAY <= recurring_until:
+                    tally(counts[day], neighborhood, None, category_ids)
+    return counts
+
+
+def _store(counts, version):
+    def row(day, key, count):
+        return {"day": day.isoformat(), "kind": key[0], "value": key[1], "count": count,
+                "name": DAY_COUNT_VERSION_NAME, "version": version}
+
+    rows = []
+    for day, counter in counts.items():
+        # The total row is stored even when 0: it marks the day as computed
+        rows.append(row(day, TOTAL, counter[TOTAL]))
+        rows.extend(row(day, key, count) for key, count in counter.items() if key != TOTAL)
+    with engine.begin() as conn:
+        conn.execute(text(STORE_COUNT_SQL), rows)
+
+
+def _read_stored(first, last, split):
+    """(catalog version, {day: Counter} of stored days); (None, {}) without the table."""
+    try:
+        with engine.connect() as conn:
+            version = conn.execute(text(VERSION_SQL), {"name": DAY_COUNT_VERSION_NAME}).scalar()
+            rows = conn.execute(text(STORED_COUNTS_SQL), {
+                "first": first.isoformat(), "last": last.isoformat(), "split": split or '',
+            }).fetchall()
+    except Exception as e:
+        # Public workers skip migrations; without the table every request computes
+        logger.error("Reading event_day_count failed: %s", e)
+        return None, {}
+    stored = {}
+    for day, kind, value, count in rows:
+        stored.setdefault(_parse_date(day), Counter())[(kind, value)] = count
+    # Only days with their total row were computed completely
+    return version, {day: counter for day, counter in stored.items() if TOTAL in counter}
+
+
+def _compute_missing(first, last, stored):
+    """{day: Counter} for the days in first..last not in stored, one compute_day_counts pass per run."""
+    computed = {}
+    day = first
+    with engine.connect() as conn:
+        while day <= last:
+            if day in stored:
+                day += ONE_DAY
+                continue
+            run_end = day
+            while run_end + ONE_DAY <= last and run_end + ONE_DAY not in stored:
+                run_end += ONE_DAY
+            computed.update(compute_day_counts(conn, day, run_end))
+            day = run_end + ONE_DAY
+    return computed
+
+
+def get_day_counts(first, last, split=None):
+    """{day: Counter{(kind, value): count}} for first..last (only 'total' and `split` keys).
+
+    Read-only: stored days are read back and missing ones computed in memory.
+    """
+    _, counts = _read_stored(first, last, split)
+    for day, counter in _compute_missing(first, last, counts).items():
+        counts[day] = Counter({
+            key: count for key, count in counter.items() if key == TOTAL or key[0] == split
+        })
+    return dict(sorted(counts.items()))
+
+
+def fill_day_counts(first, last):
+    """Compute and store every day in first..last that isn't stored; returns how many were stored."""
+    version, stored = _read_stored(first, last, None)
+    if version is None:
+        return 0
+    computed = _compute_missing(first, last, stored)
+    if computed:
+        _store(computed, version)
+    return len(computed)
+
+
+def start_day_count_filler(interval_seconds):
+    """Keep the days around today stored in event_day_count, every interval_seconds on a daemon thread.
+
+    One "all" worker runs it (app.register_background_work); /events/counts requests never write.
+    """
+    def run():
+        while True:
+            try:
+                today = _local_today()
+                fill_day_counts(
+                    today - timedelta(days=DAY_COUNT_FILL_PAST_DAYS), today + timedelta(days=MAX_COUNT_DAYS),
+                )
+            except Exception as e:
+                logger.error("Filling event_day_count failed: %s", e)
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=run, name='day-count-filler', daemon=True)
+    thread.start()
+    return thread
+
+
+def day_counts_payload(counts, split=None):
+    """JSON shape: {day: total}, or {day: {"total": n, split: {name: n}}} with a split."""
+    if not split:
+        return {day.isoformat(): counter[TOTAL] for day, counter in counts.items()}
+    names = None
+    if split == 'category':
+        names = get_category_index({
+            int(value) for counter in counts.values() for kind, value in counter if kind == 'category'
+        }).names
+    payload = {}
+    for day, counter in counts.items():
+        by_value = {}
+        for (kind, value), count in counter.most_common():
+            if kind != split or not count:
+                continue
+            if names is not None:
+                value = names.get(int(value))
+                if value is None:
+                    continue
+            by_value[value] = count
+        payload[day.isoformat()] = {'total': counter[TOTAL], split: by_value}
+    return payload
+
+
+def register_day_count_routes(app):
+    """Per-day totals for calendar density shading"""
+
+    @app.route('/events/counts')
+    def event_counts():
+        """Query params: start, end (dates or datetimes; end is exclusive, as FullCalendar sends it),
+        by (category or neighborhood) to split each day's total."""
+        split = request.args.get('by', '').strip() or None
+        if split is not None and split not in DAY_COUNT_SPLITS:
+            return jsonify({'error': f'by must be one of {", ".join(DAY_COUNT_SPLITS)}'}), 400
+        try:
+            start = datetime.fromisoformat(request.args['start'].replace('Z', '+00:00'))
+            end = datetime.fromisoformat(request.args['end'].replace('Z', '+00:00'))
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return jsonify({'error': 'start and end must be ISO dates or datetimes'}), 400
+        first = start.date()
+        last = (end.replace(tzinfo=None) - timedelta(microseconds=1)).date()
+        if last < first or (last - first).days >= MAX_COUNT_DAYS:
+            return jsonify({'error': f'end must be after start and at most {MAX_COUNT_DAYS} days later'}), 400
+
+        response = jsonify(day_counts_payload(get_day_counts(first, last, split), split))
+        response.headers['Cache-Control'] = 'public, max-age=300'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
@@ -1,18 +1,29 @@
 from flask import render_template, request, jsonify, redirect, url_for, flash, abort, session as flask_session
-from sqlalchemy import case, text
+from sqlalchemy import column, exists, or_, text
 from datetime import datetime, timedelta, time as dt_time
 from cacheout import Cache
-from dateutil.rrule import rrulestr
+from collections import namedtuple
+from dateutil.rrule import rrule, rrulestr
 from contextlib import contextmanager
-from sqlalchemy.orm import joinedload
+from itertools import count, islice, takewhile
+from operator import attrgetter
 from types import SimpleNamespace
+import hashlib
+import heapq
 import logging
 import os
 import pytz
 from urllib.parse import quote_plus
 
-from database import SessionLocal, Event, Venue, Category, get_next_event_id
+from database import (
+    SessionLocal, Event, Venue, Category, event_category, event_minute, get_next_event_id, set_event_categories,
+)
+import raw_reads
 from auth import login_required
+from facets import build_listing, facet_counts, filter_listing
+from fts import build_match_query, lookup_category_id, search_venues
+from typeahead import clear_venue_typeahead, get_venue_index
+from venue_catalog import get_venue_catalog, invalidate_venue_catalog, venue_name
 from urls import safe_http_url
 
 logger = logging.getLogger(__name__)
@@ -30,13 +41,76 @@ day_events_cache = Cache(maxsize=30, ttl=CACHE_TTL_SECONDS)
 # Value: list of events for the calendar range
 calendar_events_cache = Cache(maxsize=40, ttl=CACHE_TTL_SECONDS)
 
+# Initialize cache for /venues?q= search results (kept apart so typed queries can't evict the lists)
+# Key format: f"{match}|{neighborhood}|{venue_type}" (match as built by fts.build_match_query)
+# Value: bm25-ranked list of venue dicts
+venue_search_cache = Cache(maxsize=500, ttl=CACHE_TTL_SECONDS)
+
+# Initialize cache for recurring series that are still live
+# Key format: f"{live_from}" (ISO date; series ending before it are excluded)
+# Value: detached snapshots of the series rows (safe to share across requests)
+recurring_series_cache = Cache(maxsize=2, ttl=CACHE_TTL_SECONDS)
+
+# Initialize cache for parsed live series ordered by their next start (iter_upcoming_occurrences)
+# Key format: f"{live_from}" (as recurring_series_cache)
+# Value: SeriesHeads for that cache's series list
+series_heads_cache = Cache(maxsize=2, ttl=CACHE_TTL_SECONDS)
+
+# Initialize cache for per-venue upcoming occurrences
+# Key format: venue_id
+# Value: (occurrences shown on the venue page, naive local datetime that list stops being current)
+venue_upcoming_cache = Cache(maxsize=500, ttl=CACHE_TTL_SECONDS)
+
+# Initialize cache for /events/upcoming responses (short TTL: results shift as events end)
+# Key format: (limit, venue_id, category)
+# Value: list of serialized events
+upcoming_events_cache = Cache(maxsize=200, ttl=60)
+
+# Initialize cache for rendered /venues/<id> pages (anonymous visitors only)
+# Key format: venue_id
+# Value: (html bytes, etag, naive local datetime the page stops being current)
+venue_page_cache = Cache(maxsize=500, ttl=CACHE_TTL_SECONDS)
+
+# Initialize cache for the event form's category checkboxes
+# Key format: "categories"
+# Value: tuple of FormCategory, most used first (usage order may lag writes by the TTL)
+form_categories_cache = Cache(maxsize=1, ttl=CACHE_TTL_SECONDS)
+
+FormCategory = namedtuple('FormCategory', ['id', 'name', 'usage_count'])
+
+# A live series with its parsed rule, keyed by the start of its first occurrence still running at built_at
+SeriesHead = namedtuple('SeriesHead', ['start', 'start_date', 'id', 'event', 'parsed'])
+SeriesHeads = namedtuple('SeriesHeads', ['series', 'built_at', 'heads'])
+
+# Admin event lists (admin.py) page by keyset on (start, start_date, id) (idx_event_start_key).
+# Key: (list name, search, filters, page_size, page) -> (start, start_date, id) of that page's last row
+admin_page_boundaries = Cache(maxsize=5000, ttl=300)
+
+# Totals shown by the admin event lists; approximate for up to a minute after other workers' writes
+# Key: (list name, search, filters) or ('stats',)
+admin_count_cache = Cache(maxsize=200, ttl=60)
+
 # Default; overridden from app config in register_events()
 LOCAL_TIMEZONE = pytz.timezone('America/New_York')
 
+# Serve public reads through raw_reads instead of the ORM; set from app config in register_events()
+USE_RAW_READS = False
+
 # Shared event link arrow (events list + venue upcoming events)
 EVENT_LINK_ARROW = '→'
 
-# Previous-day events only count as "ongoing" if they run past this hour on the viewed day
+SPANNING_KEYS_SQL = "SELECT event_key FROM event_span WHERE start_minute < :started_before AND end_minute >= :running_at"
+
+# Merge order of iter_upcoming_occurrences (occurrences and SeriesHeads alike)
+UPCOMING_ORDER = attrgetter('start', 'start_date', 'id')
+
+# Rows per fetch from the one-off cursor behind iter_upcoming_occurrences
+UPCOMING_FETCH_BATCH = 50
+
+UPCOMING_DEFAULT_LIMIT = 10
+UPCOMING_MAX_LIMIT = 100
+
+# Events that started on an earlier day only count as "ongoing" if they run past this hour on the viewed day
 ONGOING_CUTOFF_HOUR = 6
 
 @contextmanager
@@ -48,10 +122,14 @@ def get_db_session():
     finally:
         session.close()
 
-def get_form_venues(session):
-    """Venues for event form dropdown: open first (A-Z), closed last (A-Z)."""
-    is_closed = Venue.name.ilike('%closed%')
-    return session.query(Venue).order_by(case((is_closed, 1), else_=0), Venue.name).all()
+def get_selected_venue(session, venue_id):
+    """The venue pre-filled in the event form; the rest load through /typeahead."""
+    if not venue_id:
+        return None
+    try:
+        return session.get(Venue, int(venue_id))
+    except (TypeError, ValueError):
+        return None
 
 def get_cached_day_events(date_str):
     """Get complete day events for a specific date from cache"""
@@ -88,12 +166,62 @@ def clear_calendar_events_cache():
     if calendar_events_cache is not None:
         calendar_events_cache.clear()
 
+def clear_venue_pages(venue_ids=None):
+    """Drop upcoming lists and rendered pages for venue_ids (None: every venue)"""
+    if venue_ids is None:
+        venue_upcoming_cache.clear()
+        venue_page_cache.clear()
+        return
+    for venue_id in venue_ids:
+        if venue_id:
+            venue_upcoming_cache.delete(int(venue_id))
+            venue_page_cache.delete(int(venue_id))
+
+def clear_admin_list_caches():
+    """Drop cached admin page boundaries and totals - call this when events are modified"""
+    admin_page_boundaries.clear()
+    admin_count_cache.clear()
+
+def clear_event_caches(venue_ids=None):
+    """Clear every cache derived from event rows - call this when events are modified
+
+    venue_ids: venues whose events changed (old and new venue on a move); None clears every venue page.
+    """
+    clear_day_events_cache()
+    clear_calendar_events_cache()
+    recurring_series_cache.clear()
+    series_heads_cache.clear()
+    upcoming_events_cache.clear()
+    clear_venue_pages(venue_ids)
+    clear_admin_list_caches()
+
+def get_form_categories(session):
+    """Active categories for the event form, most used first (cached)."""
+    categories = form_categories_cache.get('categories')
+    if categories is None:
+        rows = session.query(Category.id, Category.name, Category.usage_count).filter(
+            Category.is_active == True
+        ).order_by(Category.usage_count.desc(), Category.name).all()
+        categories = tuple(FormCategory(*row) for row in rows)
+        form_categories_cache.set('categories', categories)
+    return categories
+
+def clear_form_categories():
+    """Clear the form category list - call this when categories are modified"""
+    form_categories_cache.clear()
+
+def clear_venues_cache():
+    """Rebuild the venue catalog and drop everything derived from it - call this when venues are modified"""
+    invalidate_venue_catalog()
+    venue_search_cache.clear()
+    clear_venue_typeahead()
+    # Serialized day/range lists carry venue names
+    clear_day_events_cache()
+    clear_calendar_events_cache()
+
 def _event_venue_name(event):
-    """Venue name for persisted or expanded (transient) event instances."""
-    venue = getattr(event, 'venue', None)
-    if venue is not None:
-        return venue.name
-    return getattr(event, '_venue_name', None)
+    """Venue name for any event row, snapshot or occurrence (from the venue catalog, no join)."""
+    return venue_name(event.venue_id)
 
 def serialize_event(event, *, slim=False):
     """Serialize an Event (or lightweight occurrence) for JSON API responses.
@@ -153,22 +281,58 @@ def validate_rrule(raw, dtstart=None):
     return normalized, None
 
 
-def expand_recurring_events(event, start_date, end_date):
-    """Expand an RRULE into lightweight occurrence objects (not ORM Event instances)."""
+def _series_rule(event):
+    """(rrule, normalized text) for a recurring series, or (None, None) after logging why not."""
     raw = event.rrule
-    if not raw or not str(raw).strip():
-        return [event]
-
     normalized = normalize_rrule(raw)
     if not normalized:
         logger.error(
             'Invalid empty RRULE after normalize for event id=%s title=%r rrule=%r',
             getattr(event, 'id', None), getattr(event, 'title', None), raw,
         )
-        return []
+        return None, None
+
+    try:
+        return rrulestr(normalized, dtstart=event.start), normalized
+    except (ValueError, TypeError) as exc:
+        logger.error(
+            'Invalid RRULE for event id=%s title=%r rrule=%r: %s',
+            getattr(event, 'id', None), getattr(event, 'title', None), raw, exc,
+        )
+        return None, None
 
+def _occurrence(event, instance_start, duration, normalized):
+    """Lightweight occurrence of a series (not an ORM Event instance)."""
+    return SimpleNamespace(
+        id=event.id,
+        start_date=event.start_date,
+        title=event.title,
+        description=event.description,
+        start=instance_start,
+        end=instance_start + duration,
+        venue_id=event.venue_id,
+        venue=None,
+        color=event.color,
+        bg=event.bg,
+        is_virtual=event.is_virtual,
+        is_hybrid=event.is_hybrid,
+        url=event.url,
+        is_recurring=True,
+        rrule=normalized,
+        recurring_until=event.recurring_until,
+        categories=event.categories,
+    )
+
+def expand_recurring_events(event, start_date, end_date):
+    """Expand an RRULE into lightweight occurrence objects (not ORM Event instances)."""
+    raw = event.rrule
+    if not raw or not str(raw).strip():
+        return [event]
+
+    rule, normalized = _series_rule(event)
+    if rule is None:
+        return []
     try:
-        rule = rrulestr(normalized, dtstart=event.start)
         instances = rule.between(start_date, end_date)
     except (ValueError, TypeError) as exc:
         logger.error(
@@ -178,67 +342,393 @@ def expand_recurring_events(event, start_date, end_date):
         return []
 
     duration = event.end - event.start
-    venue_name = _event_venue_name(event)
-    expanded_events = []
-    for instance_start in instances:
-        expanded_events.append(SimpleNamespace(
-            id=event.id,
-            start_date=event.start_date,
-            title=event.title,
-            description=event.description,
-            start=instance_start,
-            end=instance_start + duration,
-            venue_id=event.venue_id,
-            venue=None,
-            _venue_name=venue_name,
-            color=event.color,
-            bg=event.bg,
-            is_virtual=event.is_virtual,
-            is_hybrid=event.is_hybrid,
-            url=event.url,
-            is_recurring=True,
-            rrule=normalized,
-            recurring_until=event.recurring_until,
-        ))
-
-    return expanded_events
-
-def get_upcoming_events_for_venue(session, venue_id, min_count=10, window_days=14, horizon_days=90):
-    """Return upcoming events at a venue: all in the next window_days, or at least min_count."""
+    return [_occurrence(event, instance_start, duration, normalized) for instance_start in instances]
+
+def iter_series_occurrences(event, after, until=None, parsed=None):
+    """Lazy occurrences of a series still running at `after`, in start order.
+
+    Stops at `until` (latest start) and after the series' recurring_until day;
+    otherwise the caller decides how many to take. parsed: (rule, normalized)
+    from _series_rule, to skip parsing the rule again.
+    """
+    if not event.rrule or not str(event.rrule).strip():
+        return
+    rule, normalized = parsed or _series_rule(event)
+    if rule is None:
+        return
+    duration = event.end - event.start
+    last_start = until
+    if event.recurring_until is not None:
+        series_end = datetime.combine(event.recurring_until, dt_time.max)
+        last_start = series_end if last_start is None else min(last_start, series_end)
+    # Starting `duration` early includes the instance already in progress at `after`
+    for instance_start in rule.xafter(after - duration, inc=True):
+        if last_start is not None and instance_start > last_start:
+            return
+        yield _occurrence(event, instance_start, duration, normalized)
+
+def _local_today():
+    """Today's date in the configured local timezone."""
+    return datetime.now(pytz.UTC).astimezone(LOCAL_TIMEZONE).date()
+
+def snapshot_event(event):
+    """Detached copy of an Event row that can be cached and shared across requests."""
+    return SimpleNamespace(
+        id=event.id,
+        start_date=event.start_date,
+        title=event.title,
+        description=event.description,
+        start=event.start,
+        end=event.end,
+        venue_id=event.venue_id,
+        venue=None,
+        color=event.color,
+        bg=event.bg,
+        is_virtual=event.is_virtual,
+        is_hybrid=event.is_hybrid,
+        url=event.url,
+        is_recurring=event.is_recurring,
+        rrule=event.rrule,
+        recurring_until=event.recurring_until,
+        categories=event.categories,
+    )
+
+def get_live_recurring_series(session, live_from):
+    """Snapshots of recurring series whose end is on/after live_from (cached)."""
+    cache_key = live_from.isoformat()
+    series = recurring_series_cache.get(cache_key)
+    if series is None and USE_RAW_READS:
+        # EventRow tuples are immutable, so they are shared as-is
+        series = raw_reads.live_recurring_series(live_from)
+        recurring_series_cache.set(cache_key, series)
+    elif series is None:
+        rows = session.query(Event).filter(
+            Event.is_recurring == True,
+            (Event.recurring_until == None) | (Event.recurring_until >= live_from)
+        ).order_by(Event.start_date, Event.id).all()
+        series = [snapshot_event(event) for event in rows]
+        recurring_series_cache.set(cache_key, series)
+    return series
+
+def get_recurring_series(session, first_date, last_date):
+    """Recurring series that may have instances between first_date and last_date."""
+    live_from = _local_today() - timedelta(days=1)
+    if first_date >= live_from:
+        return [
+            event for event in get_live_recurring_series(session, live_from)
+            if event.start_date <= last_date
+            and (event.recurring_until is None or event.recurring_until >= first_date)
+        ]
+    if USE_RAW_READS:
+        return raw_reads.recurring_series_between(first_date, last_date)
+    return session.query(Event).filter(
+        Event.is_recurring == True,
+        Event.start_date <= last_date,
+        (Event.recurring_until == None) | (Event.recurring_until >= first_date)
+    ).order_by(Event.start_date, Event.id).all()
+
+@contextmanager
+def read_session():
+    """ORM session for public reads, or None when raw_reads serves them."""
+    if USE_RAW_READS:
+        yield None
+    else:
+        with get_db_session() as session:
+            yield session
+
+def _spanning_condition(started_before, running_at):
+    """One-off events (from event_span) that started before started_before and still run at running_at.
+
+    Minutes are rounded outward in the index; callers re-check exact times.
+    """
+    return Event.event_key.in_(
+        text(SPANNING_KEYS_SQL).bindparams(
+            started_before=event_minute(started_before), running_at=event_minute(running_at),
+        ).columns(column('event_key'))
+    )
+
+def _spanning_rows(session, started_before, running_at):
+    """Rows for _spanning_condition from whichever read path is active."""
+    if session is None:
+        return raw_reads.spanning_rows(event_minute(started_before), event_minute(running_at))
+    return session.query(Event).filter(
+        _spanning_condition(started_before, running_at)
+    ).order_by(Event.start, Event.start_date, Event.id).all()
+
+def _longest_duration(series):
+    return max((event.end - event.start for event in series), default=timedelta(0))
+
+def build_day_events(target_date):
+    """Serialized events for one day (a facets.EventListing): that day's events plus ongoing ones that started earlier."""
+    previous_date = target_date - timedelta(days=1)
+    ongoing_cutoff = datetime.combine(target_date, dt_time(hour=ONGOING_CUTOFF_HOUR))
+    midnight = datetime.combine(target_date, dt_time.min)
+    expand_end = datetime.combine(target_date, datetime.max.time())
+
+    with read_session() as session:
+        # PK seek on start_date only (avoid idx_recurring full scan); drop recurring in Python
+        if session is None:
+            day_rows = raw_reads.day_rows(target_date)
+        else:
+            day_rows = session.query(Event).filter(
+                Event.start_date == target_date
+            ).order_by(Event.start, Event.start_date, Event.id).all()
+        day_events = [event for event in day_rows if not event.is_recurring]
+
+        # Started on any earlier day and still going past the cutoff: one event_span lookup
+        ongoing_events = [
+            event for event in _spanning_rows(session, midnight, ongoing_cutoff)
+            if not event.is_recurring and event.start < midnight and event.end > ongoing_cutoff
+        ]
+
+        # One recurring lookup covering both target and ongoing instances
+        recurring_events = get_recurring_series(session, previous_date, target_date)
+        expand_start = min(datetime.combine(previous_date, dt_time.min), midnight - _longest_duration(recurring_events))
+
+        expanded_events = []
+        ongoing_expanded = []
+        for event in recurring_events:
+            for instance in expand_recurring_events(event, expand_start, expand_end):
+                if instance.start.date() == target_date:
+                    expanded_events.append(instance)
+                elif instance.start < midnight and instance.end > midnight and instance.end > ongoing_cutoff:
+                    ongoing_expanded.append(instance)
+
+        all_events = day_events + expanded_events + ongoing_events + ongoing_expanded
+        all_events.sort(key=lambda x: x.start)
+        return build_listing(all_events, [serialize_event(event) for event in all_events])
+
+def get_day_events(target_date, use_cache=True):
+    """build_day_events through the day cache (use_cache=False: fresh, e.g. for logged-in admins)."""
+    date_str = target_date.isoformat()
+    listing = get_cached_day_events(date_str) if use_cache else None
+    if listing is None:
+        listing = build_day_events(target_date)
+        if use_cache:
+            set_cached_day_events(date_str, listing)
+    return listing
+
+def build_range_events(start_dt, end_dt):
+    """Slim serialized events (one-offs plus recurring instances) for a calendar range, as a facets.EventListing."""
+    first_date = start_dt.date()
+    last_date = end_dt.date()
+    range_start = datetime.combine(first_date, dt_time.min)
+    with read_session() as session:
+        # PK range seek: filter by start_date only, then drop recurring in Python
+        if session is None:
+            range_rows = raw_reads.range_rows(first_date, last_date)
+        else:
+            range_rows = session.query(Event).filter(
+                Event.start_date >= first_date,
+                Event.start_date <= last_date
+            ).order_by(Event.start_date, Event.id).all()
+        non_recurring = [e for e in range_rows if not e.is_recurring]
+        # Multi-day events that began before the range but run into it
+        non_recurring.extend(
+            event for event in _spanning_rows(session, range_start, range_start)
+            if not event.is_recurring and event.start < range_start and event.end > range_start
+        )
+
+        recurring = get_recurring_series(session, first_date, last_date)
+        expand_start = start_dt - _longest_duration(recurring)
+
+        expanded_events = []
+        for event in recurring:
+            expanded_events.extend(
+                instance for instance in expand_recurring_events(event, expand_start, end_dt)
+                if instance.start >= start_dt or instance.end > start_dt
+            )
+
+        all_events = non_recurring + expanded_events
+        all_events.sort(key=lambda x: x.start)
+        return build_listing(all_events, [serialize_event(event, slim=True) for event in all_events])
+
+def venue_to_dict(venue):
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'address': venue.address,
+        'neighborhood': venue.neighborhood,
+        'venue_type': venue.venue_type,
+    }
+
+def build_venue_list(neighborhood='', venue_type=''):
+    """Venue dicts for /venues, optionally filtered (from the venue catalog)."""
+    return [record._asdict() for record in get_venue_catalog().filtered(neighborhood, venue_type)]
+
+def build_venue_search(match, neighborhood='', venue_type=''):
+    """Ranked venue dicts for /venues?q= (cached); match comes from build_match_query."""
+    cache_key = f"{match}|{neighborhood}|{venue_type}"
+    venue_list = venue_search_cache.get(cache_key)
+    if venue_list is None:
+        venue_list = search_venues(match, neighborhood, venue_type)
+        venue_search_cache.set(cache_key, venue_list)
+    return venue_list
+
+def warm_read_caches():
+    """Fill the public read caches (venues, live series, today's list) before workers fork."""
+    today = _local_today()
+    get_venue_catalog()
+    get_venue_index()
+    with read_session() as session:
+        get_live_recurring_series(session, today - timedelta(days=1))
+    set_cached_day_events(today.isoformat(), build_day_events(today))
+
+def _local_now_naive():
     # Events are stored as America/New_York naive; never compare to UTC datetime.now().
-    now = datetime.now(pytz.UTC).astimezone(LOCAL_TIMEZONE).replace(tzinfo=None)
-    horizon_end = now + timedelta(days=horizon_days)
+    return datetime.now(pytz.UTC).astimezone(LOCAL_TIMEZONE).replace(tzinfo=None)
+
+def _category_condition(session, category):
+    """Events linked to the category (id or name): a primary key probe into event_category."""
+    return exists().where(
+        event_category.c.start_date == Event.start_date,
+        event_category.c.event_id == Event.id,
+        event_category.c.category_id == lookup_category_id(session.connection(), category),
+    )
+
+def _selected_categories(session, category_ids):
+    """Category rows for the form's category_ids checkboxes."""
+    ids = [int(category_id) for category_id in category_ids if category_id.isdigit()]
+    if not ids:
+        return []
+    return session.query(Category).filter(Category.id.in_(ids)).all()
+
+def _one_off_stream(session, now, until, venue_id, category_condition):
+    """One-off events still running at now, by start: ongoing ones, then a lazily read cursor."""
+    query = session.query(Event).filter(Event.is_recurring == False)
+    if venue_id is not None:
+        query = query.filter(Event.venue_id == venue_id)
+    if category_condition is not None:
+        query = query.filter(category_condition)
+
+    ongoing = query.filter(Event.start < now, Event.end >= now)
+    if venue_id is None:
+        # Started today, or on an earlier day and still running (event_span); a venue's own rows are few enough to scan
+        midnight = datetime.combine(now.date(), dt_time.min)
+        ongoing = ongoing.filter(or_(Event.start_date == now.date(), _spanning_condition(midnight, now)))
+    for event in ongoing.order_by(Event.start, Event.start_date, Event.id).all():
+        yield snapshot_event(event)
+
+    upcoming = query.filter(Event.start >= now)
+    if until is not None:
+        upcoming = upcoming.filter(Event.start <= until)
+    # idx_event_start_key range seek; rows are fetched in batches only as the merge asks
+    upcoming = upcoming.order_by(Event.start, Event.start_date, Event.id).yield_per(UPCOMING_FETCH_BATCH)
+    for event in upcoming:
+        yield snapshot_event(event)
+
+def get_series_heads(session, now):
+    """SeriesHead per live series with an occurrence still running at now, by that occurrence's start.
+
+    Built (each rule parsed and advanced once) when the live series list is
+    replaced; reused for any later now, where a head's start is a lower bound
+    on the series' next occurrence.
+    """
+    live_from = now.date() - timedelta(days=1)
+    series = get_live_recurring_series(session, live_from)
+    cached = series_heads_cache.get(live_from.isoformat())
+    if cached is not None and cached.series is series and cached.built_at <= now:
+        return cached.heads
+
+    heads = []
+    for event in series:
+        if not event.rrule or not str(event.rrule).strip():
+            continue
+        rule, normalized = _series_rule(event)
+        first = next(iter_series_occurrences(event, now, parsed=(rule, normalized)), None)
+        if first is None:
+            continue
+        if isinstance(rule, rrule) and 'COUNT=' not in normalized.upper():
+            # Re-anchored on an instance the set is unchanged from there on, and later
+            # expansions start at the head instead of walking from the series' first day
+            rule = rule.replace(dtstart=first.start)
+        heads.append(SeriesHead(first.start, event.start_date, event.id, event, (rule, normalized)))
+    heads.sort(key=UPCOMING_ORDER)
+    series_heads_cache.set(live_from.isoformat(), SeriesHeads(series, now, heads))
+    return heads
+
+def _merge_upcoming(one_offs, heads, now, until):
+    """heapq.merge of the one-off stream and each head's series, opening a series only once the merge reaches its head."""
+    heap = []
+    order = count()
+
+    def push(stream):
+        item = next(stream, None)
+        if item is not None:
+            heapq.heappush(heap, (UPCOMING_ORDER(item), next(order), item, stream))
+
+    push(one_offs)
+    pending = iter(heads)
+    head = next(pending, None)
+    while heap or head is not None:
+        if head is not None and (not heap or UPCOMING_ORDER(head) <= heap[0][0]):
+            push(iter_series_occurrences(head.event, now, until, parsed=head.parsed))
+            head = next(pending, None)
+            continue
+        _, _, item, stream = heapq.heappop(heap)
+        yield item
+        push(stream)
+
+def iter_upcoming_occurrences(session, now, *, until=None, venue_id=None, category=None):
+    """Events and series occurrences still running at now, in start order, produced lazily.
+
+    A heap merge of the one-off cursor and one recurrence iterator per live
+    series. Series wait in get_series_heads order and are only expanded once
+    the merge reaches their next start, so taking N results costs about N
+    steps plus the series that actually contribute, not horizon x series.
+    Consume it while session is open.
+    """
+    category_condition = _category_condition(session, category) if category else None
+
+    heads = get_series_heads(session, now)
+    if until is not None:
+        heads = list(takewhile(lambda head: head.start <= until, heads))
+    if venue_id is not None:
+        heads = [head for head in heads if head.event.venue_id == venue_id]
+    if category_condition is not None and heads:
+        matching = set(session.query(Event.start_date, Event.id).filter(
+            Event.is_recurring == True, category_condition,
+        ).all())
+        heads = [head for head in heads if (head.start_date, head.id) in matching]
+
+    return _merge_upcoming(_one_off_stream(session, now, until, venue_id, category_condition), heads, now, until)
+
+def upcoming_occurrences(session, now, limit, **filters):
+    """The next `limit` occurrences from iter_upcoming_occurrences."""
+    return list(islice(iter_upcoming_occurrences(session, now, **filters), limit))
+
+def build_venue_upcoming(session, venue_id, now, min_count=10, window_days=14, horizon_days=90):
+    """(events to show, when that choice next changes): all in the next window_days, or at least min_count."""
     window_end = now + timedelta(days=window_days)
-    today = now.date()
-    fetch_limit = max(min_count * 3, 50)
-
-    # Bound by horizon + LIMIT so popular venues don't load 1000+ future rows
-    non_recurring = session.query(Event).options(joinedload(Event.venue)).filter(
-        Event.venue_id == venue_id,
-        Event.is_recurring == False,
-        Event.end >= now,
-        Event.start <= horizon_end,
-    ).order_by(Event.start).limit(fetch_limit).all()
-
-    recurring = session.query(Event).options(joinedload(Event.venue)).filter(
-        Event.venue_id == venue_id,
-        Event.is_recurring == True,
-        (Event.recurring_until == None) | (Event.recurring_until >= today)
-    ).all()
-
-    expanded = []
-    for event in recurring:
-        instances = expand_recurring_events(event, now, horizon_end)
-        for instance in instances:
-            if instance.end >= now:
-                expanded.append(instance)
-
-    all_events = list(non_recurring) + expanded
-    all_events.sort(key=lambda x: x.start)
-    in_window = [e for e in all_events if e.start <= window_end]
-    if len(in_window) >= min_count:
-        return in_window
-    return all_events[:min_count]
+    occurrences = iter_upcoming_occurrences(session, now, until=now + timedelta(days=horizon_days), venue_id=venue_id)
+    selected = []
+    following = None
+    for occurrence in occurrences:
+        if len(selected) >= min_count and occurrence.start > window_end:
+            following = occurrence
+            break
+        selected.append(occurrence)
+
+    # Changes when a shown event ends, the next one enters the window, or the day rolls over
+    valid_until = datetime.combine(now.date() + timedelta(days=1), dt_time.min)
+    for event in selected:
+        valid_until = min(valid_until, event.end)
+    if following is not None:
+        valid_until = min(valid_until, following.start - timedelta(days=window_days))
+    return tuple(selected), valid_until
+
+def get_venue_upcoming(session, venue_id, now):
+    """Cached build_venue_upcoming; rebuilt once it lapses or after a write at the venue."""
+    cached = venue_upcoming_cache.get(venue_id)
+    if cached is not None and now < cached[1]:
+        return cached
+    cached = build_venue_upcoming(session, venue_id, now)
+    venue_upcoming_cache.set(venue_id, cached)
+    return cached
+
+def get_upcoming_events_for_venue(session, venue_id, min_count=10, window_days=14):
+    """Return upcoming events at a venue: all in the next window_days, or at least min_count."""
+    return list(build_venue_upcoming(session, venue_id, _local_now_naive(), min_count, window_days)[0])
 
 DOWNTOWN_DETROIT_MAP_QUERY = "Downtown Detroit, MI"
 
@@ -257,15 +747,19 @@ def get_venue_map_embed(venue):
     return embed_url, is_fallback
 
 def register_events(app):
-    global LOCAL_TIMEZONE
+    global LOCAL_TIMEZONE, USE_RAW_READS
     tz = app.config.get('LOCAL_TIMEZONE')
     if tz is not None:
         LOCAL_TIMEZONE = tz
+    USE_RAW_READS = bool(app.config.get('RAW_READS', False))
 
     @app.template_filter('safe_url')
     def safe_url_filter(url):
         return safe_http_url(url) or ''
 
+    # Templates look venue names up in the catalog instead of lazy-loading event.venue
+    app.add_template_global(venue_name)
+
     def get_events_in_batches(session, start_date, end_date, batch_size=1000):
         events = []
         offset = 0
@@ -282,67 +776,27 @@ def register_events(app):
                 break
         return events
 
+    def faceted_events_response(listing):
+        """/events JSON: the listing filtered by neighborhood/venue_type/category, plus counts with facets=1."""
+        filtered = filter_listing(
+            listing,
+            request.args.get('neighborhood', '').strip(),
+            request.args.get('venue_type', '').strip(),
+            request.args.get('category', '').strip(),
+        )
+        if request.args.get('facets') == '1':
+            return jsonify({'events': filtered, 'facets': facet_counts(filtered)})
+        return jsonify(filtered)
+
     @app.route('/events')
     def get_events():
         # Check if this is a single-day request (from events list widget)
         date = request.args.get('date')
         if date:
             target_date = datetime.strptime(date, '%Y-%m-%d').date()
-            use_cache = not flask_session.get('logged_in')
-            
-            # Check cache first for complete day events (anonymous only)
-            cached_day_events = get_cached_day_events(date) if use_cache else None
-            
-            if cached_day_events is not None:
-                event_list = cached_day_events
-            else:
-                previous_date = target_date - timedelta(days=1)
-                ongoing_cutoff = datetime.combine(target_date, dt_time(hour=ONGOING_CUTOFF_HOUR))
-                midnight = datetime.combine(target_date, dt_time.min)
-                expand_start = datetime.combine(previous_date, datetime.min.time())
-                expand_end = datetime.combine(target_date, datetime.max.time())
-
-                with get_db_session() as session:
-                    # PK seek on start_date only (avoid idx_recurring full scan); split in Python
-                    day_rows = session.query(Event).options(joinedload(Event.venue)).filter(
-                        Event.start_date.in_([previous_date, target_date])
-                    ).order_by(Event.start).all()
-
-                    day_events = []
-                    ongoing_events = []
-                    for event in day_rows:
-                        if event.is_recurring:
-                            continue
-                        if event.start_date == target_date:
-                            day_events.append(event)
-                        elif event.end > midnight and event.end > ongoing_cutoff:
-                            ongoing_events.append(event)
-
-                    # One recurring query covering both target and previous-day ongoing
-                    recurring_events = session.query(Event).options(joinedload(Event.venue)).filter(
-                        Event.is_recurring == True,
-                        Event.start_date <= target_date,
-                        (Event.recurring_until == None) | (Event.recurring_until >= previous_date)
-                    ).all()
-
-                    expanded_events = []
-                    ongoing_expanded = []
-                    for event in recurring_events:
-                        for instance in expand_recurring_events(event, expand_start, expand_end):
-                            inst_date = instance.start.date()
-                            if inst_date == target_date:
-                                expanded_events.append(instance)
-                            elif inst_date == previous_date and instance.end > midnight and instance.end > ongoing_cutoff:
-                                ongoing_expanded.append(instance)
-
-                all_events = day_events + expanded_events + ongoing_events + ongoing_expanded
-                all_events.sort(key=lambda x: x.start)
-                event_list = [serialize_event(event) for event in all_events]
-
-                if use_cache:
-                    set_cached_day_events(date, event_list)
-            
-            response = jsonify(event_list)
+            # Complete day events come from the cache for anonymous visitors only
+            event_list = get_day_events(target_date, use_cache=not flask_session.get('logged_in'))
+            response = faceted_events_response(event_list)
             return set_cache_headers(response, max_age=300)  # Cache for 5 minutes
         
         # Calendar widget request (date range)
@@ -365,78 +819,87 @@ def register_events(app):
         if cached_calendar is not None:
             event_list = cached_calendar
         else:
-            with get_db_session() as session:
-                # PK range seek: filter by start_date only, then drop recurring in Python
-                range_rows = session.query(Event).filter(
-                    Event.start_date >= start_date.date(),
-                    Event.start_date <= end_date.date()
-                ).options(joinedload(Event.venue)).all()
-                non_recurring = [e for e in range_rows if not e.is_recurring]
-
-                recurring = session.query(Event).filter(
-                    Event.is_recurring == True,
-                    Event.start_date <= end_date.date(),
-                    (Event.recurring_until == None) | (Event.recurring_until >= start_date.date())
-                ).options(joinedload(Event.venue)).all()
-                
-                expanded_events = []
-                for event in recurring:
-                    expanded_events.extend(expand_recurring_events(event, start_date, end_date))
-                
-                all_events = non_recurring + expanded_events
-                all_events.sort(key=lambda x: x.start)
-                event_list = [serialize_event(event, slim=True) for event in all_events]
-                
-                if use_cache:
-                    set_cached_calendar_events(start_str, end_str, event_list)
+            event_list = build_range_events(start_date, end_date)
+
+            if use_cache:
+                set_cached_calendar_events(start_str, end_str, event_list)
         
-        response = jsonify(event_list)
+        response = faceted_events_response(event_list)
         return set_cache_headers(response, max_age=300)  # Cache for 5 minutes
 
-    def venue_to_dict(venue):
-        return {
-            'id': venue.id,
-            'name': venue.name,
-            'address': venue.address,
-            'neighborhood': venue.neighborhood,
-            'venue_type': venue.venue_type,
-        }
+    @app.route('/events/upcoming')
+    def upcoming_events():
+        """Next events and recurring occurrences still running now.
+
+        Query params: limit (default 10, max 100), venue_id, category (id or name).
+        """
+        limit = min(max(request.args.get('limit', UPCOMING_DEFAULT_LIMIT, type=int), 1), UPCOMING_MAX_LIMIT)
+        venue_id = request.args.get('venue_id', type=int)
+        category = request.args.get('category', '').strip() or None
+
+        use_cache = not flask_session.get('logged_in')
+        cache_key = (limit, venue_id, category)
+        event_list = upcoming_events_cache.get(cache_key) if use_cache else None
+        if event_list is None:
+            with get_db_session() as session:
+                occurrences = upcoming_occurrences(
+                    session, _local_now_naive(), limit, venue_id=venue_id, category=category,
+                )
+            event_list = [serialize_event(event) for event in occurrences]
+            if use_cache:
+                upcoming_events_cache.set(cache_key, event_list)
+
+        return set_cache_headers(jsonify(event_list), max_age=60)
 
     @app.route('/venues')
     def list_venues():
         neighborhood = request.args.get('neighborhood', '').strip()
         venue_type = request.args.get('venue_type', '').strip()
 
-        with get_db_session() as session:
-            query = session.query(Venue)
-
-            if neighborhood:
-                query = query.filter(Venue.neighborhood == neighborhood)
-            if venue_type:
-                query = query.filter(Venue.venue_type == venue_type)
+        query = request.args.get('q', '')
+        if query.strip():
+            # Search mode: best matches first (up to fts.VENUE_SEARCH_LIMIT)
+            match = build_match_query(query)
+            venue_list = build_venue_search(match, neighborhood, venue_type) if match else []
+            return set_cache_headers(jsonify(venue_list), max_age=60)
 
-            venues = query.order_by(Venue.venue_type, Venue.name).all()
-            venue_list = [venue_to_dict(v) for v in venues]
-
-        response = jsonify(venue_list)
+        # Prebuilt bytes: no per-request query or JSON encoding
+        payload = get_venue_catalog().payload(neighborhood, venue_type)
+        response = app.response_class(payload, mimetype='application/json')
         return set_cache_headers(response, max_age=300)
 
     @app.route('/venues/<int:id>')
     def venue_detail(id):
-        with get_db_session() as session:
-            venue = session.query(Venue).filter(Venue.id == id).first()
-            if not venue:
-                abort(404)
-            upcoming_events = get_upcoming_events_for_venue(session, id)
-            map_embed_url, map_is_fallback = get_venue_map_embed(venue)
-            return render_template(
-                'venue_detail.html',
-                venue=venue,
-                upcoming_events=upcoming_events,
-                map_embed_url=map_embed_url,
-                map_is_fallback=map_is_fallback,
-                debug_event_url='https://thedetroitilove.com',
-            )
+        now = _local_now_naive()
+        # Anonymous pages are shared; logged-in pages carry edit links
+        use_cache = not flask_session.get('logged_in')
+        cached = venue_page_cache.get(id) if use_cache else None
+        if cached is None or cached[2] <= now:
+            with get_db_session() as session:
+                venue = session.query(Venue).filter(Venue.id == id).first()
+                if not venue:
+                    abort(404)
+                upcoming_events, valid_until = get_venue_upcoming(session, id, now)
+                map_embed_url, map_is_fallback = get_venue_map_embed(venue)
+                html = render_template(
+                    'venue_detail.html',
+                    venue=venue,
+                    upcoming_events=upcoming_events,
+                    map_embed_url=map_embed_url,
+                    map_is_fallback=map_is_fallback,
+                    debug_event_url='https://thedetroitilove.com',
+                    shared_page=use_cache,
+                ).encode('utf-8')
+            cached = (html, hashlib.sha1(html).hexdigest(), valid_until)
+            if use_cache:
+                venue_page_cache.set(id, cached)
+
+        html, etag, valid_until = cached
+        response = app.response_class(html, mimetype='text/html')
+        response.set_etag(etag)
+        max_age = max(0, min(300, int((valid_until - now).total_seconds())))
+        set_cache_headers(response, max_age=max_age)
+        return response.make_conditional(request)
 
     @app.route('/event/new', methods=['GET', 'POST'])
     @login_required
@@ -456,11 +919,11 @@ def register_events(app):
             if rrule_error:
                 flash(f'Invalid recurrence rule: {rrule_error}', 'error')
                 with get_db_session() as session:
-                    venues = get_form_venues(session)
-                    categories = session.query(Category).filter(Category.is_active == True).order_by(Category.usage_count.desc(), Category.name).all()
+                    selected_venue = get_selected_venue(session, venue_id)
+                    categories = get_form_categories(session)
                     return render_template(
                         'event_form.html',
-                        venues=venues,
+                        selected_venue=selected_venue,
                         categories=categories,
                         title=title,
                         description=description,
@@ -486,17 +949,12 @@ def register_events(app):
             # Get category IDs from form
             category_ids = request.form.getlist('category_ids')
             
-            # Convert category IDs to category names
-            categories_str = ','.join(category_ids) if category_ids else ''
-            
             with get_db_session() as session:
                 # Validate venue_id
                 if not venue_id:
                     flash('Please select a venue', 'error')
-                    venues = get_form_venues(session)
-                    categories = session.query(Category).filter(Category.is_active == True).order_by(Category.usage_count.desc(), Category.name).all()
+                    categories = get_form_categories(session)
                     return render_template('event_form.html', 
-                                        venues=venues,
                                         categories=categories,
                                         title=title,
                                         description=description,
@@ -529,8 +987,8 @@ def register_events(app):
                     is_virtual=False,
                     is_hybrid=False,
                     url=url,
-                    categories=categories_str
                 )
+                set_event_categories(event, _selected_categories(session, category_ids))
                 
                 # Generate ID for the new event based on its date
                 event.id = get_next_event_id(session, event.start_date)
@@ -539,15 +997,13 @@ def register_events(app):
                 session.commit()
             
             # Clear cache since we added a new event
-            clear_day_events_cache()
-            clear_calendar_events_cache()
+            clear_event_caches((venue_id,))
             
             return redirect(url_for('home'))
         
         with get_db_session() as session:
-            venues = get_form_venues(session)
-            categories = session.query(Category).filter(Category.is_active == True).order_by(Category.usage_count.desc(), Category.name).all()
-            return render_template('event_form.html', venues=venues, categories=categories)
+            categories = get_form_categories(session)
+            return render_template('event_form.html', categories=categories)
 
     @app.route('/event/<start_date>/<int:id>/edit', methods=['GET', 'POST'])
     @login_required
@@ -579,12 +1035,12 @@ def register_events(app):
                     ).first()
                     if not event:
                         abort(404)
-                    venues = get_form_venues(session)
-                    categories = session.query(Category).filter(Category.is_active == True).order_by(Category.usage_count.desc(), Category.name).all()
+                    selected_venue = get_selected_venue(session, venue_id)
+                    categories = get_form_categories(session)
                     return render_template(
                         'event_form.html',
                         event=event,
-                        venues=venues,
+                        selected_venue=selected_venue,
                         categories=categories,
                         rrule=rrule_str or '',
                     )
@@ -602,9 +1058,6 @@ def register_events(app):
             # Get category IDs from form
             category_ids = request.form.getlist('category_ids')
             
-            # Convert category IDs to category names
-            categories_str = ','.join(category_ids) if category_ids else ''
-            
             with get_db_session() as session:
                 event = session.query(Event).filter(
                     Event.start_date == event_date,
@@ -616,11 +1069,9 @@ def register_events(app):
                 # Validate venue_id
                 if not venue_id:
                     flash('Please select a venue', 'error')
-                    venues = get_form_venues(session)
-                    categories = session.query(Category).filter(Category.is_active == True).order_by(Category.usage_count.desc(), Category.name).all()
+                    categories = get_form_categories(session)
                     return render_template('event_form.html', 
                                         event=event,
-                                        venues=venues,
                                         categories=categories,
                                         title=title,
                                         description=description,
@@ -639,6 +1090,7 @@ def register_events(app):
                 if is_recurring and not recurring_until:
                     recurring_until = start.date().replace(year=start.date().year + 2)
 
+                changed_venue_ids = (event.venue_id, venue_id)
                 new_date = start.date()
                 if event.start_date != new_date:
                     # Composite PK includes start_date — recreate row for the new day
@@ -656,8 +1108,8 @@ def register_events(app):
                         is_virtual=event.is_virtual,
                         is_hybrid=event.is_hybrid,
                         url=url,
-                        categories=categories_str,
                     )
+                    set_event_categories(new_event, _selected_categories(session, category_ids))
                     new_event.id = get_next_event_id(session, new_date)
                     session.delete(event)
                     session.add(new_event)
@@ -674,13 +1126,12 @@ def register_events(app):
                     event.is_recurring = is_recurring
                     event.recurring_until = recurring_until
                     event.url = url
-                    event.categories = categories_str
+                    set_event_categories(event, _selected_categories(session, category_ids))
                 
                 session.commit()
             
             # Clear cache since we modified an event
-            clear_day_events_cache()
-            clear_calendar_events_cache()
+            clear_event_caches(changed_venue_ids)
             
             return redirect(url_for('home'))
         
@@ -691,9 +1142,9 @@ def register_events(app):
             ).first()
             if not event:
                 abort(404)
-            venues = get_form_venues(session)
-            categories = session.query(Category).filter(Category.is_active == True).order_by(Category.usage_count.desc(), Category.name).all()
-            return render_template('event_form.html', event=event, venues=venues, categories=categories)
+            selected_venue = get_selected_venue(session, event.venue_id)
+            categories = get_form_categories(session)
+            return render_template('event_form.html', event=event, selected_venue=selected_venue, categories=categories)
 
     @app.route('/event/<start_date>/<int:id>/delete', methods=['POST'])
     @login_required
@@ -711,12 +1162,12 @@ def register_events(app):
             ).first()
             if not event:
                 abort(404)
+            venue_id = event.venue_id
             session.delete(event)
             session.commit()
         
         # Clear cache since we deleted an event
-        clear_day_events_cache()
-        clear_calendar_events_cache()
+        clear_event_caches((venue_id,))
         
         return redirect(url_for('home'))
 
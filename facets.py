@@ -0,0 +1,197 @@
+"""Facet filters and counts for /events: neighborhood, venue type and category.
+
+Every cached day/range list from events.py is an EventListing: the
+serialized events plus, per event, (venue_id, category bitmask), the mask
+built from the event's event_category links (read in one batch per
+listing, never from the denormalized Event.categories label). Venue
+facets come from the venue catalog (venue_id -> neighborhood/type), and
+each category gets a dense bit position from the CategoryIndex the listing
+was built with, so a filter is a dict lookup and an AND per event and a
+mask is as wide as the number of categories. Facet counts for the
+unfiltered list are computed once when the listing is built, so neither
+filtering nor counting touches the database.
+
+tally() is the one definition of what an event adds to facet counts; the
+stored per-day counts in day_counts.py are made with it too.
+"""
+
+from collections import Counter
+
+from cacheout import Cache
+from sqlalchemy import text
+
+from database import engine
+from venue_catalog import get_venue_catalog
+
+FACET_NAMES = ('neighborhood', 'venue_type', 'category')
+
+# Counter key for the number of events tallied
+TOTAL = ('total', '')
+
+# Single entry: the CategoryIndex (cleared when categories change)
+category_index_cache = Cache(maxsize=1, ttl=5 * 60)
+
+# Linked category ids for a batch of event keys: one primary key range seek per key
+EVENT_CATEGORY_IDS_SQL = """
+    SELECT ec.start_date, ec.event_id, ec.category_id
+    FROM (VALUES {keys}) AS k JOIN event_category ec ON ec.start_date = k.column1 AND ec.event_id = k.column2
+"""
+
+# Event keys per EVENT_CATEGORY_IDS_SQL statement (two bound parameters each)
+CATEGORY_LINK_BATCH = 400
+
+
+class CategoryIndex:
+    """Category id <-> dense bit, and category ids or names (any case) -> id."""
+
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.names = {category_id: name for category_id, name in rows}
+        # Bit position -> category id; masks are only meaningful with the index that made them
+        self.ids = tuple(category_id for category_id, _ in rows)
+        self.bits = {category_id: 1 << position for position, category_id in enumerate(self.ids)}
+        self._ids = {}
+        for category_id, name in rows:
+            self._ids[str(category_id)] = category_id
+            self._ids[name.lower()] = category_id
+
+    def lookup(self, token):
+        """Category id for an id or name (any case), or None."""
+        return self._ids.get(str(token).strip().lower())
+
+    def mask(self, category_ids):
+        """Bitmask for category ids (ids this index doesn't know are left out)."""
+        mask = 0
+        for category_id in category_ids:
+            mask |= self.bits.get(category_id, 0)
+        return mask
+
+    def category_ids(self, mask):
+        """Category ids of the bits set in mask."""
+        while mask:
+            bit = mask & -mask
+            yield self.ids[bit.bit_length() - 1]
+            mask ^= bit
+
+
+def get_category_index(category_ids=()):
+    """The cached CategoryIndex, rebuilt first if it doesn't know one of category_ids
+    (a category created since it was built, possibly by another worker)."""
+    index = category_index_cache.get('categories')
+    if index is not None and any(category_id not in index.names for category_id in category_ids):
+        index = None
+    if index is None:
+        with engine.connect() as conn:
+            index = CategoryIndex(conn.execute(text("SELECT id, name FROM category")).fetchall())
+        category_index_cache.set('categories', index)
+    return index
+
+
+def clear_category_index():
+    """Drop the category index - call this when categories are modified"""
+    category_index_cache.clear()
+
+
+def event_category_ids(conn, events):
+    """{(start_date ISO, event id): (category ids)} from event_category for events (rows, snapshots or occurrences)."""
+    keys = sorted({(str(event.start_date), event.id) for event in events})
+    linked = {}
+    for first in range(0, len(keys), CATEGORY_LINK_BATCH):
+        batch = keys[first:first + CATEGORY_LINK_BATCH]
+        params = {}
+        for i, (start_date, event_id) in enumerate(batch):
+            params[f"d{i}"], params[f"i{i}"] = start_date, event_id
+        sql = EVENT_CATEGORY_IDS_SQL.format(keys=', '.join(f"(:d{i}, :i{i})" for i in range(len(batch))))
+        for start_date, event_id, category_id in conn.execute(text(sql), params):
+            linked.setdefault((start_date, event_id), []).append(category_id)
+    return {key: tuple(ids) for key, ids in linked.items()}
+
+
+class EventListing(list):
+    """Serialized events (a plain JSON list) with facet keys, the CategoryIndex their masks use, and counts."""
+
+    __slots__ = ('keys', 'categories', 'counts')
+
+
+def tally(counter, neighborhood, venue_type, category_ids):
+    """Add one event to counter: {TOTAL or (facet, value): events}, category values being ids."""
+    counter[TOTAL] += 1
+    if neighborhood:
+        counter[('neighborhood', neighborhood)] += 1
+    if venue_type:
+        counter[('venue_type', venue_type)] += 1
+    for category_id in category_ids:
+        counter[('category', category_id)] += 1
+
+
+def _count(keys, catalog, categories):
+    counter = Counter()
+    for venue_id, mask in keys:
+        venue = catalog.get(venue_id)
+        tally(counter, venue and venue.neighborhood, venue and venue.venue_type, categories.category_ids(mask))
+    counts = {name: {} for name in FACET_NAMES}
+    for (facet, value), count in counter.most_common():
+        if facet == 'category':
+            counts[facet][categories.names[value]] = count
+        elif facet in counts:
+            counts[facet][value] = count
+    return counts
+
+
+def build_listing(events, payloads):
+    """EventListing for events (in payload order) and their serialized payloads."""
+    with engine.connect() as conn:
+        linked = event_category_ids(conn, events)
+    categories = get_category_index({category_id for ids in linked.values() for category_id in ids})
+    listing = EventListing(payloads)
+    listing.categories = categories
+    listing.keys = tuple(
+        (event.venue_id, categories.mask(linked.get((str(event.start_date), event.id), ()))) for event in events
+    )
+    listing.counts = _count(listing.keys, get_venue_catalog(), categories)
+    return listing
+
+
+def _matches(catalog, venue_id, mask, neighborhood, venue_type, category_bit):
+    if category_bit and not mask & category_bit:
+        return False
+    if neighborhood or venue_type:
+        venue = catalog.get(venue_id)
+        if venue is None:
+            return False
+        if neighborhood and venue.neighborhood != neighborhood:
+            return False
+        if venue_type and venue.venue_type != venue_type:
+            return False
+    return True
+
+
+def filter_listing(listing, neighborhood='', venue_type='', category=''):
+    """EventListing of the events matching every given facet (listing itself when none is)."""
+    if not (neighborhood or venue_type or category):
+        return listing
+    filtered = EventListing()
+    filtered.categories = listing.categories
+    filtered.counts = None
+    category_bit = 0
+    if category:
+        category_bit = listing.categories.bits.get(listing.categories.lookup(category), 0)
+        if not category_bit:
+            filtered.keys = ()
+            return filtered
+
+    catalog = get_venue_catalog()
+    keys = []
+    for payload, key in zip(listing, listing.keys):
+        if _matches(catalog, key[0], key[1], neighborhood, venue_type, category_bit):
+            filtered.append(payload)
+            keys.append(key)
+    filtered.keys = tuple(keys)
+    return filtered
+
+
+def facet_counts(listing):
+    """{facet: {value: events}} for a listing; precomputed for unfiltered ones."""
+    if listing.counts is None:
+        listing.counts = _count(listing.keys, get_venue_catalog(), listing.categories)
+    return listing.counts
@@ -0,0 +1,487 @@
+"""Subscription feeds: iCalendar (/calendar.ics) and RSS 2.0 (/feed.xml).
+
+Both take optional venue_id and category (id or name) filters. The calendar
+lists one-off events from FEED_PAST_DAYS ago to FEED_AHEAD_DAYS ahead and
+every live recurring series once, as a VEVENT carrying its stored RRULE (ending
+at the earlier of its UNTIL and recurring_until, given in UTC), so clients
+expand the series themselves. The RSS feed lists the next FEED_ITEM_LIMIT
+occurrences. Absolute links are built on the configured site_url, never the
+request's Host.
+
+Bodies are built once and cached as encoded bytes with an ETag. Each feed
+depends on catalog_version rows that the triggers installed by
+migrate_database bump: 'feed' for the unfiltered feeds, 'feed:venue:<id>' and
+'feed:category:<id>' for filtered ones, so a write only retires the feeds it
+can change. Workers re-check those versions at most every FEED_CHECK_SECONDS;
+between checks a poll is a dict lookup (or a 304). Venue names and addresses
+come from the venue catalog, so a feed is also rebuilt once the catalog
+snapshot it was built from is replaced.
+"""
+
+import calendar
+import hashlib
+import logging
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta, time as dt_time
+from email.utils import format_datetime
+from functools import lru_cache
+from xml.sax.saxutils import escape as xml_escape
+
+import pytz
+from cacheout import Cache
+from dateutil.rrule import YEARLY, rrule, weekday
+from flask import abort, request
+from sqlalchemy import text
+
+import events
+from database import engine
+from events import (
+    _local_now_naive, _local_today, _series_rule, get_db_session, normalize_rrule, upcoming_occurrences,
+)
+from facets import event_category_ids
+from fts import lookup_category_id
+from urls import safe_http_url, site_url_for
+from venue_catalog import get_venue_catalog
+
+logger = logging.getLogger(__name__)
+
+FEED_VERSION_NAME = 'feed'
+
+# How often a cached feed re-checks its versions; edits reach subscribers within this
+FEED_CHECK_SECONDS = 30
+
+FEED_TTL_SECONDS = 6 * 60 * 60
+
+# Subscribers poll about hourly; conditional requests revalidate with the ETag
+FEED_MAX_AGE = 15 * 60
+
+FEED_PAST_DAYS = 30
+FEED_AHEAD_DAYS = 365
+FEED_ITEM_LIMIT = 50
+FEED_HORIZON_DAYS = 90
+
+PRODID = '-//Flask Events//Subscription Feed//EN'
+UID_DOMAIN = 'flask-events'
+
+# Initialize cache for encoded feeds
+# Key format: (kind, venue_id, category_id) with kind 'ics' or 'rss' (None: no filter)
+# Value: CachedFeed
+feed_cache = Cache(maxsize=500, ttl=FEED_TTL_SECONDS)
+
+CachedFeed = namedtuple('CachedFeed', ['body', 'etag', 'versions', 'catalog', 'valid_until', 'checked_at'])
+
+FEED_COLUMNS = """
+    e.start_date, e.id, e.title, e.description, e.start, e."end", e.venue_id, e.url,
+    e.is_recurring, e.rrule, e.recurring_until
+"""
+
+FeedRow = namedtuple('FeedRow', [
+    'start_date', 'id', 'title', 'description', 'start', 'end', 'venue_id', 'url',
+    'is_recurring', 'rrule', 'recurring_until',
+])
+
+# One-offs by start_date (PK range), then live series; filters are appended to both
+ONE_OFF_FEED_SQL = f"""
+    SELECT {FEED_COLUMNS} FROM event e
+    WHERE e.start_date BETWEEN :first AND :last AND COALESCE(e.is_recurring, 0) = 0 {{filters}}
+    ORDER BY e.start, e.start_date, e.id
+"""
+
+SERIES_FEED_SQL = f"""
+    SELECT {FEED_COLUMNS} FROM event e
+    WHERE e.is_recurring = 1 AND e.start_date <= :last
+      AND (e.recurring_until IS NULL OR e.recurring_until >= :first) {{filters}}
+    ORDER BY e.start, e.start_date, e.id
+"""
+
+VENUE_FILTER_SQL = "AND e.venue_id = :venue_id"
+
+CATEGORY_FILTER_SQL = """AND EXISTS (
+    SELECT 1 FROM event_category ec
+    WHERE ec.start_date = e.start_date AND ec.event_id = e.id AND ec.category_id = :category_id
+)"""
+
+VERSIONS_SQL = "SELECT name, version FROM catalog_version WHERE name IN ({names})"
+
+ICS_WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+
+def _version_names(venue_id, category_id):
+    names = []
+    if venue_id is not None:
+        names.append(f'{FEED_VERSION_NAME}:venue:{venue_id}')
+    if category_id is not None:
+        names.append(f'{FEED_VERSION_NAME}:category:{category_id}')
+    return tuple(names) or (FEED_VERSION_NAME,)
+
+
+def _read_versions(names):
+    """Versions for names (0 until a write creates the row), or None without catalog_version."""
+    params = {f"n{i}": name for i, name in enumerate(names)}
+    sql = VERSIONS_SQL.format(names=', '.join(f":{key}" for key in params))
+    try:
+        with engine.connect() as conn:
+            found = dict(conn.execute(text(sql), params).fetchall())
+    except Exception as e:
+        # Public workers skip migrations; feeds then only expire with the TTL
+        logger.error("Reading feed versions failed: %s", e)
+        return None
+    return tuple(found.get(name, 0) for name in names)
+
+
+def _parse_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _feed_rows(sql, venue_id, category_id, first, last):
+    filters = []
+    params = {"first": first.isoformat(), "last": last.isoformat()}
+    if venue_id is not None:
+        filters.append(VENUE_FILTER_SQL)
+        params["venue_id"] = venue_id
+    if category_id is not None:
+        filters.append(CATEGORY_FILTER_SQL)
+        params["category_id"] = category_id
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql.format(filters=' '.join(filters))), params).fetchall()
+    return [
+        row._replace(
+            start_date=_parse_date(row.start_date), start=_parse_datetime(row.start), end=_parse_datetime(row.end),
+            recurring_until=_parse_date(row.recurring_until),
+        )
+        for row in (FeedRow(*row) for row in rows)
+    ]
+
+
+def _feed_title(venue_id, category_name):
+    title = 'Events'
+    if category_name:
+        title = f'{category_name} events'
+    if venue_id is not None:
+        title += f' at {get_venue_catalog().name(venue_id)}'
+    return title
+
+
+def _event_link(event):
+    """Absolute URL for an event: its own link, else its venue page (None without either)."""
+    url = safe_http_url(event.url)
+    if url:
+        return url
+    if event.venue_id:
+        return site_url_for('venue_detail', id=event.venue_id)
+    return None
+
+
+def _event_categories(rows):
+    """{(start_date ISO, id): sorted category names} for rows, from event_category (names read fresh)."""
+    with engine.connect() as conn:
+        linked = event_category_ids(conn, rows)
+        names = dict(conn.execute(text("SELECT id, name FROM category")).fetchall()) if linked else {}
+    return {key: sorted(names[i] for i in ids if i in names) for key, ids in linked.items()}
+
+
+def _categories_of(categories, event):
+    return categories.get((str(event.start_date), event.id), ())
+
+
+def _location(venue_id):
+    record = get_venue_catalog().get(venue_id)
+    if record is None:
+        return ''
+    return f'{record.name}, {record.address}' if record.address else record.name
+
+
+# --- iCalendar -------------------------------------------------------------
+
+def _ics_text(value):
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Content line folded at 75 octets (RFC 5545 3.1), CRLF-terminated."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return data + b'\r\n'
+    parts = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1  # never split a UTF-8 sequence
+        parts.append(data[:cut])
+        data = data[cut:]
+        limit = 74  # continuation lines start with a space
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def _ics_local(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def _ics_utc(value):
+    return value.astimezone(pytz.UTC).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _ics_offset(offset):
+    minutes = int(offset.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    return f'{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+
+
+@lru_cache(maxsize=4)
+def _vtimezone(zone, year):
+    """VTIMEZONE lines for zone, with yearly rules read off its transitions in `year`."""
+    tz = pytz.timezone(zone)
+    instant = datetime(year, 1, 1, tzinfo=pytz.UTC)
+    previous = instant.astimezone(tz)
+    transitions = []
+    for _ in range(366 * 24):
+        instant += timedelta(hours=1)
+        local = instant.astimezone(tz)
+        if local.utcoffset() != previous.utcoffset():
+            transitions.append((previous, local))
+        previous = local
+
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{zone}']
+    if not transitions:
+        offset = _ics_offset(previous.utcoffset())
+        lines += ['BEGIN:STANDARD', 'DTSTART:19700101T000000', f'TZOFFSETFROM:{offset}', f'TZOFFSETTO:{offset}',
+                  f'TZNAME:{previous.tzname()}', 'END:STANDARD']
+    for before, after in transitions:
+        # Onset in the wall time of the offset being left, as RFC 5545 wants
+        onset = (after.astimezone(pytz.UTC) + before.utcoffset()).replace(tzinfo=None)
+        nth = -1 if onset.day + 7 > calendar.monthrange(onset.year, onset.month)[1] else (onset.day - 1) // 7 + 1
+        first = rrule(YEARLY, dtstart=datetime(1970, 1, 1, onset.hour, onset.minute), bymonth=onset.month,
+                      byweekday=weekday(onset.weekday(), nth))[0]
+        component = 'DAYLIGHT' if after.dst() else 'STANDARD'
+        lines += [
+            f'BEGIN:{component}',
+            f'DTSTART:{_ics_local(first)}',
+            f'RRULE:FREQ=YEARLY;BYMONTH={onset.month};BYDAY={nth}{ICS_WEEKDAYS[onset.weekday()]}',
+            f'TZOFFSETFROM:{_ics_offset(before.utcoffset())}',
+            f'TZOFFSETTO:{_ics_offset(after.utcoffset())}',
+            f'TZNAME:{after.tzname()}',
+            f'END:{component}',
+        ]
+    lines.append('END:VTIMEZONE')
+    return tuple(lines)
+
+
+def _ics_rrule(event):
+    """RRULE value for a series row, or None when the stored rule is unusable (logged)."""
+    rule, normalized = _series_rule(event)
+    if rule is None:
+        return None
+    parts = [p for p in normalized.split(';') if not p.upper().startswith('UNTIL=')]
+    if any(p.upper().startswith('COUNT=') for p in parts):
+        return ';'.join(parts)
+    # The series ends at the stored UNTIL (a local time, as the app expands it) or its
+    # recurring_until day, whichever is first; with a TZID start UNTIL must be UTC
+    until = rule._until
+    if event.recurring_until is not None:
+        series_end = datetime.combine(event.recurring_until, dt_time(23, 59, 59))
+        until = series_end if until is None else min(until, series_end)
+    if until is not None:
+        parts.append(f'UNTIL={_ics_utc(events.LOCAL_TIMEZONE.localize(until))}')
+    return ';'.join(parts)
+
+
+def _vevent(event, zone, stamp, categories):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.start_date.isoformat()}-{event.id}@{UID_DOMAIN}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART;TZID={zone}:{_ics_local(event.start)}',
+        f'DTEND;TZID={zone}:{_ics_local(event.end)}',
+    ]
+    if event.is_recurring and normalize_rrule(event.rrule):
+        rule = _ics_rrule(event)
+        if rule is None:
+            return None
+        lines.append(f'RRULE:{rule}')
+    lines.append(f'SUMMARY:{_ics_text(event.title)}')
+    if event.description:
+        lines.append(f'DESCRIPTION:{_ics_text(event.description)}')
+    location = _location(event.venue_id)
+    if location:
+        lines.append(f'LOCATION:{_ics_text(location)}')
+    link = _event_link(event)
+    if link:
+        lines.append(f'URL:{link}')
+    if categories:
+        lines.append('CATEGORIES:' + ','.join(_ics_text(name) for name in categories))
+    lines.append('END:VEVENT')
+    return lines
+
+
+def iter_calendar(venue_id=None, category_id=None, category_name=None):
+    """Encoded iCalendar lines: one-offs in the feed window, then every live series once."""
+    today = _local_today()
+    first, last = today - timedelta(days=FEED_PAST_DAYS), today + timedelta(days=FEED_AHEAD_DAYS)
+    zone = events.LOCAL_TIMEZONE.zone
+    stamp = _ics_utc(datetime.now(pytz.UTC))
+
+    for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_ics_text(_feed_title(venue_id, category_name))}', f'X-WR-TIMEZONE:{zone}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H', 'X-PUBLISHED-TTL:PT1H',
+    ):
+        yield _fold(line)
+    for line in _vtimezone(zone, today.year):
+        yield _fold(line)
+    for sql in (ONE_OFF_FEED_SQL, SERIES_FEED_SQL):
+        rows = _feed_rows(sql, venue_id, category_id, first, last)
+        categories = _event_categories(rows)
+        for event in rows:
+            for line in _vevent(event, zone, stamp, _categories_of(categories, event)) or ():
+                yield _fold(line)
+    yield _fold('END:VCALENDAR')
+
+
+# --- RSS -------------------------------------------------------------------
+
+def _when(event):
+    start, end = event.start, event.end
+    label = f"{start.strftime('%a %b')} {start.day}, {start.strftime('%I:%M %p').lstrip('0')}"
+    if end.date() == start.date():
+        return f"{label} - {end.strftime('%I:%M %p').lstrip('0')}"
+    return f"{label} - {end.strftime('%a %b')} {end.day}, {end.strftime('%I:%M %p').lstrip('0')}"
+
+
+def _rss_item(event, categories):
+    venue = get_venue_catalog().name(event.venue_id)
+    summary = _when(event) + (f' at {venue}' if venue else '')
+    if event.description:
+        summary += f'. {event.description}'
+    parts = [
+        '<item>',
+        f'<title>{xml_escape(event.title)}: {xml_escape(_when(event))}</title>',
+    ]
+    link = _event_link(event)
+    if link:
+        parts.append(f'<link>{xml_escape(link)}</link>')
+    guid = f'event-{event.start_date.isoformat()}-{event.id}@{UID_DOMAIN}/{_ics_local(event.start)}'
+    parts.append(f'<guid isPermaLink="false">{xml_escape(guid)}</guid>')
+    parts.append(f'<description>{xml_escape(summary)}</description>')
+    for name in categories:
+        parts.append(f'<category>{xml_escape(name)}</category>')
+    parts.append('</item>')
+    return ''.join(parts)
+
+
+def iter_rss(occurrences, venue_id=None, category_name=None):
+    """Encoded RSS 2.0 chunks for occurrences (already in start order)."""
+    title = _feed_title(venue_id, category_name)
+    # Canonical URLs only: the body is cached per (kind, venue, category), whatever Host or query asked
+    self_url = site_url_for('events_rss', venue_id=venue_id, category=category_name)
+    site = site_url_for('venue_detail', id=venue_id) if venue_id is not None else site_url_for('home')
+    yield b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield b'<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>'
+    yield (
+        f'<title>{xml_escape(title)}</title><link>{xml_escape(site)}</link>'
+        f'<description>{xml_escape("Upcoming " + title[0].lower() + title[1:])}</description>'
+        f'<atom:link href="{xml_escape(self_url)}" rel="self" type="application/rss+xml"/>'
+        f'<lastBuildDate>{format_datetime(datetime.now(pytz.UTC))}</lastBuildDate>'
+        f'<ttl>{FEED_MAX_AGE // 60}</ttl>'
+    ).encode('utf-8')
+    categories = _event_categories(occurrences)
+    for event in occurrences:
+        yield _rss_item(event, _categories_of(categories, event)).encode('utf-8')
+    yield b'</channel></rss>\n'
+
+
+# --- Routes ----------------------------------------------------------------
+
+def _next_midnight(now):
+    return datetime.combine(now.date() + timedelta(days=1), dt_time.min)
+
+
+def build_feed(kind, venue_id, category_id, category_name, now):
+    """(body bytes, naive local datetime the body stops being current)."""
+    if kind == 'ics':
+        # The window moves with the date
+        return b''.join(iter_calendar(venue_id, category_id, category_name)), _next_midnight(now)
+    with get_db_session() as session:
+        occurrences = upcoming_occurrences(
+            session, now, FEED_ITEM_LIMIT, until=now + timedelta(days=FEED_HORIZON_DAYS), venue_id=venue_id,
+            category=str(category_id) if category_id is not None else None,
+        )
+    # Changes when a listed event ends (it drops off) or the day rolls over
+    valid_until = min([_next_midnight(now)] + [event.end for event in occurrences])
+    return b''.join(iter_rss(occurrences, venue_id, category_name)), valid_until
+
+
+def get_feed(kind, venue_id, category_id, category_name):
+    """CachedFeed for the filters, rebuilt when it lapses or one of its versions moved."""
+    key = (kind, venue_id, category_id)
+    now = _local_now_naive()
+    catalog = get_venue_catalog()
+    cached = feed_cache.get(key)
+    if cached is not None and now < cached.valid_until and cached.catalog is catalog:
+        if time.monotonic() - cached.checked_at < FEED_CHECK_SECONDS:
+            return cached
+        versions = _read_versions(_version_names(venue_id, category_id))
+        if versions is None or versions == cached.versions:
+            cached = cached._replace(checked_at=time.monotonic())
+            feed_cache.set(key, cached)
+            return cached
+
+    # Versions first: a write landing during the build only costs one extra rebuild
+    versions = _read_versions(_version_names(venue_id, category_id))
+    body, valid_until = build_feed(kind, venue_id, category_id, category_name, now)
+    cached = CachedFeed(body, hashlib.sha1(body).hexdigest(), versions, catalog, valid_until, time.monotonic())
+    feed_cache.set(key, cached)
+    return cached
+
+
+def clear_feed_cache():
+    """Drop every encoded feed (writes already retire the feeds they change through versions)"""
+    feed_cache.clear()
+
+
+def register_feed_routes(app):
+    """iCalendar and RSS subscriptions, optionally per venue and category"""
+
+    def feed_filters():
+        """(venue_id, category_id, category name) from the query string; 404 for unknown ones."""
+        venue_id = request.args.get('venue_id', type=int)
+        if venue_id is not None and get_venue_catalog().get(venue_id) is None:
+            abort(404)
+        category = request.args.get('category', '').strip()
+        category_id = category_name = None
+        if category:
+            with engine.connect() as conn:
+                category_id = lookup_category_id(conn, category)
+                if category_id is None:
+                    abort(404)
+                category_name = conn.execute(
+                    text("SELECT name FROM category WHERE id = :id"), {"id": category_id}
+                ).scalar()
+        return venue_id, category_id, category_name
+
+    def feed_response(kind, mimetype):
+        venue_id, category_id, category_name = feed_filters()
+        feed = get_feed(kind, venue_id, category_id, category_name)
+        response = app.response_class(feed.body, mimetype=mimetype)
+        response.set_etag(feed.etag)
+        response.headers['Cache-Control'] = f'public, max-age={FEED_MAX_AGE}'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response.make_conditional(request)
+
+    @app.route('/calendar.ics')
+    def calendar_ics():
+        """Query params: venue_id, category (id or name)."""
+        response = feed_response('ics', 'text/calendar')
+        response.headers['Content-Disposition'] = 'inline; filename="calendar.ics"'
+        return response
+
+    @app.route('/feed.xml')
+    def events_rss():
+        """Query params: venue_id, category (id or name)."""
+        return feed_response('rss', 'application/rss+xml')
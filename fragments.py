@@ -0,0 +1,110 @@
+"""Server-rendered day list (/events/fragment?date=) for the WordPress list widget.
+
+The fragment is the markup flask-events.js would build from /events?date=:
+an ONGOING group (events that started on an earlier day, as build_day_events
+selected them), then one group per start time. It is rendered from
+templates/day_events_fragment.html once per day listing and cached as HTML
+and gzip bytes with an ETag; an entry is only served while the day listing it
+was rendered from is still the cached one, so event writes retire it with the
+day cache.
+"""
+
+import gzip
+import hashlib
+from datetime import datetime, time as dt_time
+
+from cacheout import Cache
+from flask import jsonify, render_template, request, session as flask_session
+
+from events import CACHE_TTL_SECONDS, _local_today, get_cached_day_events, get_day_events
+from urls import site_url_for
+
+# Same fallback as the list widgets: sample events often have no url
+FALLBACK_EVENT_URL = 'https://thedetroitilove.com'
+
+# Initialize cache for rendered day fragments (anonymous visitors only)
+# Key format: f"{date_str}" (e.g., "2025-01-15")
+# Value: (day listing it was rendered from, html bytes, gzip bytes, etag)
+day_fragment_cache = Cache(maxsize=30, ttl=CACHE_TTL_SECONDS)
+
+
+def _time_label(value):
+    # Matches the widgets' toLocaleTimeString(..., hour12) output with spaces removed: "7:30PM"
+    return value.strftime('%I:%M%p').lstrip('0')
+
+
+def group_day_events(target_date, listing):
+    """(ongoing, [(time label, events)]) for a day listing, each event a dict with start/end labels."""
+    midnight = datetime.combine(target_date, dt_time.min)
+    ongoing = []
+    slots = {}
+    for payload in listing:
+        start = datetime.fromisoformat(payload['start'])
+        event = dict(payload, start_label=_time_label(start),
+                     end_label=_time_label(datetime.fromisoformat(payload['end'])))
+        if start < midnight:
+            ongoing.append(event)
+        else:
+            # The listing is in start order, so slots come out in time order
+            slots.setdefault((start.hour, start.minute), []).append(event)
+    return ongoing, [(events[0]['start_label'], events) for events in slots.values()]
+
+
+def render_day_fragment(target_date, listing):
+    """HTML for the grouped day list."""
+    ongoing, slots = group_day_events(target_date, listing)
+    return render_template(
+        'day_events_fragment.html', ongoing=ongoing, slots=slots, fallback_url=FALLBACK_EVENT_URL,
+    )
+
+
+def get_day_fragment(target_date, use_cache=True):
+    """(html bytes, gzip bytes, etag) for target_date's list, rebuilt when the day listing changes."""
+    date_str = target_date.isoformat()
+    cached = day_fragment_cache.get(date_str) if use_cache else None
+    if cached is not None and cached[0] is get_cached_day_events(date_str):
+        return cached[1:]
+
+    listing = get_day_events(target_date, use_cache)
+    html = render_day_fragment(target_date, listing).encode('utf-8')
+    # mtime=0 keeps the bytes (and so any ETag a proxy derives) stable across rebuilds
+    compressed = gzip.compress(html, compresslevel=9, mtime=0)
+    etag = hashlib.sha1(html).hexdigest()
+    if use_cache:
+        day_fragment_cache.set(date_str, (listing, html, compressed, etag))
+    return html, compressed, etag
+
+
+def clear_day_fragment_cache():
+    """Drop every rendered fragment (entries also retire on their own with the day cache)"""
+    day_fragment_cache.clear()
+
+
+def register_fragment_routes(app):
+    """Pre-rendered day list HTML for the WordPress list widget"""
+
+    # Venue links in the shared fragment are built on the configured site_url
+    app.add_template_global(site_url_for)
+
+    @app.route('/events/fragment')
+    def day_events_fragment():
+        """Query params: date (YYYY-MM-DD, default today)."""
+        try:
+            target_date = datetime.strptime(request.args['date'], '%Y-%m-%d').date() \
+                if request.args.get('date') else _local_today()
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+        logged_in = flask_session.get('logged_in')
+        html, compressed, etag = get_day_fragment(target_date, use_cache=not logged_in)
+        # Already compressed bytes are sent as-is (Flask-Compress skips encoded responses)
+        if request.accept_encodings['gzip']:
+            response = app.response_class(compressed, mimetype='text/html')
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(etag + '-gzip')
+        else:
+            response = app.response_class(html, mimetype='text/html')
+            response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-store' if logged_in else 'public, max-age=300'
+        response.headers['Vary'] = 'Accept-Encoding, Cookie'
+        return response.make_conditional(request)
@@ -1,214 +1,941 @@
-from sqlalchemy import text
+from cacheout import Cache
+from flask import request, jsonify
+from markupsafe import escape
+from sqlalchemy import and_, column, text, tuple_
+from datetime import date, datetime, time as dt_time
+import logging
+import re
+import threading
 import time
-from database import engine, Event
+from types import SimpleNamespace
+import pytz
+from database import engine, Event, EVENT_KEY_ID_BITS, EVENT_KEY_ID_MASK
+from venue_catalog import get_venue_catalog
 
-def search_events(query, session):
-    """Search for events using FTS"""
+logger = logging.getLogger(__name__)
+
+# External-content index over event(title, description); the FTS rowid is event.event_key,
+# so the text is stored once (in event) and each match maps to exactly one event
+FTS_COLUMNS = ('title', 'description')
+
+# bm25 weights per FTS column: title matches count 10x description matches
+BM25_RANK = 'bm25(event_fts, 10.0, 1.0)'
+
+# Trigram index over the same columns: substring and typo-tolerant matching
+TRIGRAM_BM25_RANK = 'bm25(event_trigram, 10.0, 1.0)'
+TRIGRAM_MIN_CHARS = 3
+# Fuzzy search: rank this many trigram candidates, keep those sharing enough trigrams
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_OVERLAP = 0.5
+
+MAX_QUERY_TOKENS = 8
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+SNIPPET_TOKENS = 12
+
+# Snippet markers: control characters can't appear in escaped text, so they are
+# swapped for <mark> after HTML-escaping
+_MARK_OPEN = '\x02'
+_MARK_CLOSE = '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Ranked search results: key lists (event_key, score, snippet), never rows or ORM objects.
+# Key: ('page', match, filters..., after, limit) or ('fuzzy', tokens, filters..., limit)
+# Value: (ranked, has_more). The whole cache is tied to the content generation that
+# the event triggers bump, so it is dropped only when indexed content changes.
+SEARCH_CACHE_TTL_SECONDS = 60 * 60
+search_cache = Cache(maxsize=2000, ttl=SEARCH_CACHE_TTL_SECONDS, enable_stats=True)
+_search_cache_generation = None
+_search_cache_lock = threading.Lock()
+
+# Ranked page of matches; :after_* is the keyset cursor (last row of the previous page)
+SEARCH_PAGE_SQL = f"""
+    SELECT f.rowid, {BM25_RANK} AS score, e.start_date, e.id
+    FROM event_fts f
+    JOIN event e ON e.start_date = date((f.rowid >> {EVENT_KEY_ID_BITS}) * 86400, 'unixepoch')
+                AND e.id = (f.rowid & {EVENT_KEY_ID_MASK})
+    WHERE event_fts MATCH :match {{filters}}
+      AND (score, e.start_date, e.id) > (:after_score, :after_date, :after_id)
+    ORDER BY score, e.start_date, e.id
+    LIMIT :limit
+"""
+
+# Current rows for cached keys (event.event_key is indexed)
+HYDRATE_SQL = """
+    SELECT e.event_key, e.start_date, e.id, e.title, e.start, e."end", e.venue_id,
+           e.is_recurring, e.url, e.rrule, e.recurring_until
+    FROM event e
+    WHERE e.event_key IN ({keys})
+"""
+
+# Rules of the recurring series among ranked keys, to check them against a date window
+SERIES_SQL = """
+    SELECT e.event_key, e.id, e.title, e.start, e."end", e.rrule, e.recurring_until
+    FROM event e
+    WHERE e.event_key IN ({keys}) AND e.is_recurring = 1
+"""
+
+# Venue index: rowid is venue.id. Name hits rank far above description hits.
+VENUE_BM25_RANK = 'bm25(venue_fts, 10.0, 2.0, 4.0, 3.0, 1.0, 1.0)'
+VENUE_SEARCH_LIMIT = 50
+
+VENUE_SEARCH_SQL = f"""
+    SELECT v.id, v.name, v.address, v.neighborhood, v.venue_type
+    FROM venue_fts f
+    JOIN venue v ON v.id = f.rowid
+    WHERE venue_fts MATCH :match
+      AND (:neighborhood = '' OR v.neighborhood = :neighborhood)
+      AND (:venue_type = '' OR v.venue_type = :venue_type)
+    ORDER BY {VENUE_BM25_RANK}, v.name
+    LIMIT :limit
+"""
+
+# Candidates sharing any trigram with the query, best bm25 first (re-scored in Python)
+FUZZY_CANDIDATES_SQL = f"""
+    SELECT f.rowid, e.title, e.description
+    FROM event_trigram f
+    JOIN event e ON e.start_date = date((f.rowid >> {EVENT_KEY_ID_BITS}) * 86400, 'unixepoch')
+                AND e.id = (f.rowid & {EVENT_KEY_ID_MASK})
+    WHERE event_trigram MATCH :match {{filters}}
+    ORDER BY {TRIGRAM_BM25_RANK}
+    LIMIT :limit
+"""
+
+SNIPPET_SQL = """
+    SELECT rowid, snippet(event_fts, -1, :mark_open, :mark_close, '…', :tokens)
+    FROM event_fts
+    WHERE event_fts MATCH :match AND rowid IN ({rowids})
+"""
+
+
+def build_match_query(raw):
+    """Turn free text into safe FTS5 MATCH syntax, or None if nothing is searchable.
+
+    Every word is quoted (so operators, quotes and column filters in user input
+    are plain text) and all words must match; the last one is a prefix so
+    results follow the user while typing.
+    """
+    tokens = _TOKEN_RE.findall(raw or '')[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return None
+    # Lowercase so "Jazz" and "jazz" share a search cache entry (FTS5 folds case anyway)
+    terms = [f'"{token.lower()}"' for token in tokens]
+    if not raw[-1:].isspace():
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _fts_string(value):
+    """Quote a value as one FTS5 string (embedded quotes doubled)."""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def trigrams(word, padded=False):
+    """Lowercased 3-character windows of a word, as the trigram tokenizer indexes them.
+
+    padded=True adds word-boundary trigrams ("  j", " ja", ..., "zz "), so word
+    starts and ends count when scoring fuzzy matches.
+    """
+    word = word.lower()
+    if padded:
+        word = f'  {word} '
+    return {word[i:i + TRIGRAM_MIN_CHARS] for i in range(len(word) - TRIGRAM_MIN_CHARS + 1)}
+
+
+def event_search_clause(search):
+    """Admin list search: a condition on event.event_key, or None if nothing is searchable.
+
+    Each whitespace-separated term must appear as a substring of the title or
+    description (via event_trigram). Terms shorter than a trigram can't use that
+    index, so they match word prefixes through event_fts instead.
+    """
+    terms = (search or '').split()
+    substrings = [_fts_string(term) for term in terms if len(term) >= TRIGRAM_MIN_CHARS]
+    prefixes = [
+        f'"{token}"*' for term in terms if len(term) < TRIGRAM_MIN_CHARS
+        for token in _TOKEN_RE.findall(term)
+    ]
+
+    conditions = []
+    if substrings:
+        conditions.append(Event.event_key.in_(
+            text("SELECT rowid FROM event_trigram WHERE event_trigram MATCH :substrings")
+            .bindparams(substrings=' AND '.join(substrings))
+            .columns(column('rowid'))
+        ))
+    if prefixes:
+        conditions.append(Event.event_key.in_(
+            text("SELECT rowid FROM event_fts WHERE event_fts MATCH :prefixes")
+            .bindparams(prefixes=' '.join(prefixes))
+            .columns(column('rowid'))
+        ))
+    if not conditions:
+        return None
+    return and_(*conditions)
+
+
+def lookup_category_id(conn, category):
+    """Id of the category given by id or name, or None."""
+    return conn.execute(text(
+        "SELECT id FROM category WHERE name = :category OR CAST(id AS TEXT) = :category"
+    ), {"category": str(category)}).scalar()
+
+
+def _highlight(snippet):
+    return str(escape(snippet)).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+
+def _search_filters(conn, params, date_from=None, date_to=None, venue_id=None, category=None):
+    """SQL appended to a search WHERE clause (params are added to `params`)."""
+    filters = []
+    if date_from is not None:
+        # Recurring series that started earlier still have upcoming instances
+        filters.append("""AND (e.start_date >= :date_from OR (e.is_recurring = 1 AND
+                          (e.recurring_until IS NULL OR e.recurring_until >= :date_from)))""")
+        params["date_from"] = date_from.isoformat()
+    if date_to is not None:
+        filters.append("AND e.start_date <= :date_to")
+        params["date_to"] = date_to.isoformat()
+    if venue_id is not None:
+        filters.append("AND e.venue_id = :venue_id")
+        params["venue_id"] = venue_id
+    if category:
+        # Unknown category: NULL id, nothing matches
+        filters.append("""AND EXISTS (SELECT 1 FROM event_category ec WHERE ec.start_date = e.start_date
+                          AND ec.event_id = e.id AND ec.category_id = :category_id)""")
+        params["category_id"] = lookup_category_id(conn, category)
+    return ' '.join(filters)
+
+
+def _series(event_id, title, start, end, rrule, recurring_until):
+    return SimpleNamespace(
+        id=event_id, title=title, start=datetime.fromisoformat(start), end=datetime.fromisoformat(end),
+        rrule=rrule, recurring_until=date.fromisoformat(recurring_until) if recurring_until else None,
+    )
+
+
+def _window_occurrence(series, date_from, date_to):
+    """(start, end) of the series' first occurrence starting on/after date_from and by date_to, or None."""
+    # events imports this module, so its rule parser is looked up at call time
+    from events import _series_rule
+
+    rule, _ = _series_rule(series)
+    if rule is None:
+        return None
+    after = datetime.combine(date_from, dt_time.min) if date_from is not None else series.start
+    start = rule.after(after, inc=True)
+    if start is None:
+        return None
+    last_day = min(day for day in (series.recurring_until, date_to, date.max) if day is not None)
+    if start.date() > last_day:
+        return None
+    return start, start + (series.end - series.start)
+
+
+def _outside_window(conn, event_keys, date_from, date_to):
+    """Keys among event_keys of recurring series with no occurrence in the date window."""
+    if not event_keys or (date_from is None and date_to is None):
+        return set()
+    keys = ', '.join(str(int(event_key)) for event_key in event_keys)
+    return {
+        row[0] for row in conn.execute(text(SERIES_SQL.format(keys=keys)))
+        if _window_occurrence(_series(*row[1:]), date_from, date_to) is None
+    }
+
+
+def content_generation(conn):
+    """Counter bumped by the event triggers on every change to indexed content."""
+    return conn.execute(text("SELECT value FROM fts_state WHERE key = 'content_generation'")).scalar()
+
+
+def _sync_search_cache(conn):
+    """Drop every cached result list if indexed content changed since they were stored."""
+    global _search_cache_generation
+    generation = content_generation(conn)
+    if generation != _search_cache_generation:
+        with _search_cache_lock:
+            if generation != _search_cache_generation:
+                search_cache.clear()
+                _search_cache_generation = generation
+
+
+def current_search_generation():
+    """Content generation the cached search results belong to (None until the first search)."""
+    return _search_cache_generation
+
+
+def clear_search_cache():
+    """Forget cached search results and reset hit/miss stats (results also reset on content changes)"""
+    global _search_cache_generation
+    with _search_cache_lock:
+        search_cache.clear()
+        search_cache.stats.reset()
+        _search_cache_generation = None
+
+
+def _hydrate(conn, ranked, date_from=None, date_to=None):
+    """Result dicts for ranked (event_key, snippet) pairs, from current event rows.
+
+    With a date window, a recurring series reports its first occurrence in it.
+    """
+    if not ranked:
+        return []
+    keys = ', '.join(str(int(event_key)) for event_key, _ in ranked)
+    rows = {row[0]: row for row in conn.execute(text(HYDRATE_SQL.format(keys=keys)))}
+
+    catalog = get_venue_catalog()
+    results = []
+    for event_key, snippet in ranked:
+        row = rows.get(event_key)
+        if row is None:  # Deleted since ranking; the generation check catches up next call
+            continue
+        _, start_date, event_id, title, start, end, venue_id, is_recurring, url, rrule, recurring_until = row
+        if is_recurring and (date_from is not None or date_to is not None):
+            occurrence = _window_occurrence(
+                _series(event_id, title, start, end, rrule, recurring_until), date_from, date_to,
+            )
+            if occurrence is None:  # Rule edited since ranking; the generation check catches up next call
+                continue
+            start, end = occurrence
+        else:
+            start, end = datetime.fromisoformat(start), datetime.fromisoformat(end)
+        results.append({
+            'id': event_id,
+            'start_date': start_date,
+            'title': title,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'venue_id': venue_id,
+            'venue': catalog.name(venue_id),
+            'is_recurring': bool(is_recurring),
+            'url': url,
+            'snippet': _highlight(snippet),
+        })
+    return results
+
+
+def _rank_event_page(conn, match, filters, after, limit):
+    """Uncached ranking: ([(event_key, score, start_date, id, snippet)], has_more)."""
+    params = {"match": match, "limit": limit + 1}
+    after_score, after_date, after_id = after or (float('-inf'), '', 0)
+    params.update({"after_score": after_score, "after_date": after_date, "after_id": after_id})
+
+    sql_filters = _search_filters(conn, params, **filters)
+    # The SQL window only bounds a series by its first start and recurring_until; series with
+    # no occurrence in the window are dropped here, reading on until the page is full
+    kept = []
+    while True:
+        rows = conn.execute(text(SEARCH_PAGE_SQL.format(filters=sql_filters)), params).fetchall()
+        dropped = _outside_window(conn, [row[0] for row in rows], filters['date_from'], filters['date_to'])
+        kept.extend(row for row in rows if row[0] not in dropped)
+        if len(kept) > limit or len(rows) <= limit:
+            break
+        _, params["after_score"], params["after_date"], params["after_id"] = rows[-1]
+    page, has_more = kept[:limit], len(kept) > limit
+
+    snippets = {}
+    if page:
+        rowids = ', '.join(str(int(row[0])) for row in page)
+        snippets = dict(conn.execute(text(SNIPPET_SQL.format(rowids=rowids)), {
+            "match": match, "mark_open": _MARK_OPEN, "mark_close": _MARK_CLOSE,
+            "tokens": SNIPPET_TOKENS,
+        }).fetchall())
+    ranked = [(rowid, score, start_date, event_id, snippets.get(rowid, ''))
+              for rowid, score, start_date, event_id in page]
+    return ranked, has_more
+
+
+def search_event_page(match, *, date_from=None, date_to=None, venue_id=None, category=None,
+                      after=None, limit=SEARCH_DEFAULT_LIMIT):
+    """One bm25-ranked page of events matching `match` (already built by build_match_query).
+
+    Returns (results, next_cursor); next_cursor is None on the last page. Snippets
+    are only generated for the rows on the page. The ranking is cached; event rows
+    are read fresh for each call.
+    """
+    filters = {'date_from': date_from, 'date_to': date_to, 'venue_id': venue_id, 'category': category}
+    cache_key = ('page', match, date_from, date_to, venue_id, category, after, limit)
+
+    with engine.connect() as conn:
+        _sync_search_cache(conn)
+        cached = search_cache.get(cache_key)
+        if cached is None:
+            cached = _rank_event_page(conn, match, filters, after, limit)
+            search_cache.set(cache_key, cached)
+        ranked, has_more = cached
+        results = _hydrate(
+            conn, [(event_key, snippet) for event_key, _, _, _, snippet in ranked], date_from, date_to,
+        )
+
+    next_cursor = None
+    if has_more:
+        _, score, start_date, event_id, _ = ranked[-1]
+        next_cursor = f"{score!r},{start_date},{event_id}"
+    return results, next_cursor
+
+
+def _rank_fuzzy(conn, tokens, filters, limit):
+    """Uncached fuzzy ranking: event keys, best trigram overlap first."""
+    indexed = set().union(*(trigrams(token) for token in tokens))
+    if not indexed:
+        return []
+    wanted = set().union(*(trigrams(token, padded=True) for token in tokens))
+
+    params = {"match": ' OR '.join(_fts_string(gram) for gram in sorted(indexed)), "limit": FUZZY_CANDIDATES}
+    sql_filters = _search_filters(conn, params, **filters)
+    rows = conn.execute(text(FUZZY_CANDIDATES_SQL.format(filters=sql_filters)), params).fetchall()
+    dropped = _outside_window(conn, [row[0] for row in rows], filters['date_from'], filters['date_to'])
+    rows = [row for row in rows if row[0] not in dropped]
+
+    scored = []
+    for position, (rowid, title, description) in enumerate(rows):
+        words = _TOKEN_RE.findall(f"{title or ''} {description or ''}")
+        found = set().union(*(trigrams(word, padded=True) for word in words))
+        overlap = len(wanted & found) / len(wanted)
+        if overlap >= FUZZY_MIN_OVERLAP:
+            scored.append((-overlap, position, rowid))
+    scored.sort()
+    return [rowid for _, _, rowid in scored[:limit]]
+
+
+def fuzzy_search_events(query, *, date_from=None, date_to=None, venue_id=None, category=None,
+                        limit=SEARCH_DEFAULT_LIMIT):
+    """Typo-tolerant fallback: events sharing most of the query's trigrams.
+
+    Candidates come from event_trigram (any shared trigram, bm25 order); each is
+    kept if at least FUZZY_MIN_OVERLAP of the query's word trigrams (padded, as in
+    pg_trgm) occur in its title or description words, best overlap first. Same result
+    shape as search_event_page, with empty snippets and no cursor.
+    """
+    tokens = tuple(token.lower() for token in _TOKEN_RE.findall(query or '')[:MAX_QUERY_TOKENS])
+    if not tokens:
+        return []
+    filters = {'date_from': date_from, 'date_to': date_to, 'venue_id': venue_id, 'category': category}
+    cache_key = ('fuzzy', tokens, date_from, date_to, venue_id, category, limit)
+
+    with engine.connect() as conn:
+        _sync_search_cache(conn)
+        event_keys = search_cache.get(cache_key)
+        if event_keys is None:
+            event_keys = _rank_fuzzy(conn, tokens, filters, limit)
+            search_cache.set(cache_key, event_keys)
+        return _hydrate(conn, [(event_key, '') for event_key in event_keys], date_from, date_to)
+
+
+def parse_search_cursor(cursor):
+    """Inverse of the next_cursor built in search_event_page; None if malformed."""
     try:
-        # Use FTS for full-text search through the session
-        fts_results = session.execute(text("""
-            SELECT id FROM event_fts 
-            WHERE event_fts MATCH :query 
-            ORDER BY rank
-            LIMIT 50
-        """), {"query": query}).fetchall()
-        
-        if not fts_results:
-            return []
+        score, start_date, event_id = cursor.split(',')
+        return float(score), date.fromisoformat(start_date).isoformat(), int(event_id)
+    except (ValueError, AttributeError):
+        return None
+
+
+def search_events(query, session):
+    """Search for events using FTS (best matches first, up to 50; fuzzy if nothing matches)
+
+    Rankings come from the search cache; only the matched events are loaded.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+    results, _ = search_event_page(match, limit=SEARCH_MAX_LIMIT)
+    if not results:
+        results = fuzzy_search_events(query, limit=SEARCH_MAX_LIMIT)
+    if not results:
+        return []
+
+    keys = [(date.fromisoformat(r['start_date']), r['id']) for r in results]
+    # Exact composite-key lookup: one row per result
+    events = session.query(Event).filter(tuple_(Event.start_date, Event.id).in_(keys)).all()
+    by_key = {(e.start_date, e.id): e for e in events}
+    return [by_key[key] for key in keys if key in by_key]
+
+
+def search_venues(match, neighborhood='', venue_type='', limit=VENUE_SEARCH_LIMIT):
+    """bm25-ranked venue dicts (same keys as events.venue_to_dict) for a built MATCH query."""
+    with engine.connect() as conn:
+        rows = conn.execute(text(VENUE_SEARCH_SQL), {
+            "match": match,
+            "neighborhood": neighborhood,
+            "venue_type": venue_type,
+            "limit": limit,
+        }).fetchall()
+    return [
+        {'id': venue_id, 'name': name, 'address': address, 'neighborhood': hood, 'venue_type': kind}
+        for venue_id, name, address, hood, kind in rows
+    ]
+
+
+def search_venue_ids(query):
+    """Ids of venues matching free text (admin search), or None if nothing is searchable."""
+    match = build_match_query(query)
+    if match is None:
+        return None
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT rowid FROM venue_fts WHERE venue_fts MATCH :match"), {"match": match})
+        return [row[0] for row in rows]
+
+
+def register_search_routes(app):
+    """Public full-text search API"""
+
+    @app.route('/search')
+    def search():
+        """Ranked event search.
+
+        Query params: q (required), upcoming=1 or from/to (YYYY-MM-DD),
+        venue_id, category (id or name), limit (max 50), cursor.
+        With no word matches, the first page falls back to fuzzy trigram
+        matching and the response has "fuzzy": true.
+        """
+        match = build_match_query(request.args.get('q', ''))
+        if match is None:
+            return jsonify({'error': 'q query parameter is required'}), 400
+
+        try:
+            date_from = request.args.get('from')
+            date_from = date.fromisoformat(date_from) if date_from else None
+            date_to = request.args.get('to')
+            date_to = date.fromisoformat(date_to) if date_to else None
+            venue_id = request.args.get('venue_id', type=int)
+            limit = min(max(request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int), 1), SEARCH_MAX_LIMIT)
+        except ValueError:
+            return jsonify({'error': 'Invalid from/to date'}), 400
+
+        if request.args.get('upcoming') in ('1', 'true') and date_from is None:
+            tz = app.config.get('LOCAL_TIMEZONE') or pytz.UTC
+            date_from = datetime.now(pytz.UTC).astimezone(tz).date()
+
+        after = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            after = parse_search_cursor(cursor)
+            if after is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+        filters = {
+            'date_from': date_from,
+            'date_to': date_to,
+            'venue_id': venue_id,
+            'category': request.args.get('category', '').strip() or None,
+        }
+        results, next_cursor = search_event_page(match, after=after, limit=limit, **filters)
+        fuzzy = False
+        if not results and after is None:
+            # No exact word matches: retry through the trigram index (catches typos)
+            results = fuzzy_search_events(request.args.get('q', ''), limit=limit, **filters)
+            fuzzy = bool(results)
+        response = jsonify({'results': results, 'next_cursor': next_cursor, 'fuzzy': fuzzy})
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+# Bump when the FTS table or trigger definitions change; ensure_fts_setup rebuilds on mismatch
+FTS_SCHEMA_VERSION = 6
+
+FTS_TABLES = ('fts_state', 'fts_pending', 'event_fts', 'event_trigram', 'venue_fts')
+FTS_INDEXES = ('event_fts', 'event_trigram', 'venue_fts')
+FTS_TRIGGERS = ('event_ai', 'event_au', 'event_ad', 'venue_ai', 'venue_au', 'venue_ad')
+
+# Pages merged per 'merge' command; small enough to keep each write transaction short
+FTS_MERGE_PAGES = 500
+
+# Async indexing queue: one row per index operation, applied in seq order
+FTS_PENDING_SQL = """
+    CREATE TABLE fts_pending (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL CHECK (op IN ('insert', 'delete')),
+        event_key INTEGER NOT NULL,
+        title TEXT,
+        description TEXT,
+        queued_at REAL NOT NULL
+    )
+"""
+
+# Queue rows applied per transaction by the background indexer
+FTS_INDEX_BATCH = 500
+
+# Unix time in SQL, with sub-second precision (unixepoch('subsec') needs SQLite 3.42)
+_NOW_SECONDS = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+def _set_fts_state(conn, key, value):
+    conn.execute(text("""
+        INSERT INTO fts_state (key, value) VALUES (:key, :value)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """), {"key": key, "value": str(value)})
+
+
+def _create_event_triggers(conn, async_indexing):
+    """(Re)create event_ai/au/ad: index synchronously, or only queue changes in fts_pending."""
+    for trigger in ('event_ai', 'event_au', 'event_ad'):
+        conn.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+
+    if async_indexing:
+        # The write transaction only appends to fts_pending: old values for deletes,
+        # new values for inserts, so replaying the queue in seq order is exact
+        conn.execute(text(f'''
+            CREATE TRIGGER event_ai AFTER INSERT ON event BEGIN
+                INSERT INTO fts_pending (op, event_key, title, description, queued_at)
+                VALUES ('insert', new.event_key, new.title, new.description, {_NOW_SECONDS});
+            END
+        '''))
+        conn.execute(text(f'''
+            CREATE TRIGGER event_au AFTER UPDATE ON event BEGIN
+                INSERT INTO fts_pending (op, event_key, title, description, queued_at)
+                VALUES ('delete', old.event_key, old.title, old.description, {_NOW_SECONDS});
+                INSERT INTO fts_pending (op, event_key, title, description, queued_at)
+                VALUES ('insert', new.event_key, new.title, new.description, {_NOW_SECONDS});
+            END
+        '''))
+        conn.execute(text(f'''
+            CREATE TRIGGER event_ad AFTER DELETE ON event BEGIN
+                INSERT INTO fts_pending (op, event_key, title, description, queued_at)
+                VALUES ('delete', old.event_key, old.title, old.description, {_NOW_SECONDS});
+            END
+        '''))
+        _set_fts_state(conn, 'indexing_mode', 'async')
+        return
+
+    # Create triggers for insert (one trigger keeps both indexes in step and
+    # bumps content_generation, which invalidates the search result cache)
+    conn.execute(text('''
+        CREATE TRIGGER event_ai AFTER INSERT ON event BEGIN
+            INSERT INTO event_fts(rowid, title, description)
+            VALUES (new.event_key, new.title, new.description);
+            INSERT INTO event_trigram(rowid, title, description)
+            VALUES (new.event_key, new.title, new.description);
+            UPDATE fts_state SET value = value + 1 WHERE key = 'content_generation';
+        END
+    '''))
+
+    # Create triggers for update (external content: remove old terms, add new)
+    conn.execute(text('''
+        CREATE TRIGGER event_au AFTER UPDATE ON event BEGIN
+            INSERT INTO event_fts(event_fts, rowid, title, description)
+            VALUES ('delete', old.event_key, old.title, old.description);
+            INSERT INTO event_fts(rowid, title, description)
+            VALUES (new.event_key, new.title, new.description);
+            INSERT INTO event_trigram(event_trigram, rowid, title, description)
+            VALUES ('delete', old.event_key, old.title, old.description);
+            INSERT INTO event_trigram(rowid, title, description)
+            VALUES (new.event_key, new.title, new.description);
+            UPDATE fts_state SET value = value + 1 WHERE key = 'content_generation';
+        END
+    '''))
+
+    # Create triggers for delete
+    conn.execute(text('''
+        CREATE TRIGGER event_ad AFTER DELETE ON event BEGIN
+            INSERT INTO event_fts(event_fts, rowid, title, description)
+            VALUES ('delete', old.event_key, old.title, old.description);
+            INSERT INTO event_trigram(event_trigram, rowid, title, description)
+            VALUES ('delete', old.event_key, old.title, old.description);
+            UPDATE fts_state SET value = value + 1 WHERE key = 'content_generation';
+        END
+    '''))
+    _set_fts_state(conn, 'indexing_mode', 'sync')
+
+
+def setup_fts_triggers(async_indexing=False):
+    """(Re)create event_fts, event_trigram, venue_fts and their triggers, then index every row in one pass
+
+    async_indexing=True installs event triggers that only queue changes in
+    fts_pending (see apply_pending_index).
+    """
+    started = time.perf_counter()
+    with engine.begin() as conn:  # One transaction: readers never see a half-built index
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS fts_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """))
+
+        # Drop existing FTS table and triggers if they exist
+        conn.execute(text('DROP TABLE IF EXISTS event_fts'))
+        conn.execute(text('DROP TABLE IF EXISTS event_trigram'))
+        conn.execute(text('DROP TABLE IF EXISTS venue_fts'))
+        conn.execute(text('DROP TABLE IF EXISTS fts_pending'))
+        for trigger in FTS_TRIGGERS:
+            conn.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
         
-        # Get the actual event objects
-        event_ids = [row[0] for row in fts_results]
-        events = session.query(Event).filter(Event.id.in_(event_ids)).all()
+        # External-content FTS5 table: reads title/description from event by event_key.
+        # 2- and 3-character prefix indexes keep typeahead and last-word prefix queries fast.
+        conn.execute(text('''
+            CREATE VIRTUAL TABLE event_fts USING fts5(
+                title,
+                description,
+                content='event',
+                content_rowid='event_key',
+                prefix='2 3'
+            )
+        '''))
         
-        return events
-    except Exception as e:
-        print(f"Error in search_events: {e}")
-        # Fallback to simple LIKE search
-        return session.query(Event).filter(
-            Event.title.ilike(f'%{query}%') | 
-            Event.description.ilike(f'%{query}%')
-        ).limit(50).all()
-
-
-def setup_fts_triggers():
-    """Set up triggers to keep FTS table in sync with main table"""
-    max_retries = 3
-    retry_delay = 1
-    
-    for attempt in range(max_retries):
-        try:
-            with engine.begin() as conn:  # Use begin() for transaction
-                # First, check if we can access the event table
-                event_count = conn.execute(text("SELECT COUNT(*) FROM event")).scalar()
-                print(f"Found {event_count} events in main table")
-                
-                # Drop existing FTS table and triggers if they exist
-                conn.execute(text('DROP TABLE IF EXISTS event_fts'))
-                conn.execute(text('DROP TRIGGER IF EXISTS event_ai'))
-                conn.execute(text('DROP TRIGGER IF EXISTS event_au'))
-                conn.execute(text('DROP TRIGGER IF EXISTS event_ad'))
-                
-                # Create FTS5 table with proper structure
-                conn.execute(text('''
-                    CREATE VIRTUAL TABLE event_fts USING fts5(
-                        id UNINDEXED,
-                        title,
-                        description
-                    )
-                '''))
-                
-                # Create triggers for insert
-                conn.execute(text('''
-                    CREATE TRIGGER event_ai AFTER INSERT ON event BEGIN
-                        INSERT INTO event_fts(id, title, description)
-                        VALUES (new.id, new.title, new.description);
-                    END
-                '''))
-                
-                # Create triggers for update
-                conn.execute(text('''
-                    CREATE TRIGGER event_au AFTER UPDATE ON event BEGIN
-                        UPDATE event_fts SET
-                            title = new.title,
-                            description = new.description
-                        WHERE id = old.id;
-                    END
-                '''))
-                
-                # Create triggers for delete
-                conn.execute(text('''
-                    CREATE TRIGGER event_ad AFTER DELETE ON event BEGIN
-                        DELETE FROM event_fts WHERE id = old.id;
-                    END
-                '''))
-                
-                # Populate FTS table with existing data in batches
-                batch_size = 1000
-                offset = 0
-                while True:
-                    # Get a batch of events
-                    events = conn.execute(text("""
-                        SELECT id, title, description 
-                        FROM event 
-                        LIMIT :limit OFFSET :offset
-                    """), {"limit": batch_size, "offset": offset}).fetchall()
-                    
-                    if not events:
-                        break
-                    
-                    # Insert batch into FTS
-                    for event in events:
-                        conn.execute(text("""
-                            INSERT INTO event_fts(id, title, description)
-                            VALUES (:id, :title, :description)
-                        """), {
-                            "id": event[0],
-                            "title": event[1] or "",
-                            "description": event[2] or ""
-                        })
-                    
-                    offset += batch_size
-                    print(f"Processed {offset} events for FTS")
-                
-                # Verify setup
-                verify_fts_setup()
-                
-                # Optimize FTS table
-                conn.execute(text('INSERT INTO event_fts(event_fts) VALUES("optimize")'))
-                
-                print("FTS setup completed successfully")
-                return  # Success, exit the retry loop
-                
-        except Exception as e:
-            print(f"Error setting up FTS (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 2  # Exponential backoff
-            else:
-                print("FTS setup failed after all retries. Continuing without FTS...")
-                return
-
-
-def ensure_fts_setup():
-    """Ensure FTS is set up, initialize if needed"""
+        # Same columns split into trigrams: substring (admin search) and fuzzy matching.
+        # detail=full is required for multi-trigram (phrase) queries.
+        conn.execute(text('''
+            CREATE VIRTUAL TABLE event_trigram USING fts5(
+                title,
+                description,
+                content='event',
+                content_rowid='event_key',
+                tokenize='trigram'
+            )
+        '''))
+
+        conn.execute(text(FTS_PENDING_SQL))
+        _create_event_triggers(conn, async_indexing)
+
+        # Venue index: external content keyed on venue.id. Every venue write path
+        # (admin, importer, migrate_venue_neighborhoods) goes through these triggers.
+        conn.execute(text('''
+            CREATE VIRTUAL TABLE venue_fts USING fts5(
+                name,
+                address,
+                neighborhood,
+                venue_type,
+                phone,
+                description,
+                content='venue',
+                content_rowid='id',
+                prefix='2 3'
+            )
+        '''))
+        conn.execute(text('''
+            CREATE TRIGGER venue_ai AFTER INSERT ON venue BEGIN
+                INSERT INTO venue_fts(rowid, name, address, neighborhood, venue_type, phone, description)
+                VALUES (new.id, new.name, new.address, new.neighborhood, new.venue_type, new.phone, new.description);
+            END
+        '''))
+        conn.execute(text('''
+            CREATE TRIGGER venue_au AFTER UPDATE OF name, address, neighborhood, venue_type, phone, description
+                ON venue BEGIN
+                INSERT INTO venue_fts(venue_fts, rowid, name, address, neighborhood, venue_type, phone, description)
+                VALUES ('delete', old.id, old.name, old.address, old.neighborhood, old.venue_type, old.phone, old.description);
+                INSERT INTO venue_fts(rowid, name, address, neighborhood, venue_type, phone, description)
+                VALUES (new.id, new.name, new.address, new.neighborhood, new.venue_type, new.phone, new.description);
+            END
+        '''))
+        conn.execute(text('''
+            CREATE TRIGGER venue_ad AFTER DELETE ON venue BEGIN
+                INSERT INTO venue_fts(venue_fts, rowid, name, address, neighborhood, venue_type, phone, description)
+                VALUES ('delete', old.id, old.name, old.address, old.neighborhood, old.venue_type, old.phone, old.description);
+            END
+        '''))
+
+        # Built-in rebuild: a single scan of the content table, no per-row round trips
+        for table in FTS_INDEXES:
+            conn.execute(text(f"INSERT INTO {table}({table}) VALUES('rebuild')"))
+            conn.execute(text(f"INSERT INTO {table}({table}) VALUES('optimize')"))
+
+        _set_fts_state(conn, 'schema_version', FTS_SCHEMA_VERSION)
+        conn.execute(text("""
+            INSERT INTO fts_state (key, value) VALUES ('content_generation', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """))
+        _set_fts_state(conn, 'rebuilt_at', datetime.now().isoformat(timespec='seconds'))
+
+    logger.info("FTS index rebuilt in %.2fs", time.perf_counter() - started)
+
+
+def fts_index_is_current(conn):
+    """Cheap check (no table scans) that the FTS indexes match this code and their tables.
+
+    The stored schema version catches layout changes and interrupted builds; the trigger
+    check catches dropped triggers; comparing the largest event key (and venue id) with the
+    largest indexed rowid (index seeks) catches rows added while the triggers were missing.
+    With changes still queued in fts_pending the event comparison is skipped.
+    """
+    tables = {row[0] for row in conn.execute(text(
+        f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN {FTS_TABLES!r}"
+    ))}
+    if tables != set(FTS_TABLES):
+        return False
+
+    version = conn.execute(text("SELECT value FROM fts_state WHERE key = 'schema_version'")).scalar()
+    if version != str(FTS_SCHEMA_VERSION):
+        return False
+
+    trigger_count = conn.execute(text(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN {FTS_TRIGGERS!r}"
+    )).scalar()
+    if trigger_count != len(FTS_TRIGGERS):
+        return False
+
+    if conn.execute(text("SELECT MAX(seq) FROM fts_pending")).scalar() is None:
+        max_event_key = conn.execute(text("SELECT MAX(event_key) FROM event")).scalar()
+        for index in ('event_fts', 'event_trigram'):
+            if max_event_key != conn.execute(text(f"SELECT MAX(id) FROM {index}_docsize")).scalar():
+                return False
+
+    max_venue_id = conn.execute(text("SELECT MAX(id) FROM venue")).scalar()
+    return max_venue_id == conn.execute(text("SELECT MAX(id) FROM venue_fts_docsize")).scalar()
+
+
+def ensure_fts_setup(async_indexing=False):
+    """Ensure FTS is set up, rebuilding only when the cheap consistency check fails"""
     try:
         with engine.connect() as conn:
-            # Check if FTS table exists and has data
-            fts_count = conn.execute(text("SELECT COUNT(*) FROM event_fts")).scalar()
-            event_count = conn.execute(text("SELECT COUNT(*) FROM event")).scalar()
-            
-            if fts_count == 0 and event_count > 0:
-                print("FTS table is empty but events exist, setting up FTS...")
-                setup_fts_triggers()
-                print("FTS setup completed")
-            elif fts_count != event_count:
-                print(f"FTS count ({fts_count}) doesn't match event count ({event_count}), reinitializing FTS...")
-                setup_fts_triggers()
-                print("FTS reinitialization completed")
+            current = fts_index_is_current(conn)
+            mode = None
+            if current:
+                mode = conn.execute(text("SELECT value FROM fts_state WHERE key = 'indexing_mode'")).scalar()
+        if not current:
+            logger.error("FTS index missing or out of date; rebuilding")
+            setup_fts_triggers(async_indexing)
+        elif mode != ('async' if async_indexing else 'sync'):
+            set_indexing_mode(async_indexing)
     except Exception as e:
-        print(f"Error checking FTS setup: {e}")
-        # If FTS table doesn't exist, set it up
-        try:
-            print("Setting up FTS table...")
-            setup_fts_triggers()
-            print("FTS setup completed")
-        except Exception as setup_error:
-            print(f"FTS setup failed: {setup_error}")
+        logger.error("FTS setup failed, search unavailable: %s", e, exc_info=True)
+
+
+def _apply_pending_batch(conn, batch):
+    """Replay up to `batch` queued operations into both event indexes; returns rows applied."""
+    last_seq = conn.execute(text(
+        "SELECT MAX(seq) FROM (SELECT seq FROM fts_pending ORDER BY seq LIMIT :batch)"
+    ), {"batch": batch}).scalar()
+    if last_seq is None:
+        return 0
+    # The hidden first column is 'delete' for removals and NULL for plain inserts
+    for index in ('event_fts', 'event_trigram'):
+        conn.execute(text(f"""
+            INSERT INTO {index}({index}, rowid, title, description)
+            SELECT CASE op WHEN 'delete' THEN 'delete' END, event_key, title, description
+            FROM fts_pending WHERE seq <= :last_seq ORDER BY seq
+        """), {"last_seq": last_seq})
+    return conn.execute(text("DELETE FROM fts_pending WHERE seq <= :last_seq"), {"last_seq": last_seq}).rowcount
+
+
+def apply_pending_index(batch=FTS_INDEX_BATCH, max_batches=None):
+    """Drain fts_pending into the event indexes, one short transaction per batch.
+
+    Each batch also bumps content_generation (search caches follow the index, not
+    the event table). Returns the number of queued operations applied.
+    """
+    applied = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with engine.connect() as conn:
+            if conn.execute(text("SELECT MAX(seq) FROM fts_pending")).scalar() is None:
+                break
+        with engine.begin() as conn:
+            # Write first so the batch is read under the write lock (safe with several indexers)
+            conn.execute(text("UPDATE fts_state SET value = value + 1 WHERE key = 'content_generation'"))
+            count = _apply_pending_batch(conn, batch)
+            _set_fts_state(conn, 'indexed_at', f"{time.time():.3f}")
+        applied += count
+        batches += 1
+        if count < batch:
+            break
+    return applied
+
+
+def set_indexing_mode(async_indexing):
+    """Switch the event triggers between synchronous and queued indexing (no rebuild)."""
+    with engine.begin() as conn:
+        if not async_indexing:
+            # Drain inside the same transaction so no queued change is stranded
+            while _apply_pending_batch(conn, FTS_INDEX_BATCH):
+                pass
+            conn.execute(text("UPDATE fts_state SET value = value + 1 WHERE key = 'content_generation'"))
+        _create_event_triggers(conn, async_indexing)
+
+
+def indexing_status():
+    """Queue depth and lag for the admin Search Index view."""
+    with engine.connect() as conn:
+        state = dict(conn.execute(text("SELECT key, value FROM fts_state")).fetchall())
+        pending, oldest, newest = conn.execute(text(
+            "SELECT COUNT(*), MIN(queued_at), MAX(queued_at) FROM fts_pending"
+        )).fetchone()
+    now = time.time()
+    indexed_at = float(state['indexed_at']) if state.get('indexed_at') else None
+    return {
+        'mode': state.get('indexing_mode', 'sync'),
+        'pending': pending,
+        'lag_seconds': round(now - oldest, 1) if oldest is not None else 0.0,
+        'newest_age_seconds': round(now - newest, 1) if newest is not None else None,
+        'indexed_at': datetime.fromtimestamp(indexed_at).isoformat(timespec='seconds') if indexed_at else None,
+        'content_generation': state.get('content_generation'),
+        'rebuilt_at': state.get('rebuilt_at'),
+    }
+
+
+def start_fts_indexer(interval_seconds, max_lag_seconds):
+    """Apply fts_pending every interval_seconds on a daemon thread; log when lag exceeds the bound."""
+    def run():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                apply_pending_index()
+                lag = indexing_status()['lag_seconds']
+                if lag > max_lag_seconds:
+                    logger.error("FTS indexing lag %.1fs exceeds %ss", lag, max_lag_seconds)
+            except Exception as e:
+                logger.error("FTS indexing failed: %s", e)
+
+    thread = threading.Thread(target=run, name='fts-indexer', daemon=True)
+    thread.start()
+    return thread
+
+
+def merge_fts_segments(max_rounds=20, index='event_fts'):
+    """Incrementally merge FTS b-tree segments in short transactions; returns rounds run."""
+    for rounds in range(1, max_rounds + 1):
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"INSERT INTO {index}({index}, rank) VALUES('merge', :pages)"
+            ), {"pages": FTS_MERGE_PAGES})
+            # Per the FTS5 docs, fewer than 2 changed rows means nothing was left to merge
+            if conn.execute(text("SELECT changes()")).scalar() < 2:
+                return rounds
+    return max_rounds
+
+
+def start_fts_maintenance(interval_seconds):
+    """Run merge_fts_segments every interval_seconds on a daemon thread."""
+    def run():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                # venue_fts is small and rarely written; only the event indexes fragment
+                for index in ('event_fts', 'event_trigram'):
+                    merge_fts_segments(index=index)
+            except Exception as e:
+                logger.error("FTS merge failed: %s", e)
+
+    thread = threading.Thread(target=run, name='fts-maintenance', daemon=True)
+    thread.start()
+    return thread
 
 
 def verify_fts_setup():
-    """Verify that FTS table and triggers are properly set up"""
+    """Print a full FTS consistency report (manual diagnostic; scans both tables)"""
     try:
         with engine.connect() as conn:
-            # Check if FTS table exists
-            fts_exists = conn.execute(text("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='event_fts'
-            """)).scalar()
-            print(f"FTS table exists: {fts_exists is not None}")
-            
-            if not fts_exists:
-                print("FTS table does not exist")
-                return
-            
-            # Check trigger count
-            trigger_count = conn.execute(text("""
-                SELECT COUNT(*) FROM sqlite_master 
-                WHERE type='trigger' AND name LIKE 'event_a%'
-            """)).scalar()
-            print(f"Number of triggers: {trigger_count}")
-            
-            # Check FTS table content
-            fts_count = conn.execute(text("SELECT COUNT(*) FROM event_fts")).scalar()
+            print(f"FTS index current: {fts_index_is_current(conn)}")
+            state = dict(conn.execute(text("SELECT key, value FROM fts_state")).fetchall())
+            print(f"FTS state: {state}")
+        # Queued changes would show up as mismatches; apply them first
+        print(f"Applied {apply_pending_index()} queued index operations")
+        with engine.connect() as conn:
+            # 'integrity-check' compares the index against the content table
+            for index in FTS_INDEXES:
+                conn.execute(text(f"INSERT INTO {index}({index}, rank) VALUES('integrity-check', 1)"))
+            print("FTS integrity check passed")
+
+            fts_count = conn.execute(text("SELECT COUNT(*) FROM event_fts_docsize")).scalar()
             event_count = conn.execute(text("SELECT COUNT(*) FROM event")).scalar()
             print(f"FTS table rows: {fts_count}")
             print(f"Event table rows: {event_count}")
-            
-            if fts_count != event_count:
-                print("WARNING: FTS table count doesn't match event table count!")
-            
-            # Check sample content
-            sample = conn.execute(text("""
-                SELECT e.id, e.title, f.title as fts_title 
-                FROM event e 
-                LEFT JOIN event_fts f ON e.id = f.id 
-                LIMIT 1
-            """)).fetchone()
-            if sample:
-                print(f"Sample content - Event ID: {sample[0]}")
-                print(f"Event title: {sample[1]}")
-                print(f"FTS title: {sample[2]}")
-            
-            # Test FTS search with proper syntax
-            test_query = "test"
-            test_results = conn.execute(text("""
-                SELECT * FROM event_fts 
-                WHERE event_fts MATCH :query 
-                LIMIT 1
-            """), {"query": test_query}).fetchall()
-            print(f"Test search returned {len(test_results)} results")
-            
     except Exception as e:
         print(f"Error verifying FTS setup: {e}")
-        print("FTS verification failed, but continuing...")
+
+
+if __name__ == '__main__':
+    setup_fts_triggers()
+    verify_fts_setup()
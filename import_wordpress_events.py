@@ -16,7 +16,10 @@ import phpserialize
 import pytz
 from sqlalchemy import text
 
-from database import Base, Event, Venue, engine, get_next_event_ids, migrate_database, SessionLocal
+from database import (
+    Base, Event, Venue, engine, get_next_event_ids, init_database, migrate_database, SessionLocal,
+    INSERT_EVENT_CATEGORY_SQL, category_label,
+)
 
 DEFAULT_TIMEZONE = 'America/Detroit'
 DEFAULT_COLOR = '#3788d8'
@@ -638,7 +641,7 @@ def build_event_records(
             'end': end,
             'venue_name': venue_name,
             'url': normalize_url(meta.get('_EventURL')),
-            'categories': ','.join(categories),
+            'categories': categories,
             'rrule': rrule,
             'is_recurring': is_recurring,
             'recurring_until': recurring_until,
@@ -673,6 +676,32 @@ def print_summary(stats: ImportStats, dry_run: bool) -> None:
         print(f'Recurrence conversion warnings: {stats.recurrence_warnings}')
 
 
+def category_ids_by_name(session, names: Iterable[str]) -> Dict[str, int]:
+    """Category id per name, adding the WordPress terms the category table lacks."""
+    names = sorted(set(names))
+    for name in names:
+        session.execute(text(
+            'INSERT OR IGNORE INTO category (name, usage_count, is_active) VALUES (:name, 0, 1)'
+        ), {'name': name})
+    rows = session.execute(text('SELECT id, name FROM category')).fetchall()
+    return {name: category_id for category_id, name in rows if name in names}
+
+
+def save_event_batch(session, batch: List[Event], batch_categories: List[List[str]],
+                     category_ids: Dict[str, int]) -> None:
+    """Insert a batch of events and their event_category links in one transaction."""
+    get_next_event_ids(session, batch)
+    session.bulk_save_objects(batch)
+    links = [
+        {'start_date': event.start_date, 'event_id': event.id, 'category_id': category_ids[name]}
+        for event, names in zip(batch, batch_categories)
+        for name in set(names)
+    ]
+    if links:
+        session.execute(INSERT_EVENT_CATEGORY_SQL, links)
+    session.commit()
+
+
 def import_data(data: ExtractedData, dry_run: bool = False) -> ImportStats:
     stats = ImportStats()
     venue_records, wp_to_name = build_venue_records(data, stats)
@@ -684,13 +713,17 @@ def import_data(data: ExtractedData, dry_run: bool = False) -> ImportStats:
     if dry_run:
         return stats
 
+    init_database()
     Base.metadata.create_all(engine)
     migrate_database()
 
     session = SessionLocal()
     try:
+        session.execute(text('DELETE FROM event_category'))
         session.execute(text('DELETE FROM event'))
         session.execute(text('DELETE FROM venue'))
+        # Imported ids restart at 1 per date
+        session.execute(text('DELETE FROM event_id_counter'))
         session.commit()
 
         venue_id_by_name: Dict[str, int] = {}
@@ -717,7 +750,13 @@ def import_data(data: ExtractedData, dry_run: bool = False) -> ImportStats:
 
         session.commit()
 
+        category_ids = category_ids_by_name(
+            session, (name for record in event_records for name in record['categories'])
+        )
+        session.commit()
+
         batch: List[Event] = []
+        batch_categories: List[List[str]] = []
         batch_size = 1000
         for record in event_records:
             venue_id = venue_id_by_name.get(record['venue_name'], venue_id_by_name[UNKNOWN_VENUE])
@@ -728,7 +767,7 @@ def import_data(data: ExtractedData, dry_run: bool = False) -> ImportStats:
                 end=record['end'],
                 venue_id=venue_id,
                 url=record['url'],
-                categories=record['categories'],
+                categories=category_label(record['categories']),
                 rrule=record['rrule'],
                 is_recurring=record['is_recurring'],
                 recurring_until=record['recurring_until'],
@@ -738,17 +777,15 @@ def import_data(data: ExtractedData, dry_run: bool = False) -> ImportStats:
                 bg=record['bg'],
             )
             batch.append(event)
+            batch_categories.append(record['categories'])
 
             if len(batch) >= batch_size:
-                get_next_event_ids(session, batch)
-                session.bulk_save_objects(batch)
-                session.commit()
+                save_event_batch(session, batch, batch_categories, category_ids)
                 batch = []
+                batch_categories = []
 
         if batch:
-            get_next_event_ids(session, batch)
-            session.bulk_save_objects(batch)
-            session.commit()
+            save_event_batch(session, batch, batch_categories, category_ids)
 
         return stats
     except Exception:
@@ -4,7 +4,7 @@ from faker import Faker
 import argparse
 
 from app import Base, engine, SessionLocal, Event, Venue
-from database import get_next_event_ids, migrate_database
+from database import get_next_event_ids, init_database, migrate_database
 
 fake = Faker()
 
@@ -62,6 +62,7 @@ def generate_recurring_pattern(indefinite_count, max_indefinite=10):
 
 def populate_events(total_events=50000):
     # Create tables
+    init_database()
     Base.metadata.create_all(engine)
     
     # Run migration to ensure categories are set up
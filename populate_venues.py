@@ -1,4 +1,4 @@
-from database import engine, SessionLocal, Base, Venue, migrate_database
+from database import engine, SessionLocal, Base, Venue, init_database, migrate_database
 import re
 
 # List of venues extracted from the provided text
@@ -69,6 +69,7 @@ VENUE_METADATA = {
 def populate_venues():
     # Create tables first, before any model relationships are accessed
     print("Creating database tables...")
+    init_database()
     Base.metadata.create_all(engine)
     
     # Run migration to ensure categories are set up
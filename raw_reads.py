@@ -0,0 +1,155 @@
+"""ORM-free read path for the public event endpoints.
+
+Enabled with `database.raw_reads: true` in config.yaml. Each thread keeps
+its own sqlite3 connection (with sqlite3's prepared statement cache) and
+rows come back as plain tuples wrapped in EventRow, which serialize_event
+and expand_recurring_events accept like Event rows or snapshots. Venue
+names come from venue_catalog, so event reads never join the venue table.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import date, datetime
+
+from database import db_path
+
+# Statements are reused per connection; well above the handful issued here
+CACHED_STATEMENTS = 64
+
+EVENT_COLUMNS = (
+    'e.id, e.start_date, e.title, e.description, e.start, e."end", e.venue_id, '
+    'e.color, e.bg, e.is_virtual, e.is_hybrid, e.url, e.is_recurring, e.rrule, e.recurring_until, e.categories'
+)
+
+EVENT_FROM = 'FROM event e'
+
+# Each query has a fixed shape so the statement cache always hits
+DAY_ROWS_SQL = f"""
+    SELECT {EVENT_COLUMNS} {EVENT_FROM}
+    WHERE e.start_date = ?
+    ORDER BY e.start, e.start_date, e.id
+"""
+
+# One-off events that started before one minute and run at/after another (event_span R*Tree)
+SPANNING_ROWS_SQL = f"""
+    SELECT {EVENT_COLUMNS} {EVENT_FROM}
+    WHERE e.event_key IN (
+        SELECT event_key FROM event_span WHERE start_minute < ? AND end_minute >= ?
+    )
+    ORDER BY e.start, e.start_date, e.id
+"""
+
+RANGE_ROWS_SQL = f"""
+    SELECT {EVENT_COLUMNS} {EVENT_FROM}
+    WHERE e.start_date >= ? AND e.start_date <= ?
+    ORDER BY e.start_date, e.id
+"""
+
+LIVE_SERIES_SQL = f"""
+    SELECT {EVENT_COLUMNS} {EVENT_FROM}
+    WHERE e.is_recurring = 1 AND (e.recurring_until IS NULL OR e.recurring_until >= ?)
+    ORDER BY e.start_date, e.id
+"""
+
+SERIES_BETWEEN_SQL = f"""
+    SELECT {EVENT_COLUMNS} {EVENT_FROM}
+    WHERE e.is_recurring = 1 AND e.start_date <= ?
+      AND (e.recurring_until IS NULL OR e.recurring_until >= ?)
+    ORDER BY e.start_date, e.id
+"""
+
+_EventRowBase = namedtuple('_EventRowBase', [
+    'id', 'start_date', 'title', 'description', 'start', 'end', 'venue_id',
+    'color', 'bg', 'is_virtual', 'is_hybrid', 'url', 'is_recurring', 'rrule', 'recurring_until', 'categories',
+])
+
+
+class EventRow(_EventRowBase):
+    """Immutable event row; attribute-compatible with Event for serialization."""
+    __slots__ = ()
+
+    venue = None
+
+
+_local = threading.local()
+
+
+def _reset_after_fork():
+    """Children must open their own connections, not reuse the parent's."""
+    global _local
+    _local = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_connection():
+    """This thread's read-only connection, opened on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        # isolation_level=None: autocommit, so no read transaction is held between requests
+        conn = sqlite3.connect(db_path, isolation_level=None, cached_statements=CACHED_STATEMENTS)
+        conn.execute('PRAGMA query_only = ON')
+        conn.execute('PRAGMA cache_size = -8192')
+        conn.execute('PRAGMA mmap_size = 67108864')
+        _local.conn = conn
+    return conn
+
+
+def close_connection():
+    """Close this thread's connection (the app factory calls this before forking)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+def _parse_flag(value):
+    return None if value is None else bool(value)
+
+
+def _event_row(row):
+    (event_id, start_date, title, description, start, end, venue_id,
+     color, bg, is_virtual, is_hybrid, url, is_recurring, rrule, recurring_until, categories) = row
+    return EventRow(
+        event_id, _parse_date(start_date), title, description,
+        datetime.fromisoformat(start), datetime.fromisoformat(end), venue_id,
+        color, bg, _parse_flag(is_virtual), _parse_flag(is_hybrid), url,
+        _parse_flag(is_recurring), rrule, _parse_date(recurring_until), categories,
+    )
+
+
+def _fetch_events(sql, params):
+    return [_event_row(row) for row in get_connection().execute(sql, params).fetchall()]
+
+
+def day_rows(target_date):
+    """All events dated target_date, ordered by start."""
+    return _fetch_events(DAY_ROWS_SQL, (target_date.isoformat(),))
+
+
+def spanning_rows(started_before_minute, running_at_minute):
+    """Multi-day one-off events from event_span (minutes as database.event_minute)."""
+    return _fetch_events(SPANNING_ROWS_SQL, (started_before_minute, running_at_minute))
+
+
+def range_rows(first_date, last_date):
+    """All events dated first_date..last_date inclusive."""
+    return _fetch_events(RANGE_ROWS_SQL, (first_date.isoformat(), last_date.isoformat()))
+
+
+def live_recurring_series(live_from):
+    """Recurring series that have not ended before live_from."""
+    return _fetch_events(LIVE_SERIES_SQL, (live_from.isoformat(),))
+
+
+def recurring_series_between(first_date, last_date):
+    """Recurring series that may have instances between first_date and last_date."""
+    return _fetch_events(SERIES_BETWEEN_SQL, (last_date.isoformat(), first_date.isoformat()))
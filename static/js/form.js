@@ -44,15 +44,8 @@ document.addEventListener('DOMContentLoaded', function() {
         setDateOffset(0);
     }
     
-    // Add validation styling to venue select
-    const venueSelect = document.getElementById('venue_id');
-    venueSelect.addEventListener('change', function() {
-        if (this.value === '') {
-            this.classList.add('is-invalid');
-        } else {
-            this.classList.remove('is-invalid');
-        }
-    });
+    setupVenueTypeahead();
+    setupTitleSuggestions();
     
     // Handle recurring event options visibility
     const rruleInput = document.getElementById('rrule');
@@ -110,10 +103,109 @@ document.addEventListener('DOMContentLoaded', function() {
     
 });
 
+// Fetch /typeahead suggestions, at most one request per pause in typing
+function debouncedTypeahead(url, kind, onResults) {
+    let timer = null;
+    let controller = null;
+    return function(query) {
+        clearTimeout(timer);
+        timer = setTimeout(function() {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const params = new URLSearchParams({ q: query, kind: kind });
+            fetch(`${url}?${params}`, { signal: controller.signal })
+                .then((response) => response.json())
+                .then((data) => onResults(data[kind] || []))
+                .catch((error) => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Typeahead failed:', error);
+                    }
+                });
+        }, 150);
+    };
+}
+
+// Venue picker: text search over /typeahead, selected id kept in the hidden venue_id input
+function setupVenueTypeahead() {
+    const venueInput = document.getElementById('venue_id');
+    const searchInput = document.getElementById('venue_search');
+    const menu = document.getElementById('venue_suggestions');
+
+    function closeMenu() {
+        menu.replaceChildren();
+    }
+
+    function selectVenue(venue) {
+        venueInput.value = venue.id;
+        searchInput.value = venue.name;
+        searchInput.classList.remove('is-invalid');
+        closeMenu();
+    }
+
+    const lookup = debouncedTypeahead(searchInput.dataset.typeaheadUrl, 'venues', function(venues) {
+        closeMenu();
+        venues.forEach(function(venue) {
+            const item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action';
+            item.textContent = venue.name;
+            // mousedown fires before the input's blur closes the menu
+            item.addEventListener('mousedown', function(event) {
+                event.preventDefault();
+                selectVenue(venue);
+            });
+            menu.appendChild(item);
+        });
+    });
+
+    searchInput.addEventListener('input', function() {
+        // Typing invalidates the previous pick until a suggestion is chosen
+        venueInput.value = '';
+        if (this.value.trim()) {
+            lookup(this.value);
+        } else {
+            closeMenu();
+        }
+    });
+    searchInput.addEventListener('keydown', function(event) {
+        const first = menu.querySelector('.list-group-item');
+        if (event.key === 'Enter' && first) {
+            event.preventDefault();
+            first.dispatchEvent(new MouseEvent('mousedown'));
+        } else if (event.key === 'Escape') {
+            closeMenu();
+        }
+    });
+    searchInput.addEventListener('blur', closeMenu);
+}
+
+// Title field: suggest titles of upcoming events through the <datalist>
+function setupTitleSuggestions() {
+    const titleInput = document.getElementById('title');
+    const datalist = document.getElementById('title_suggestions');
+    const url = document.getElementById('venue_search').dataset.typeaheadUrl;
+
+    const lookup = debouncedTypeahead(url, 'titles', function(titles) {
+        datalist.replaceChildren(...titles.map(function(item) {
+            const option = document.createElement('option');
+            option.value = item.title;
+            return option;
+        }));
+    });
+
+    titleInput.addEventListener('input', function() {
+        if (this.value.trim().length >= 2) {
+            lookup(this.value);
+        }
+    });
+}
+
 function validateForm() {
-    const venueSelect = document.getElementById('venue_id');
-    if (venueSelect.value === '') {
-        venueSelect.classList.add('is-invalid');
+    const venueInput = document.getElementById('venue_id');
+    if (venueInput.value === '') {
+        document.getElementById('venue_search').classList.add('is-invalid');
         return false;
     }
 
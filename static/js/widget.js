@@ -149,6 +149,19 @@ document.addEventListener('DOMContentLoaded', function() {
         const nextDayBottomBtn = document.getElementById('next-day-bottom');
         let currentDate = initialDate;
 
+        // The first day's list is inlined by the server (events-bootstrap); later days are fetched
+        const bootstrapEl = document.getElementById('events-bootstrap');
+        let bootstrap = bootstrapEl ? JSON.parse(bootstrapEl.textContent) : null;
+
+        function takeBootstrapEvents(dateStr) {
+            if (bootstrap && bootstrap.date === dateStr && bootstrap.events) {
+                const events = bootstrap.events;
+                bootstrap = null;
+                return Promise.resolve(events);
+            }
+            return fetch('/events?date=' + dateStr).then(response => response.json());
+        }
+
         function beginListUpdate() {
             const scrollX = window.scrollX;
             const scrollY = window.scrollY;
@@ -183,8 +196,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
             const scrollPos = beginListUpdate();
 
-            fetch('/events?date=' + dateStr)
-            .then(response => response.json())
+            takeBootstrapEvents(dateStr)
             .then(events => {
                 if (events.length === 0) {
                     eventsListEl.innerHTML = '<p>No events scheduled for this day.</p>';
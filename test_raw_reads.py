@@ -0,0 +1,128 @@
+"""raw_reads must serve exactly what the ORM read path serves.
+
+Builds its own SQLite database in a temporary directory (FLASK_EVENTS_DB),
+so it never touches the configured one: python -m unittest test_raw_reads
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, time as dt_time, timedelta
+
+TEST_DIR = tempfile.mkdtemp(prefix='flask-events-test-')
+TEST_DB_PATH = os.path.join(TEST_DIR, 'events.db')
+os.environ['FLASK_EVENTS_DB'] = TEST_DB_PATH
+
+import database  # noqa: E402
+from database import (  # noqa: E402
+    Base, Category, Event, SessionLocal, Venue, engine, get_next_event_ids, init_database, migrate_database,
+    set_event_categories,
+)
+
+import events  # noqa: E402
+import raw_reads  # noqa: E402
+from benchmarks import read_cases  # noqa: E402
+from facets import clear_category_index  # noqa: E402
+from venue_catalog import invalidate_venue_catalog, load_venue_catalog  # noqa: E402
+
+DAYS = 14
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+def _at(day, hour, minute=0):
+    return datetime.combine(day, dt_time(hour, minute))
+
+
+def populate(session):
+    """One-off, overnight, multi-day and recurring events around today, with venues and categories."""
+    today = events._local_today()
+    hall = Venue(name='Test Hall', address='1 Main St', neighborhood='Midtown', venue_type='Music Venue')
+    gallery = Venue(name='Gallery', address='2 Side St', neighborhood='Corktown', venue_type='Gallery')
+    session.add_all([hall, gallery])
+    session.flush()
+    # migrate_database seeds the default categories
+    concert, comedy = (session.query(Category).filter_by(name=name).one() for name in ('Concert', 'Comedy'))
+
+    rows = [
+        (Event(title='Concert', start=_at(today, 19), end=_at(today, 21), venue_id=hall.id,
+               url='https://example.com/concert'), [concert]),
+        (Event(title='Late show', start=_at(today, 22), end=_at(today + timedelta(days=1), 2),
+               venue_id=hall.id), [concert, comedy]),
+        (Event(title='Morning talk', start=_at(today + timedelta(days=1), 10),
+               end=_at(today + timedelta(days=1), 11), is_virtual=True), []),
+        (Event(title='Festival', start=_at(today - timedelta(days=1), 20),
+               end=_at(today + timedelta(days=2), 12), venue_id=gallery.id, is_hybrid=True), [comedy]),
+        (Event(title='Exhibit', start=_at(today + timedelta(days=40), 12),
+               end=_at(today + timedelta(days=45), 18), venue_id=gallery.id), []),
+        (Event(title='Open mic', start=_at(today - timedelta(days=10), 18),
+               end=_at(today - timedelta(days=10), 20), venue_id=hall.id, rrule='FREQ=WEEKLY',
+               is_recurring=True, recurring_until=today + timedelta(days=40)), [comedy]),
+        (Event(title='Workshop', start=_at(today - timedelta(days=2), 9),
+               end=_at(today - timedelta(days=2), 10), rrule='FREQ=DAILY;COUNT=5',
+               is_recurring=True), [concert]),
+        (Event(title='Night market', start=_at(today - timedelta(days=60), 23),
+               end=_at(today - timedelta(days=59), 1), venue_id=gallery.id,
+               rrule='FREQ=MONTHLY', is_recurring=True), []),
+    ]
+    get_next_event_ids(session, [event for event, _ in rows])
+    for event, categories in rows:
+        set_event_categories(event, categories)
+        session.add(event)
+    session.commit()
+
+
+@unittest.skipUnless(database.db_path == TEST_DB_PATH, 'database was imported with another FLASK_EVENTS_DB')
+class RawReadsMatchOrmTest(unittest.TestCase):
+
+    def setUp(self):
+        self.use_raw_reads = events.USE_RAW_READS
+        init_database()
+        Base.metadata.create_all(engine)
+        migrate_database()
+        session = SessionLocal()
+        try:
+            populate(session)
+        finally:
+            session.close()
+        invalidate_venue_catalog()
+        clear_category_index()
+
+    def tearDown(self):
+        events.USE_RAW_READS = self.use_raw_reads
+        events.clear_event_caches()
+        invalidate_venue_catalog()
+        clear_category_index()
+        raw_reads.close_connection()
+        engine.dispose()
+        os.remove(TEST_DB_PATH)
+
+    def build(self, raw):
+        events.USE_RAW_READS = raw
+        # The live series cache holds rows of whichever path filled it
+        events.clear_event_caches()
+        return {label: build() for label, build in read_cases(DAYS)}
+
+    def test_event_payloads_identical(self):
+        orm, raw = self.build(False), self.build(True)
+        self.assertTrue(any(list(listing) for listing in orm.values()))
+        for label, listing in orm.items():
+            with self.subTest(label):
+                self.assertEqual(list(listing), list(raw[label]))
+                self.assertEqual(listing.keys, raw[label].keys)
+                self.assertEqual(listing.counts, raw[label].counts)
+
+    def test_venue_payload_identical(self):
+        with events.get_db_session() as session:
+            orm = [events.venue_to_dict(venue)
+                   for venue in session.query(Venue).order_by(Venue.venue_type, Venue.name)]
+        self.assertEqual(len(orm), 2)
+        self.assertEqual(orm, json.loads(load_venue_catalog().payload()))
+
+
+if __name__ == '__main__':
+    unittest.main()
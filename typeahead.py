@@ -0,0 +1,143 @@
+"""Prefix lookups for autocompletion: venue names and upcoming event titles.
+
+Venues live in an in-memory sorted prefix index built from the venue catalog
+(rebuilt whenever the catalog is); titles go through the FTS5 prefix indexes
+on event_fts.
+"""
+
+import re
+from bisect import bisect_left
+from datetime import datetime
+
+import pytz
+from cacheout import Cache
+from flask import request, jsonify
+from sqlalchemy import text
+
+from database import engine, EVENT_KEY_ID_BITS, EVENT_KEY_ID_MASK
+from fts import build_match_query
+from venue_catalog import get_venue_catalog
+
+TYPEAHEAD_DEFAULT_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 25
+TYPEAHEAD_KINDS = ('all', 'venues', 'titles')
+
+# Single entry: (VenueCatalog, the VenuePrefixIndex built from it)
+venue_index_cache = Cache(maxsize=1, ttl=5 * 60)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Distinct titles of upcoming events (and live recurring series) matching a title prefix
+UPCOMING_TITLES_SQL = f"""
+    SELECT e.title, MIN(MAX(e.start_date, :today)) AS next_date
+    FROM event_fts f
+    JOIN event e ON e.start_date = date((f.rowid >> {EVENT_KEY_ID_BITS}) * 86400, 'unixepoch')
+                AND e.id = (f.rowid & {EVENT_KEY_ID_MASK})
+    WHERE event_fts MATCH :match
+      AND (e.start_date >= :today OR (e.is_recurring = 1 AND
+           (e.recurring_until IS NULL OR e.recurring_until >= :today)))
+    GROUP BY e.title
+    ORDER BY next_date, e.title
+    LIMIT :limit
+"""
+
+
+def normalize_name(name):
+    """Lowercase words joined by single spaces ("The  Shelter!" -> "the shelter")."""
+    return ' '.join(_WORD_RE.findall((name or '').lower()))
+
+
+class VenuePrefixIndex:
+    """Sorted (key, ...) entries for every word-start of every venue name.
+
+    A lookup is one bisect plus a scan of just the matching slice, so "bar"
+    finds "Marble Bar" as well as "Barcade". Full-name matches rank before
+    mid-name ones, open venues before closed ones, then A-Z.
+    """
+
+    def __init__(self, venues):
+        entries = []
+        for venue_id, name in venues:
+            words = normalize_name(name).split()
+            closed = 'closed' in name.lower()
+            for start in range(len(words)):
+                entries.append((' '.join(words[start:]), start > 0, closed, name.lower(), venue_id, name))
+        entries.sort()
+        self._keys = [entry[0] for entry in entries]
+        self._entries = entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, prefix, limit=TYPEAHEAD_DEFAULT_LIMIT):
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + '\uffff', lo)
+        results = []
+        seen = set()
+        for _, _, _, _, venue_id, name in sorted(self._entries[lo:hi], key=lambda entry: entry[1:4]):
+            if venue_id in seen:
+                continue
+            seen.add(venue_id)
+            results.append({'id': venue_id, 'name': name})
+            if len(results) >= limit:
+                break
+        return results
+
+
+def get_venue_index():
+    """The VenuePrefixIndex for the current venue catalog (rebuilt when the catalog is)."""
+    catalog = get_venue_catalog()
+    cached = venue_index_cache.get('venues')
+    if cached is not None and cached[0] is catalog:
+        return cached[1]
+    index = VenuePrefixIndex((record.id, record.name) for record in catalog.ordered)
+    venue_index_cache.set('venues', (catalog, index))
+    return index
+
+
+def clear_venue_typeahead():
+    """Drop the venue prefix index - call this when venues are modified"""
+    venue_index_cache.clear()
+
+
+def search_upcoming_titles(query, today, limit=TYPEAHEAD_DEFAULT_LIMIT):
+    """Distinct upcoming event titles whose words start with the typed words."""
+    match = build_match_query(query)
+    if match is None:
+        return []
+    with engine.connect() as conn:
+        rows = conn.execute(text(UPCOMING_TITLES_SQL), {
+            "match": f"title : ({match})",
+            "today": today.isoformat(),
+            "limit": limit,
+        }).fetchall()
+    return [{'title': title, 'next_date': next_date} for title, next_date in rows]
+
+
+def register_typeahead_routes(app):
+    """Autocomplete API used by the event form"""
+
+    @app.route('/typeahead')
+    def typeahead():
+        """Query params: q, kind (all|venues|titles), limit (max 25)."""
+        query = request.args.get('q', '')
+        kind = request.args.get('kind', 'all')
+        if kind not in TYPEAHEAD_KINDS:
+            return jsonify({'error': f'kind must be one of {", ".join(TYPEAHEAD_KINDS)}'}), 400
+        limit = min(max(request.args.get('limit', TYPEAHEAD_DEFAULT_LIMIT, type=int), 1), TYPEAHEAD_MAX_LIMIT)
+
+        payload = {}
+        if kind in ('all', 'venues'):
+            payload['venues'] = get_venue_index().search(query, limit)
+        if kind in ('all', 'titles'):
+            tz = app.config.get('LOCAL_TIMEZONE') or pytz.UTC
+            today = datetime.now(pytz.UTC).astimezone(tz).date()
+            payload['titles'] = search_upcoming_titles(query, today, limit)
+
+        response = jsonify(payload)
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
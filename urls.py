@@ -1,6 +1,8 @@
-"""URL helpers for rejecting non-http(s) schemes."""
+"""URL helpers for rejecting non-http(s) schemes and building canonical absolute URLs."""
 from urllib.parse import urlparse
 
+from flask import current_app, url_for
+
 
 def safe_http_url(url):
     """Return url if it is http(s) with a host; otherwise None."""
@@ -13,3 +15,11 @@ def safe_http_url(url):
     if parsed.scheme in ('http', 'https') and parsed.netloc:
         return url
     return None
+
+
+def site_url_for(endpoint, **values):
+    """Absolute URL for endpoint on the configured site_url, never the request's Host.
+
+    Use it for anything that lands in a cache shared by every visitor.
+    """
+    return current_app.config['SITE_URL'] + url_for(endpoint, **values)
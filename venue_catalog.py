@@ -0,0 +1,164 @@
+"""In-process venue catalog shared by every read path.
+
+A VenueCatalog is an immutable snapshot of the venue table: compact records
+by id, the /venues ordering, neighborhood/type groupings and the prebuilt
+/venues JSON bytes for every filter combination that can match anything.
+Readers take the current snapshot with get_venue_catalog(); a rebuild swaps
+in a whole new object, so a request never sees a half-updated catalog.
+
+Venue writes bump catalog_version.version (maintained by the triggers that
+migrate_database installs). Other workers notice the bump within
+CATALOG_CHECK_SECONDS; the worker that made the write calls
+invalidate_venue_catalog() and rebuilds on its next read.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from sqlalchemy import text
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# How often a reader re-checks catalog_version; venue edits reach other workers within this
+CATALOG_CHECK_SECONDS = 2
+
+VENUE_VERSION_NAME = 'venue'
+
+VenueRecord = namedtuple('VenueRecord', ['id', 'name', 'address', 'neighborhood', 'venue_type'])
+
+CATALOG_VERSION_SQL = "SELECT version FROM catalog_version WHERE name = :name"
+
+CATALOG_VENUES_SQL = "SELECT id, name, address, neighborhood, venue_type FROM venue"
+
+EMPTY_PAYLOAD = b'[]'
+
+
+def _payload(records):
+    """/venues JSON bytes for records (same keys and order as the old per-row dicts)."""
+    return json.dumps([record._asdict() for record in records], separators=(',', ':')).encode('utf-8')
+
+
+def _sort_key(record):
+    # Same order as ORDER BY venue_type, name (NULL types first)
+    return (record.venue_type is not None, record.venue_type or '', record.name)
+
+
+def _group(records, field):
+    groups = {}
+    for record in records:
+        value = getattr(record, field)
+        if value:
+            groups.setdefault(value, []).append(record)
+    return MappingProxyType({value: tuple(group) for value, group in groups.items()})
+
+
+class VenueCatalog:
+    """Immutable snapshot of every venue; build a new one instead of mutating."""
+
+    __slots__ = ('version', 'venues', 'ordered', 'by_neighborhood', 'by_type', '_payloads')
+
+    def __init__(self, version, rows):
+        ordered = tuple(sorted((VenueRecord(*row) for row in rows), key=_sort_key))
+        self.version = version
+        self.venues = MappingProxyType({record.id: record for record in ordered})
+        self.ordered = ordered
+        self.by_neighborhood = _group(ordered, 'neighborhood')
+        self.by_type = _group(ordered, 'venue_type')
+
+        payloads = {('', ''): _payload(ordered)}
+        for neighborhood, records in self.by_neighborhood.items():
+            payloads[(neighborhood, '')] = _payload(records)
+            for venue_type, group in _group(records, 'venue_type').items():
+                payloads[(neighborhood, venue_type)] = _payload(group)
+        for venue_type, records in self.by_type.items():
+            payloads[('', venue_type)] = _payload(records)
+        self._payloads = MappingProxyType(payloads)
+
+    def __len__(self):
+        return len(self.ordered)
+
+    def get(self, venue_id):
+        """VenueRecord for venue_id, or None."""
+        return self.venues.get(venue_id)
+
+    def name(self, venue_id):
+        """Venue name for venue_id, or None (unknown id or no venue)."""
+        record = self.venues.get(venue_id)
+        return record.name if record is not None else None
+
+    def filtered(self, neighborhood='', venue_type=''):
+        """Records in /venues order; blank filters match everything."""
+        if neighborhood:
+            records = self.by_neighborhood.get(neighborhood, ())
+            return tuple(r for r in records if r.venue_type == venue_type) if venue_type else records
+        if venue_type:
+            return self.by_type.get(venue_type, ())
+        return self.ordered
+
+    def payload(self, neighborhood='', venue_type=''):
+        """Prebuilt /venues JSON bytes for the filter pair."""
+        return self._payloads.get((neighborhood, venue_type), EMPTY_PAYLOAD)
+
+
+_catalog = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _read_version(conn):
+    try:
+        return conn.execute(text(CATALOG_VERSION_SQL), {"name": VENUE_VERSION_NAME}).scalar() or 0
+    except Exception as e:
+        # Public workers skip migrations; without the table, writes still invalidate in-process
+        logger.error("Reading catalog_version failed: %s", e)
+        return None
+
+
+def load_venue_catalog():
+    """Build a fresh catalog from the venue table."""
+    with engine.connect() as conn:
+        # Version first: a write landing in between only costs one extra rebuild later
+        version = _read_version(conn)
+        rows = conn.execute(text(CATALOG_VENUES_SQL)).fetchall()
+    return VenueCatalog(version, rows)
+
+
+def get_venue_catalog():
+    """The current catalog; reloads when it is missing, invalidated or its version moved."""
+    global _catalog, _checked_at
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _checked_at < CATALOG_CHECK_SECONDS:
+        return catalog
+
+    with _lock:
+        catalog = _catalog
+        now = time.monotonic()
+        if catalog is not None and now - _checked_at < CATALOG_CHECK_SECONDS:
+            return catalog
+        if catalog is not None and catalog.version is not None:
+            with engine.connect() as conn:
+                current = _read_version(conn)
+            if current == catalog.version:
+                _checked_at = now
+                return catalog
+        catalog = load_venue_catalog()
+        _catalog = catalog
+        _checked_at = now
+        return catalog
+
+
+def invalidate_venue_catalog():
+    """Force a rebuild on the next read - call this after writing venues"""
+    global _catalog
+    _catalog = None
+
+
+def venue_name(venue_id):
+    """Name of venue_id from the current catalog (also a Jinja global), or None."""
+    return get_venue_catalog().name(venue_id)
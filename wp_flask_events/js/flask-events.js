@@ -84,10 +84,9 @@
         return `${dayOfWeek} (${month}-${day}-${year})`;
     }
 
-    function renderEventsList(events, eventsListEl, viewingDate) {
+    function renderEventsHtml(events, viewingDate) {
         if (events.length === 0) {
-            eventsListEl.innerHTML = '<p>No events scheduled for this day.</p>';
-            return;
+            return '<p>No events scheduled for this day.</p>';
         }
 
         const ongoingEvents = [];
@@ -145,7 +144,72 @@
             eventsHtml += '</div>';
         });
 
-        eventsListEl.innerHTML = eventsHtml;
+        return eventsHtml;
+    }
+
+    function isoDate(date) {
+        const year = date.getFullYear();
+        const month = String(date.getMonth() + 1).padStart(2, '0');
+        const day = String(date.getDate()).padStart(2, '0');
+        return `${year}-${month}-${day}`;
+    }
+
+    // With fragmentEndpoint set the server sends the day list as ready-made HTML (/events/fragment),
+    // so the browser skips grouping, time formatting and escaping
+    const fragmentEndpoint = config.fragmentEndpoint || '';
+
+    // First paint in one request: today's list plus the venue list a [flask_venues] shortcode on the
+    // page shows (flask-venues.js picks it up from window.flaskEventsBootstrap). Footer scripts run
+    // after the shortcode markup is parsed, so the wraps can be looked up right away.
+    function requestBootstrap() {
+        if (!apiBase || !document.getElementById('events-list')) {
+            return null;
+        }
+        const bootstrap = { date: isoDate(new Date()), neighborhood: null };
+        const params = new URLSearchParams({ date: bootstrap.date, month: '0' });
+        if (fragmentEndpoint) {
+            params.set('fragment', '1');
+        }
+        const venuesWrap = document.querySelector('.flask-venues-wrap[data-neighborhood]:not([data-neighborhood=""])');
+        if (venuesWrap) {
+            bootstrap.neighborhood = venuesWrap.dataset.neighborhood;
+            params.set('venues', '1');
+            params.set('neighborhood', bootstrap.neighborhood);
+        }
+        bootstrap.promise = fetch(apiUrl('/events/bootstrap?' + params.toString()))
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Bootstrap request failed: ' + response.status);
+                }
+                return response.json();
+            });
+        return bootstrap;
+    }
+
+    const bootstrap = requestBootstrap();
+    window.flaskEventsBootstrap = bootstrap;
+
+    function fetchDayEvents(dateStr) {
+        return fetch(apiUrl((config.eventsEndpoint || '/events') + '?date=' + dateStr))
+            .then(response => response.json());
+    }
+
+    function fetchDayFragment(dateStr) {
+        return fetch(apiUrl(fragmentEndpoint + '?date=' + dateStr))
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Fragment request failed: ' + response.status);
+                }
+                return response.text();
+            });
+    }
+
+    // Resolves to the list's HTML: the server's fragment, or markup built here from the JSON list
+    function fetchDayHtml(dateStr, viewingDate) {
+        if (fragmentEndpoint) {
+            return fetchDayFragment(dateStr);
+        }
+        return fetchDayEvents(dateStr).then(events => renderEventsHtml(events, viewingDate));
     }
 
     document.addEventListener('DOMContentLoaded', function() {
@@ -230,12 +294,11 @@
             });
         }
 
+        let pendingBootstrap = bootstrap;
+
         function loadEvents(date) {
             currentDate = new Date(date);
-            const year = currentDate.getFullYear();
-            const month = String(currentDate.getMonth() + 1).padStart(2, '0');
-            const day = String(currentDate.getDate()).padStart(2, '0');
-            const dateStr = `${year}-${month}-${day}`;
+            const dateStr = isoDate(currentDate);
 
             if (selectedDateDisplayEl) {
                 selectedDateDisplayEl.textContent = formatDateForDisplay(currentDate);
@@ -244,10 +307,20 @@
             highlightSelectedDate(currentDate);
             const scrollPos = beginListUpdate();
 
-            fetch(apiUrl((config.eventsEndpoint || '/events') + '?date=' + dateStr))
-                .then(response => response.json())
-                .then(events => {
-                    renderEventsList(events, eventsListEl, currentDate);
+            const viewingDate = new Date(currentDate);
+            let request;
+            if (pendingBootstrap && pendingBootstrap.date === dateStr) {
+                request = pendingBootstrap.promise
+                    .then(data => data.html !== undefined ? data.html : renderEventsHtml(data.events, viewingDate))
+                    .catch(() => fetchDayHtml(dateStr, viewingDate));
+            } else {
+                request = fetchDayHtml(dateStr, viewingDate);
+            }
+            pendingBootstrap = null;
+
+            request
+                .then(html => {
+                    eventsListEl.innerHTML = html;
                     finishListUpdate(scrollPos.scrollX, scrollPos.scrollY);
                 })
                 .catch(error => {
@@ -67,6 +67,34 @@
         container.innerHTML = html;
     }
 
+    // Search results are already ranked by the server, so keep their order
+    function renderSearchResults(container, venues) {
+        if (venues.length === 0) {
+            container.innerHTML = '<p class="flask-venues-empty">No matching venues.</p>';
+            return;
+        }
+
+        let html = '<ul class="flask-venues-list flask-venues-results">';
+        venues.forEach(function(venue) {
+            html += '<li class="listvenuelink">';
+            html += '<a href="' + escapeHtml(apiUrl('/venues/' + venue.id)) + '" target="_blank" rel="noopener">';
+            html += escapeHtml(venue.name);
+            html += '</a>';
+            if (venue.neighborhood) {
+                html += ' <span class="flask-venues-neighborhood">' + escapeHtml(venue.neighborhood) + '</span>';
+            }
+            html += '</li>';
+        });
+        html += '</ul>';
+
+        container.innerHTML = html;
+    }
+
+    function fetchVenues(params) {
+        return fetch(apiUrl('/venues?' + params.toString()))
+            .then(function(response) { return response.json(); });
+    }
+
     function loadVenueList(container) {
         const neighborhood = container.dataset.neighborhood;
         const groupBy = container.dataset.groupBy || 'venue_type';
@@ -78,9 +106,18 @@
 
         container.innerHTML = '<p class="flask-venues-loading">Loading venues...</p>';
 
-        const params = new URLSearchParams({ neighborhood: neighborhood });
-        fetch(apiUrl('/venues?' + params.toString()))
-            .then(function(response) { return response.json(); })
+        // flask-events.js may already be fetching this list with its first-paint bootstrap
+        const bootstrap = window.flaskEventsBootstrap;
+        let request;
+        if (bootstrap && bootstrap.neighborhood === neighborhood) {
+            request = bootstrap.promise
+                .then(function(data) { return data.venues; })
+                .catch(function() { return fetchVenues(new URLSearchParams({ neighborhood: neighborhood })); });
+        } else {
+            request = fetchVenues(new URLSearchParams({ neighborhood: neighborhood }));
+        }
+
+        request
             .then(function(venues) {
                 renderVenueList(container, venues, groupBy);
             })
@@ -90,7 +127,78 @@
             });
     }
 
+    // data-search="1": a search box over /venues?q= (limited to data-neighborhood when set).
+    // With a neighborhood the full list shows until the visitor types.
+    function initVenueSearch(wrap) {
+        if (!apiBase) {
+            wrap.innerHTML = '<p class="flask-venues-empty">Venue search unavailable.</p>';
+            return;
+        }
+
+        const neighborhood = wrap.dataset.neighborhood || '';
+        const input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'flask-venues-search';
+        input.placeholder = 'Search venues...';
+        input.setAttribute('aria-label', 'Search venues');
+        const results = document.createElement('div');
+        results.className = 'flask-venues-results-wrap';
+        results.dataset.groupBy = wrap.dataset.groupBy || 'venue_type';
+        wrap.innerHTML = '';
+        wrap.appendChild(input);
+        wrap.appendChild(results);
+
+        let timer = null;
+        let latest = 0;
+
+        function showDefault() {
+            if (neighborhood) {
+                results.dataset.neighborhood = neighborhood;
+                loadVenueList(results);
+            } else {
+                results.innerHTML = '<p class="flask-venues-empty">Type to search venues.</p>';
+            }
+        }
+
+        function runSearch() {
+            const query = input.value.trim();
+            if (!query) {
+                showDefault();
+                return;
+            }
+            const params = new URLSearchParams({ q: query });
+            if (neighborhood) {
+                params.set('neighborhood', neighborhood);
+            }
+            // Ignore responses that arrive after a newer query was sent
+            const requestId = ++latest;
+            fetchVenues(params)
+                .then(function(venues) {
+                    if (requestId === latest) {
+                        renderSearchResults(results, venues);
+                    }
+                })
+                .catch(function(error) {
+                    console.error('Error searching venues:', error);
+                    results.innerHTML = '<p class="flask-venues-empty">Error searching venues. Please try again.</p>';
+                });
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(runSearch, 250);
+        });
+
+        showDefault();
+    }
+
     document.addEventListener('DOMContentLoaded', function() {
-        document.querySelectorAll('.flask-venues-wrap[data-neighborhood]').forEach(loadVenueList);
+        document.querySelectorAll('.flask-venues-wrap').forEach(function(wrap) {
+            if (wrap.dataset.search === '1') {
+                initVenueSearch(wrap);
+            } else if (wrap.dataset.neighborhood) {
+                loadVenueList(wrap);
+            }
+        });
     });
 })();
@@ -44,11 +44,13 @@ function flask_venues_shortcode($atts) {
     $atts = shortcode_atts(array(
         'neighborhood' => '',
         'group_by' => 'venue_type',
+        'search' => '',
     ), $atts, 'flask_venues');
 
     $neighborhood = trim($atts['neighborhood']);
-    if ($neighborhood === '') {
-        return '<p class="flask-venues-empty">Neighborhood is required. Example: [flask_venues neighborhood="Corktown"]</p>';
+    $search = in_array(strtolower(trim($atts['search'])), array('1', 'true', 'yes'), true);
+    if ($neighborhood === '' && !$search) {
+        return '<p class="flask-venues-empty">Neighborhood is required unless search is on. Example: [flask_venues neighborhood="Corktown"] or [flask_venues search="true"]</p>';
     }
 
     $group_by = trim($atts['group_by']);
@@ -57,9 +59,10 @@ function flask_venues_shortcode($atts) {
     }
 
     return sprintf(
-        '<div class="flask-events-wrap flask-venues-wrap" data-neighborhood="%s" data-group-by="%s"></div>',
+        '<div class="flask-events-wrap flask-venues-wrap" data-neighborhood="%s" data-group-by="%s" data-search="%s"></div>',
         esc_attr($neighborhood),
-        esc_attr($group_by)
+        esc_attr($group_by),
+        $search ? '1' : '0'
     );
 }
 
@@ -153,6 +156,7 @@ function flask_events_enqueue_assets() {
         wp_localize_script('flask-events-js', 'flaskEvents', array(
             'flaskUrl' => FLASK_EVENTS_URL,
             'eventsEndpoint' => '/events',
+            'fragmentEndpoint' => '/events/fragment',
             'eventLinkArrow' => '→',
             'fallbackEventUrl' => 'https://thedetroitilove.com',
         ));